@@ -31,6 +31,9 @@ class AbstractVerificationEngine(object):
     def check_anomalies(self, *args, **kwargs):
         raise NotImplementedError()
 
+    def check_model(self, *args, **kwargs):
+        raise NotImplementedError()
+
     def delete_generator(self, *args, **kwargs):
         raise NotImplementedError()
 
@@ -52,8 +55,14 @@ class AbstractVerificationEngine(object):
     def dump_plumbing_network(self, *args, **kwargs):
         raise NotImplementedError()
 
+    def plan_mapping(self, *args, **kwargs):
+        raise NotImplementedError()
+
     def remove_link(self, *args, **kwargs):
         raise NotImplementedError()
 
     def stop(self, *args, **kwargs):
         raise NotImplementedError()
+
+    def sync(self, *args, **kwargs):
+        raise NotImplementedError()
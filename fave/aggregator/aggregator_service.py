@@ -23,6 +23,9 @@
 """
 
 import socket
+import selectors
+import asyncio
+import functools
 import os
 import json
 import logging
@@ -30,19 +33,25 @@ import sys
 import argparse
 import time
 
+from copy import copy
 from pprint import pformat
 from threading import Thread
-from queue import Queue
+from queue import Queue, Empty
+from concurrent.futures import ProcessPoolExecutor, Future
 
 from aggregator.aggregator_abstract import AbstractAggregator, TRACE
 from aggregator.aggregator_singleton import AGGREGATOR
 from aggregator.aggregator_signals import register_signals
 
 from util.aggregator_utils import FAVE_DEFAULT_UNIX, FAVE_DEFAULT_IP, FAVE_DEFAULT_PORT
-from util.aggregator_utils import fave_recvmsg
+from util.aggregator_utils import FaveMessageReader, fave_loads
+from util.aggregator_utils import fave_frame, fave_parse_header, fave_sendmsg
+from util.flow_tree_util import convert_flow_tree_dumps
 from util.lock_util import PreLockedFileLock
 from util.packet_util import is_ip, is_domain, is_unix, is_port, is_host
 from util.path_util import json_to_pathlet, pathlet_to_json, Path
+from util.profile_util import TaskProfiler
+from util.executor_util import PriorityExecutor
 #from util.dynamic_distribution import NodeLinkDispatcher
 
 import netplumber.jsonrpc as jsonrpc
@@ -50,6 +59,7 @@ from netplumber.jsonrpc import NET_PLUMBER_DEFAULT_PORT, NET_PLUMBER_DEFAULT_IP
 from netplumber.adapter import NetPlumberAdapter
 
 from netplumber.slice import SlicingCommand
+from devices.abstract_device import AbstractDeviceModel
 from devices.packet_filter import PacketFilterModel
 from devices.snapshot_packet_filter import SnapshotPacketFilterModel, StateCommand
 from devices.switch import SwitchModel, SwitchCommand
@@ -57,32 +67,90 @@ from devices.generator import GeneratorModel
 from devices.probe import ProbeModel
 from topology.topology import LinksModel, TopologyCommand
 
-from reporting.reporter import Reporter
+from reporting.reporter import Reporter, Log
 
 from rule.rule_model import RuleField
 
 def _has_asyncore_socks(socks):
     return socks != {} and all(v is not None for v in socks.values())
 
+
+# tasks that do not change the models
+_READ_ONLY_TASKS = [
+    'dump', 'report', 'check_compliance', 'query_compliance', 'check_anomalies',
+    'stats'
+]
+
+
+# the maximum number of pending tasks whose models are planned together
+_PLANNING_BATCH = 1024
+
+
+def _compliance_rules_from_json(j):
+    rules = {}
+    for dst, src_rules in j.items():
+        rules.setdefault(dst, [])
+        for src, negated, cond in src_rules:
+            rules[dst].append((src, negated, [RuleField.from_json(f) for f in cond]))
+
+    return rules
+
+
+def _decode_task(data, model_types):
+    """ Parses a task and reconstructs the model it carries.
+
+    This function is run by the translation stage's worker processes.
+
+    Keyword arguments:
+    data -- the task as JSON string or compactly encoded bytes
+    model_types -- a dict mapping model type names to model classes
+
+    Returns:
+    The task as JSON object, the model or None, and the time spent per phase.
+    """
+
+    t_start = time.perf_counter()
+    j = fave_loads(data)
+    t_decoded = time.perf_counter()
+    if j['type'] not in model_types:
+        return j, None, {'decode' : t_decoded - t_start}
+
+    model = model_types[j['type']].from_json(j)
+    t_end = time.perf_counter()
+
+    return {'type' : j['type']}, model, {
+        'decode' : t_decoded - t_start, 'reconstruct' : t_end - t_decoded
+    }
+
 class AggregatorService(AbstractAggregator):
     """ This class provides FaVe's central aggregation service.
     """
 
-    def __init__(self, socks, asyncore_socks, mapping=None):
+    def __init__(
+            self, socks, asyncore_socks, mapping=None, workers=0, profile=None, compact=False
+    ):
         self.queue = Queue()
+        self.workers = workers
+        self.pool = None
         self.models = {}
         self.port_to_model = {}
         self.links = {}
+        self.rejected = []
         self.stop = False
         self.verification_engine = NetPlumberAdapter(
             list(socks.values()),
             AggregatorService.LOGGER,
             asyncore_socks=asyncore_socks,
-            mapping=mapping
+            mapping=mapping,
+            compact=compact
         )
-        # XXX: make log file configurable
-        self.reporter = Reporter(self, '/dev/shm/np/stdout.log')
+        self.reporter = Reporter(self)
         self.reporter.daemon = True
+        # per-phase timings are collected for all tasks, samplers only run
+        # for the task types given
+        self.profiler = TaskProfiler(rpc=self.verification_engine.rpc, sample=profile)
+        self.verification_engine.profiler = self.profiler
+        self.verification_engine.rpc.profiler = self.profiler
         self.model_types = {
             "packet_filter" : PacketFilterModel,
             "snapshot_packet_filter" : SnapshotPacketFilterModel,
@@ -141,106 +209,109 @@ class AggregatorService(AbstractAggregator):
             return model.from_json(j)
 
 
+    def _fetch_batch(self):
+        # all pending tasks are fetched at once so that the mapping can be
+        # planned for their models before any of them is applied
+        batch = [self.queue.get()]
+        while len(batch) < _PLANNING_BATCH:
+            try:
+                batch.append(self.queue.get_nowait())
+            except Empty:
+                break
+
+        if AggregatorService.LOGGER.isEnabledFor(logging.DEBUG):
+            AggregatorService.LOGGER.debug(
+                'worker: fetched %s tasks from queue', len(batch)
+            )
+
+        return batch
+
+
     def _handler(self):
         t_start = time.time()
 
         while not self.stop:
-            data = self.queue.get()
-            if AggregatorService.LOGGER.isEnabledFor(logging.DEBUG):
-                AggregatorService.LOGGER.debug('worker: fetched data from queue')
+            batch = self._fetch_batch()
 
-            if not data:
-                if AggregatorService.LOGGER.isEnabledFor(logging.DEBUG):
-                    AggregatorService.LOGGER.debug('worker: ignoring empty data')
+            tasks = []
+            for data, conn in batch:
+                if not data:
+                    if AggregatorService.LOGGER.isEnabledFor(logging.DEBUG):
+                        AggregatorService.LOGGER.debug('worker: ignoring empty data')
+                    tasks.append(None)
+                    continue
+
+                t_task_start = time.time()
+                try:
+                    if isinstance(data, Future):
+                        j, model, timings = data.result()
+                    else:
+                        j, model, timings = _decode_task(data, self.model_types)
+                except Exception as err:
+                    # malformed tasks are skipped while the rest of the batch
+                    # is handled
+                    emsg = 'worker: could not parse data: %s' % data
+                    AggregatorService.LOGGER.error(
+                        emsg, exc_info=not isinstance(err, ValueError)
+                    )
+                    tasks.append(None)
+                    continue
+
+                tasks.append((j, model, timings, conn, t_task_start))
+
+            self._plan_mapping([t[1] for t in tasks if t is not None and t[1] is not None])
+
+            last = max([idx for idx, task in enumerate(tasks) if task is not None], default=-1)
+            for idx, task in enumerate(tasks):
+                if task is None or self.stop:
+                    self.queue.task_done()
+                    continue
+
+                j, model, timings, conn, t_task_start = task
+                try:
+                    self._handle_task(j, model, timings, conn, t_task_start, idx == last)
+                except Exception:
+                    # a failing task must not take down the handler as the
+                    # queue would never be joined
+                    AggregatorService.LOGGER.exception("worker: task failed")
                 self.queue.task_done()
-                continue
 
-            t_task_start = time.time()
+        t_stop = time.time()
+        if AggregatorService.LOGGER.isEnabledFor(logging.INFO):
+            AggregatorService.LOGGER.info("worker: stop handler after %s seconds.", t_stop-t_start)
 
-            try:
-                j = json.loads(data)
-            except ValueError:
-                emsg = 'worker: could not parse data: %s' % data
-                AggregatorService.LOGGER.fatal(emsg)
-                self.queue.task_done()
-                return
 
-            if AggregatorService.LOGGER.isEnabledFor(TRACE):
-                AggregatorService.LOGGER.trace('worker: parsed data\n%s' % pformat(j, indent=2))
+    def _handle_task(self, j, model, timings, conn, t_task_start, last):
+        if AggregatorService.LOGGER.isEnabledFor(TRACE):
+            AggregatorService.LOGGER.trace('worker: parsed data\n%s' % pformat(j, indent=2))
 
-            if j['type'] == 'stop':
-                task_type = 'stop'
-                self.stop_aggr()
-                self.verification_engine.stop()
-
-            elif j['type'] == 'report':
-                task_type = 'report'
-                report = j
-                self.reporter.dump_report(report['file'])
-                self.reporter.mark_compliance()
-                self.reporter.mark_anomalies()
-
-            elif j['type'] == 'check_compliance':
-                task_type = 'check_compliance'
-                rules = {}
-                for dst, src_rules in j['rules'].items():
-                    rules.setdefault(dst, [])
-                    for src, negated, cond in src_rules:
-                        rules[dst].append((src, negated, [RuleField.from_json(f) for f in cond]))
-
-                self.verification_engine.check_compliance(rules)
-
-            elif j['type'] == 'dump':
-                dump = j
-                odir = dump['dir']
-
-                task_type = "dump %s" % ','.join([k for k in dump if k not in ['type', 'dir']])
-
-                if dump['fave']:
-                    self._dump_aggregator(odir)
-                if dump['flows']:
-                    self.verification_engine.dump_flows(odir)
-                if dump['network']:
-                    self.verification_engine.dump_plumbing_network(odir)
-                if dump['pipes']:
-                    self.verification_engine.dump_pipes(odir)
-                if dump['trees']:
-                    self.verification_engine.dump_flow_trees(odir, dump['simple'])
-
-                lock = PreLockedFileLock("%s/.lock" % odir)
-                lock.release()
-
-
-            elif j['type'] == 'check_anomalies':
-                task_type = 'check_anomalies'
-                self.verification_engine.check_anomalies(
-                    use_shadow=j.get('use_shadow', False),
-                    use_reach=j.get('use_reach', False),
-                    use_general=j.get('use_general', False)
-                )
+        if j['type'] == 'stats':
+            self._reply(conn, self._stats(j))
+            return
 
-            else:
-                model = self._model_from_json(j)
-                if model.type == 'topology_command':
-                    task_type = model.model.type
-                else:
-                    task_type = model.type
+        self.profiler.begin_task(j['type'])
+        for phase, duration in timings.items():
+            self.profiler.add(phase, duration)
 
-                self._sync_diff(model)
+        if j['type'] == 'query_compliance':
+            task_type = 'query_compliance'
+            self._reply(conn, self._query_compliance(j))
+        else:
+            task_type = self._process_task(j, model)
 
-            t_task_end = time.time()
+        # pipelined operations are awaited as soon as no further task is pending
+        if last and self.queue.empty() and task_type != 'stop':
+            self.verification_engine.sync()
 
-            if AggregatorService.LOGGER.isEnabledFor(logging.INFO):
-                emsg = "worker: completed task %s in %s seconds." % (
-                    task_type, t_task_end - t_task_start
-                )
-                AggregatorService.LOGGER.info(emsg)
+        self.profiler.end_task(task_type)
 
-            self.queue.task_done()
+        t_task_end = time.time()
 
-        t_stop = time.time()
         if AggregatorService.LOGGER.isEnabledFor(logging.INFO):
-            AggregatorService.LOGGER.info("worker: stop handler after %s seconds.", t_stop-t_start)
+            emsg = "worker: completed task %s in %s seconds." % (
+                task_type, t_task_end - t_task_start
+            )
+            AggregatorService.LOGGER.info(emsg)
 
 
     def run(self, server, port=0):
@@ -249,6 +320,15 @@ class AggregatorService(AbstractAggregator):
 
         self.reporter.start()
 
+        # the translation stage parses tasks and reconstructs models in
+        # worker processes while the handler thread commits them in order
+        if self.workers > 0:
+            if AggregatorService.LOGGER.isEnabledFor(logging.INFO):
+                AggregatorService.LOGGER.info(
+                    "master: start translation stage with %s workers", self.workers
+                )
+            self.pool = ProcessPoolExecutor(max_workers=self.workers)
+
         if AggregatorService.LOGGER.isEnabledFor(logging.INFO):
             lmsg = "master: open and bind %s socket" % (
                 'unix' if port == 0 else 'tcp/ip'
@@ -272,40 +352,72 @@ class AggregatorService(AbstractAggregator):
 
         if AggregatorService.LOGGER.isEnabledFor(logging.INFO):
             AggregatorService.LOGGER.info("master: listen on socket")
-        sock.listen(1)
+        sock.listen(socket.SOMAXCONN)
+
+        # connections are kept open so that clients may stream many messages
+        sel = selectors.DefaultSelector()
+        sel.register(sock, selectors.EVENT_READ)
 
         while not self.stop:
-            # accept connections on socket
             if AggregatorService.LOGGER.isEnabledFor(logging.DEBUG):
-                AggregatorService.LOGGER.debug("master: wait for connection")
+                AggregatorService.LOGGER.debug("master: wait for data")
             try:
-                conn, _addr = sock.accept()
-            except socket.timeout:
+                events = sel.select(timeout=2.0)
+            except (OSError, ValueError):
+                AggregatorService.LOGGER.exception("master: error from select():")
+                break
+
+            if not events:
                 if AggregatorService.LOGGER.isEnabledFor(logging.DEBUG):
                     AggregatorService.LOGGER.debug("master: listening timed out, continue loop...")
                 continue
-            except socket.error:
-                if AggregatorService.LOGGER.isEnabledFor(logging.DEBUG):
-                    AggregatorService.LOGGER.debug(
-                        "master: break listening loop due to socket error"
-                    )
-                AggregatorService.LOGGER.exception("master: error from accept():")
-                break
-            else:
-                if AggregatorService.LOGGER.isEnabledFor(logging.DEBUG):
-                    AggregatorService.LOGGER.debug("master: accepted connection")
 
-            # receive data from socket
-            data = fave_recvmsg(conn, logger=AggregatorService.LOGGER)
-            assert data != None
-            if AggregatorService.LOGGER.isEnabledFor(logging.DEBUG):
-                lmsg = "master: read data of size %s" % len(data)
-                AggregatorService.LOGGER.debug(lmsg)
+            for key, _mask in events:
+                if key.fileobj is sock:
+                    # accept connections on socket
+                    try:
+                        conn, _addr = sock.accept()
+                    except socket.timeout:
+                        continue
+                    except socket.error:
+                        AggregatorService.LOGGER.exception("master: error from accept():")
+                        continue
 
-            # upon data receival enqueue
-            self.queue.put(data)
-            if AggregatorService.LOGGER.isEnabledFor(logging.DEBUG):
-                AggregatorService.LOGGER.debug("master: enqueued data")
+                    if AggregatorService.LOGGER.isEnabledFor(logging.DEBUG):
+                        AggregatorService.LOGGER.debug("master: accepted connection")
+                    conn.setblocking(True)
+                    sel.register(conn, selectors.EVENT_READ, FaveMessageReader(conn))
+                    continue
+
+                reader = key.data
+                try:
+                    nbytes = reader.fill()
+                except socket.error:
+                    AggregatorService.LOGGER.exception("master: error from recv():")
+                    nbytes = 0
+
+                # receive data from socket
+                for data in reader.messages():
+                    if AggregatorService.LOGGER.isEnabledFor(logging.DEBUG):
+                        lmsg = "master: read data of size %s" % len(data)
+                        AggregatorService.LOGGER.debug(lmsg)
+                    self._enqueue(data, reader.conn)
+
+                if not nbytes:
+                    if reader.pending() and AggregatorService.LOGGER.isEnabledFor(logging.WARN):
+                        AggregatorService.LOGGER.warn(
+                            "master: connection closed with %s bytes of incomplete data",
+                            reader.pending()
+                        )
+                    if AggregatorService.LOGGER.isEnabledFor(logging.DEBUG):
+                        AggregatorService.LOGGER.debug("master: close connection")
+                    sel.unregister(reader.conn)
+                    reader.close()
+
+        for key in list(sel.get_map().values()):
+            if key.fileobj is not sock:
+                key.data.close()
+        sel.close()
 
         # close unix domain socket
         if AggregatorService.LOGGER.isEnabledFor(logging.INFO):
@@ -322,6 +434,11 @@ class AggregatorService(AbstractAggregator):
             AggregatorService.LOGGER.info("master: join handler thread")
         thread.join()
 
+        if self.pool:
+            if AggregatorService.LOGGER.isEnabledFor(logging.INFO):
+                AggregatorService.LOGGER.info("master: stop translation stage")
+            self.pool.shutdown()
+
         if AggregatorService.LOGGER.isEnabledFor(logging.INFO):
             AggregatorService.LOGGER.info("master: finished run")
 
@@ -330,6 +447,478 @@ class AggregatorService(AbstractAggregator):
         self.reporter.stop()
 
 
+    def run_async(self, server, port=0, max_depth=1024):
+        """ Operates FaVe's aggregation service with concurrent client sessions.
+
+        Tasks of a session are committed in the order they were received while
+        sessions are served independently. Model updates are committed in the
+        order of their arrival which retains the order per device. Read-only
+        requests are not subject to the queue depth limit and overtake the
+        pending updates of other sessions. A session that exceeds the limit is
+        not read from until updates have been committed. Tasks that cannot be
+        decoded or committed are answered with an error.
+
+        Keyword arguments:
+        server -- the server address or unix socket path
+        port -- the server port or 0 for unix sockets (default: 0)
+        max_depth -- the maximum number of pending model updates (default: 1024)
+        """
+
+        self.reporter.start()
+
+        if self.workers > 0:
+            if AggregatorService.LOGGER.isEnabledFor(logging.INFO):
+                AggregatorService.LOGGER.info(
+                    "master: start translation stage with %s workers", self.workers
+                )
+            self.pool = ProcessPoolExecutor(max_workers=self.workers)
+
+        self.max_depth = max_depth
+        self.depth = 0
+
+        asyncio.run(self._serve(server, port))
+
+        if self.pool:
+            if AggregatorService.LOGGER.isEnabledFor(logging.INFO):
+                AggregatorService.LOGGER.info("master: stop translation stage")
+            self.pool.shutdown()
+
+        if AggregatorService.LOGGER.isEnabledFor(logging.INFO):
+            AggregatorService.LOGGER.info("master: finished run")
+
+        if AggregatorService.LOGGER.isEnabledFor(logging.INFO):
+            AggregatorService.LOGGER.info("master: stop reporter")
+        self.reporter.stop()
+
+
+    async def _serve(self, server, port):
+        self.loop = asyncio.get_running_loop()
+        self.slots = asyncio.Semaphore(self.max_depth)
+        self.sessions = {}
+
+        # a single thread applies all tasks to the verification engine
+        self.engine = PriorityExecutor()
+
+        if AggregatorService.LOGGER.isEnabledFor(logging.INFO):
+            lmsg = "master: open and listen on %s socket" % (
+                'unix' if port == 0 else 'tcp/ip'
+            )
+            AggregatorService.LOGGER.info(lmsg)
+
+        if port == 0:
+            listener = await asyncio.start_unix_server(self._session, path=server)
+        else:
+            listener = await asyncio.start_server(self._session, host=server, port=port)
+
+        while not self.stop:
+            await asyncio.sleep(0.1)
+
+        listener.close()
+        await listener.wait_closed()
+
+        # end open sessions by closing their connections
+        for writer in list(self.sessions):
+            writer.close()
+        if self.sessions:
+            await asyncio.gather(*self.sessions.values(), return_exceptions=True)
+
+        if AggregatorService.LOGGER.isEnabledFor(logging.INFO):
+            AggregatorService.LOGGER.info("master: wait for pending tasks")
+        self.engine.shutdown(wait=True)
+
+
+    async def _session(self, reader, writer):
+        if AggregatorService.LOGGER.isEnabledFor(logging.DEBUG):
+            AggregatorService.LOGGER.debug("master: start session")
+
+        self.sessions[writer] = asyncio.current_task()
+
+        # decoded tasks are committed in the order of their arrival
+        tasks = asyncio.Queue(maxsize=self.max_depth)
+        committer = asyncio.ensure_future(self._commit_session(tasks, writer))
+
+        try:
+            while not self.stop:
+                msglen, compact = fave_parse_header(await reader.readexactly(4))
+                data = await reader.readexactly(msglen)
+                if not compact:
+                    data = data.decode('utf8')
+
+                if AggregatorService.LOGGER.isEnabledFor(logging.DEBUG):
+                    lmsg = "master: read data of size %s" % len(data)
+                    AggregatorService.LOGGER.debug(lmsg)
+
+                if self.pool:
+                    task = self.loop.run_in_executor(
+                        self.pool, _decode_task, data, self.model_types
+                    )
+                else:
+                    task = self.loop.create_future()
+                    try:
+                        task.set_result(_decode_task(data, self.model_types))
+                    except Exception as err:
+                        task.set_exception(err)
+
+                await tasks.put((data, task))
+
+        except asyncio.IncompleteReadError as err:
+            if err.partial and AggregatorService.LOGGER.isEnabledFor(logging.WARN):
+                AggregatorService.LOGGER.warn(
+                    "master: session closed with %s bytes of incomplete data",
+                    len(err.partial)
+                )
+
+        except ConnectionError:
+            AggregatorService.LOGGER.exception("master: error while reading session:")
+
+        await tasks.put(None)
+        await committer
+        writer.close()
+        del self.sessions[writer]
+
+        if AggregatorService.LOGGER.isEnabledFor(logging.DEBUG):
+            AggregatorService.LOGGER.debug("master: finished session")
+
+
+    async def _commit_session(self, tasks, writer):
+        # the session's latest update that read-only tasks have to await
+        last = None
+        while True:
+            # all pending tasks are fetched at once so that the mapping can be
+            # planned for their models before any of them is applied
+            batch = [await tasks.get()]
+            while batch[-1] is not None and len(batch) < _PLANNING_BATCH:
+                try:
+                    batch.append(tasks.get_nowait())
+                except asyncio.QueueEmpty:
+                    break
+
+            decoded = []
+            for item in batch:
+                if item is None:
+                    break
+
+                data, task = item
+                try:
+                    decoded.append(await task)
+                except Exception as err:
+                    emsg = 'master: could not parse data: %s' % data
+                    AggregatorService.LOGGER.error(emsg, exc_info=not isinstance(err, ValueError))
+                    await self._reply_error(writer, 'could not parse data: %s' % err)
+
+            models = [model for _j, model, _t in decoded if model is not None]
+            if models:
+                self.depth += 1
+                job = self.loop.run_in_executor(self.engine, self._plan_mapping, models)
+                job.add_done_callback(functools.partial(self._task_done, False))
+
+            # a failing task must not end the session's committer as the
+            # session would block on its full queue
+            for j, model, timings in decoded:
+                try:
+                    job = await self._commit_task(j, model, timings, writer, last)
+                except Exception as err:
+                    AggregatorService.LOGGER.exception("master: could not commit task:")
+                    await self._reply_error(writer, 'could not commit task: %s' % err)
+                    continue
+
+                if job is not None:
+                    last = job
+
+            if batch[-1] is None:
+                break
+
+
+    async def _reply_error(self, writer, error):
+        try:
+            writer.write(fave_frame(json.dumps({'type' : 'error', 'error' : error})))
+            await writer.drain()
+        except ConnectionError:
+            AggregatorService.LOGGER.exception("master: error while replying to session:")
+
+
+    async def _commit_task(self, j, model, timings, writer, last):
+        if j['type'] == 'status':
+            writer.write(fave_frame(json.dumps({
+                'type' : 'status',
+                'queue_depth' : self.depth,
+                'max_depth' : self.max_depth
+            })))
+            await writer.drain()
+            return None
+
+        update = j['type'] not in _READ_ONLY_TASKS
+        if update:
+            await self.slots.acquire()
+            self.depth += 1
+            job = self.loop.run_in_executor(self.engine, self._apply_task, j, model, timings)
+            job.add_done_callback(functools.partial(self._task_done, True))
+
+            if j['type'] == 'stop':
+                await job
+            return job
+
+        # read-only tasks overtake the pending updates of other sessions but
+        # are run once the session's preceding updates are done
+        if last is not None and not last.done():
+            await asyncio.wait([last])
+
+        self.depth += 1
+        if j['type'] in ['query_compliance', 'stats']:
+            query = self._stats if j['type'] == 'stats' else self._query_compliance
+            job = asyncio.wrap_future(
+                self.engine.submit_urgent(self._profile_query, query, j)
+            )
+        else:
+            job = asyncio.wrap_future(
+                self.engine.submit_urgent(self._apply_task, j, model, timings)
+            )
+        job.add_done_callback(functools.partial(self._task_done, False))
+
+        if j['type'] in ['query_compliance', 'stats']:
+            try:
+                writer.write(fave_frame(json.dumps(await job)))
+                await writer.drain()
+            except ConnectionError:
+                AggregatorService.LOGGER.exception("master: error while replying to session:")
+
+        return None
+
+
+    def _task_done(self, update, job):
+        self.depth -= 1
+        if update:
+            self.slots.release()
+        if job.exception() is not None:
+            AggregatorService.LOGGER.error(
+                "worker: task failed", exc_info=job.exception()
+            )
+
+
+    def _profile_query(self, query, j):
+        # statistics requests are not accounted themselves
+        if j['type'] == 'stats':
+            return query(j)
+
+        self.profiler.begin_task(j['type'])
+        reply = query(j)
+        self.profiler.end_task(j['type'])
+        return reply
+
+
+    def _apply_task(self, j, model, timings):
+        t_task_start = time.time()
+
+        if AggregatorService.LOGGER.isEnabledFor(TRACE):
+            AggregatorService.LOGGER.trace('worker: parsed data\n%s' % pformat(j, indent=2))
+
+        self.profiler.begin_task(j['type'])
+        for phase, duration in timings.items():
+            self.profiler.add(phase, duration)
+
+        task_type = self._process_task(j, model)
+
+        # pipelined operations are awaited as soon as no further task is pending
+        if self.depth <= 1 and task_type != 'stop':
+            self.verification_engine.sync()
+
+        self.profiler.end_task(task_type)
+
+        t_task_end = time.time()
+
+        if AggregatorService.LOGGER.isEnabledFor(logging.INFO):
+            emsg = "worker: completed task %s in %s seconds." % (
+                task_type, t_task_end - t_task_start
+            )
+            AggregatorService.LOGGER.info(emsg)
+
+
+    def _enqueue(self, data, conn=None):
+        # upon data receival enqueue (as pending translation if workers are used)
+        # along with the connection to reply to
+        if self.pool and data:
+            self.queue.put((self.pool.submit(_decode_task, data, self.model_types), conn))
+        else:
+            self.queue.put((data, conn))
+        if AggregatorService.LOGGER.isEnabledFor(logging.DEBUG):
+            AggregatorService.LOGGER.debug("master: enqueued data")
+
+
+    def _process_task(self, j, model):
+        """ Applies a decoded task to the verification engine.
+
+        Keyword arguments:
+        j -- the task as JSON object
+        model -- the model reconstructed from the task or None
+
+        Returns:
+        A short description of the task.
+        """
+
+        if j['type'] == 'stop':
+            task_type = 'stop'
+            self.stop_aggr()
+            self.verification_engine.stop()
+
+        elif j['type'] == 'report':
+            task_type = 'report'
+            report = j
+            self.reporter.dump_report(report['file'])
+            self.reporter.mark_compliance()
+            self.reporter.mark_anomalies()
+
+        elif j['type'] == 'check_compliance':
+            task_type = 'check_compliance'
+            self._check_compliance(_compliance_rules_from_json(j['rules']))
+
+        elif j['type'] == 'dump':
+            dump = j
+            odir = dump['dir']
+
+            task_type = "dump %s" % ','.join([k for k in dump if k not in ['type', 'dir']])
+
+            if dump['fave']:
+                self._dump_aggregator(odir)
+            if dump['flows']:
+                self.verification_engine.dump_flows(odir)
+            if dump['network']:
+                self.verification_engine.dump_plumbing_network(odir)
+            if dump['pipes']:
+                self.verification_engine.dump_pipes(odir)
+            if dump['trees']:
+                self.verification_engine.dump_flow_trees(odir, dump['simple'])
+                if dump.get('binary', False):
+                    convert_flow_tree_dumps(odir)
+
+            lock = PreLockedFileLock("%s/.lock" % odir)
+            lock.release()
+
+
+        elif j['type'] == 'plan_mapping':
+            task_type = 'plan_mapping'
+            self.verification_engine.plan_mapping(j['fields'])
+
+        elif j['type'] == 'check_anomalies':
+            task_type = 'check_anomalies'
+            anomalies = self.verification_engine.check_anomalies(
+                use_shadow=j.get('use_shadow', False),
+                use_reach=j.get('use_reach', False),
+                use_general=j.get('use_general', False)
+            )
+            for anomaly in anomalies or []:
+                self.reporter.publish((Log.Anomalies, anomaly['type'], anomaly['rule']))
+
+        else:
+            if model is None:
+                model = self._model_from_json(j)
+            if model.type == 'topology_command':
+                task_type = model.model.type
+            else:
+                task_type = model.type
+
+            # models that do not fit the compacted fields are rejected as a
+            # whole so that the verification engine never holds a partial model
+            try:
+                self.verification_engine.check_model(model)
+            except ValueError as err:
+                AggregatorService.LOGGER.error(
+                    "worker: rejected %s model of %s: %s", task_type, model.node, err
+                )
+                self.rejected.append({
+                    'node' : model.node, 'type' : task_type, 'error' : str(err)
+                })
+                return task_type
+
+            self._sync_diff(model)
+
+        return task_type
+
+
+    def _query_compliance(self, j):
+        """ Checks a set of policy rules for compliance and returns the results.
+
+        Keyword arguments:
+        j -- the query as JSON object
+
+        Returns:
+        The reply as JSON object.
+        """
+
+        t_start = time.time()
+
+        try:
+            results = self._check_compliance(_compliance_rules_from_json(j['rules']))
+        except KeyError as err:
+            return {'type' : 'compliance', 'error' : 'unknown node: %s' % err}
+
+        t_end = time.time()
+
+        if results is None:
+            return {'type' : 'compliance', 'error' : 'no results from verification engine'}
+
+        return {
+            'type' : 'compliance',
+            'results' : results,
+            'violations' : [res for res in results if res['compliant'] is False],
+            'time' : (t_end - t_start) * 1000.0
+        }
+
+
+    def _plan_mapping(self, models):
+        # fields used by upcoming models are added to the mapping at once
+        if models:
+            self.verification_engine.plan_models(models)
+
+
+    def _stats(self, j):
+        """ Returns the profiling statistics collected so far.
+
+        Keyword arguments:
+        j -- the request as JSON object
+
+        Returns:
+        The reply as JSON object.
+        """
+
+        reply = self.profiler.to_json(limit=j.get('limit', 20))
+        reply['type'] = 'stats'
+        reply['rejected'] = list(self.rejected)
+        if j.get('reset', False):
+            self.profiler.reset()
+            self.rejected = []
+
+        return reply
+
+
+    def _check_compliance(self, rules):
+        # violations are published to the reporter
+        results = self.verification_engine.check_compliance(rules)
+        if results is None:
+            return None
+
+        checks = [
+            (dst, src, negated, cond) for dst, src_rules in rules.items() \
+                for src, negated, cond in src_rules
+        ]
+        for (dst, src, negated, cond), result in zip(checks, results):
+            if result['compliant'] is False:
+                self.reporter.publish((
+                    Log.Compliance, negated, src, dst, [(f.name, str(f.value)) for f in cond]
+                ))
+
+        return results
+
+
+    def _reply(self, conn, reply):
+        if conn is None:
+            return
+
+        try:
+            fave_sendmsg(conn, json.dumps(reply))
+        except OSError:
+            AggregatorService.LOGGER.exception("worker: error while replying:")
+
+
     def stop_aggr(self):
         """ Stops FaVe's aggregation service.
         """
@@ -395,8 +984,6 @@ class AggregatorService(AbstractAggregator):
                             links.append(nlink)
                         self.links.setdefault(sport, [])
                         self.links[sport].append(dport)
-                        self.verification_engine.links.setdefault(sportno, [])
-                        self.verification_engine.links[sportno].append(dportno)
 
                         if not bulk:
                             self.verification_engine.add_link(*nlink)
@@ -479,6 +1066,11 @@ class AggregatorService(AbstractAggregator):
             return
 
 
+        if model.node in self.models and model is not self.models[model.node]:
+            # a complete new version of a known device: only apply the changes
+            self._update_model(self.models[model.node], model)
+            return
+
         if model.node in self.models:
             # calculate items to remove and items to add
             add = model - self.models[model.node]
@@ -537,6 +1129,65 @@ class AggregatorService(AbstractAggregator):
         self.verification_engine.delete_tables(model)
 
 
+    def _update_model(self, old, new):
+        with self.profiler.phase('diff'):
+            adds, deletes, updates = new.diff(old)
+
+        if AggregatorService.LOGGER.isEnabledFor(logging.DEBUG):
+            AggregatorService.LOGGER.debug(
+                "worker: update %s: %s (%s added, %s removed, %s updated rules)",
+                new.type,
+                new.node,
+                sum(len(r) for r in adds.values()),
+                sum(len(r) for r in deletes.values()),
+                sum(len(r) for r in updates.values())
+            )
+
+        # an updated rule is replaced as a whole
+        for table, pairs in updates.items():
+            deletes.setdefault(table, []).extend([o for o, _n in pairs])
+            adds.setdefault(table, []).extend([n for _o, n in pairs])
+
+        if deletes:
+            self.verification_engine.delete_rules(
+                AbstractDeviceModel(new.node, mtype=new.type, tables=deletes)
+            )
+
+        # the diff covers rules only, so wiring and tables that the new
+        # version lacks are removed here with the port indexes of the old one
+        new_wiring = set(tuple(w) for w in new.wiring)
+        removed_wiring = [w for w in old.wiring if tuple(w) not in new_wiring]
+        removed_tables = {t : [] for t in old.tables if t not in new.tables}
+
+        if removed_wiring:
+            removed = copy(old)
+            removed.wiring = removed_wiring
+            self.verification_engine.delete_wiring(removed)
+
+        if removed_tables:
+            removed = copy(old)
+            removed.tables = removed_tables
+            self.verification_engine.delete_tables(removed)
+
+        for port in old.ports:
+            if port not in new.ports and self.port_to_model.get(port) is old:
+                del self.port_to_model[port]
+
+        self.verification_engine.add_tables(new)
+        self.verification_engine.add_wiring(new)
+
+        if adds:
+            self.verification_engine.add_rules(
+                AbstractDeviceModel(
+                    new.node, mtype=new.type, tables=adds, ports=new.ports
+                )
+            )
+
+        for port in new.ports:
+            self.port_to_model[port] = new
+        self.models[new.node] = new
+
+
     def _add_model(self, model):
         if AggregatorService.LOGGER.isEnabledFor(logging.DEBUG):
             lmsg = "worker: apply %s: %s" % (model.type, model.node)
@@ -572,18 +1223,17 @@ class AggregatorService(AbstractAggregator):
         with open("%s/fave.json" % odir, "w") as ofile:
             j = {}
             j["mapping"] = self.verification_engine.mapping.to_json()
-            j["id_to_table"] = {self.verification_engine.tables[k]:k for k in self.verification_engine.tables}
+            j["id_to_table"] = dict(self.verification_engine.table_names)
 
-            j["id_to_rule"] = {}
-            for key in self.verification_engine.rule_ids:
-                for elem in self.verification_engine.rule_ids[key]:
-                    j["id_to_rule"][elem] = key >> 12
+            j["id_to_rule"] = {
+                elem : key >> 12 for elem, key in self.verification_engine.node_to_rule.items()
+            }
 
             j["id_to_generator"] = {
                 self.verification_engine.generators[k][1]:k for k in self.verification_engine.generators
             }
             j["id_to_probe"] = {self.verification_engine.probes[k][1]:k for k in self.verification_engine.probes}
-            j["id_to_port"] = {self.verification_engine.ports[k]:k for k in self.verification_engine.ports}
+            j["id_to_port"] = dict(self.verification_engine.port_names)
 
             j["links"] = [(src, dst) for src, dst in self.links.items()]
 
@@ -672,6 +1322,44 @@ def main(argv):
         const=True,
         default=False
     )
+    parser.add_argument(
+        '-w', '--workers',
+        dest='workers',
+        type=int,
+        default=0
+    )
+    parser.add_argument(
+        '-A', '--asyncio',
+        dest='use_asyncio',
+        action='store_const',
+        const=True,
+        default=False
+    )
+    parser.add_argument(
+        '-q', '--queue-depth',
+        dest='queue_depth',
+        type=int,
+        default=1024
+    )
+    parser.add_argument(
+        '-c', '--compact',
+        dest='compact',
+        action='store_const',
+        const=True,
+        default=False
+    )
+    parser.add_argument(
+        '-F', '--fields',
+        dest='fields',
+        type=lambda fields: fields.split(','),
+        default=None
+    )
+    parser.add_argument(
+        '-P', '--profile',
+        dest='profile',
+        type=lambda types: types.split(','),
+        default=None
+    )
 
     args = parser.parse_args(argv)
 
@@ -703,11 +1391,28 @@ def main(argv):
             sys.exit(1)
 
     global AGGREGATOR
-    AGGREGATOR = AggregatorService(socks, asyncore_socks=asyncore_socks, mapping=args.mapping)
+    AGGREGATOR = AggregatorService(
+        socks,
+        asyncore_socks=asyncore_socks,
+        mapping=args.mapping,
+        workers=args.workers,
+        profile=args.profile,
+        compact=args.compact
+    )
+
+    # declared fields are laid out up front in the given order
+    if args.fields:
+        AGGREGATOR.verification_engine.plan_mapping(args.fields)
 
     register_signals()
 
-    if args.use_unix:
+    if args.use_asyncio and args.use_unix:
+        AGGREGATOR.run_async(FAVE_DEFAULT_UNIX, max_depth=args.queue_depth)
+    elif args.use_asyncio:
+        AGGREGATOR.run_async(
+            args.fave_addr, port=args.fave_port, max_depth=args.queue_depth
+        )
+    elif args.use_unix:
         AGGREGATOR.run(FAVE_DEFAULT_UNIX)
     else:
         AGGREGATOR.run(args.fave_addr, port=args.fave_port)
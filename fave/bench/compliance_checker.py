@@ -21,9 +21,11 @@
 
 import argparse
 import json
+import sys
 
 
 from util.aggregator_utils import connect_to_fave, fave_sendmsg
+from util.aggregator_utils import fave_recvmsg, fave_loads
 from util.aggregator_utils import FAVE_DEFAULT_UNIX, FAVE_DEFAULT_IP, FAVE_DEFAULT_PORT
 from util.match_util import OXM_FIELD_TO_MATCH_FIELD
 
@@ -49,6 +51,30 @@ def _parse_check(check):
     return (src, dst, negated, cond)
 
 
+def _print_results(reply):
+    if 'error' in reply:
+        print("compliance query failed: %s" % reply['error'], file=sys.stderr)
+        return 1
+
+    for violation in reply['violations']:
+        print("violation: %s %s %s" % (
+            violation['src'],
+            "reaches" if violation['negated'] else "does not reach",
+            violation['dst']
+        ))
+
+    times = sorted(res['time'] for res in reply['results'] if res['time'] is not None)
+    print("checked %s rules with %s violations in %s ms" % (
+        len(reply['results']), len(reply['violations']), reply['time']
+    ))
+    if times:
+        print("per check: min %s ms, median %s ms, max %s ms" % (
+            times[0], times[len(times) // 2], times[-1]
+        ))
+
+    return 0
+
+
 if __name__ == '__main__':
     parser = argparse.ArgumentParser()
     parser.add_argument('checks_file')
@@ -59,6 +85,18 @@ if __name__ == '__main__':
         const=True,
         default=False
     )
+    parser.add_argument(
+        '-q', '--query',
+        dest='query',
+        action='store_const',
+        const=True,
+        default=False
+    )
+    parser.add_argument(
+        '-o', '--output',
+        dest='output',
+        default=None
+    )
 
 
     args = parser.parse_args()
@@ -85,8 +123,21 @@ if __name__ == '__main__':
 
     fave.setblocking(1)
 
+    # queries are answered on the same connection
     fave_sendmsg(
-        fave, json.dumps({'type' : 'check_compliance', 'rules' : rules})
+        fave, json.dumps({
+            'type' : 'query_compliance' if args.query else 'check_compliance',
+            'rules' : rules
+        })
     )
 
+    ret = 0
+    if args.query:
+        reply = fave_loads(fave_recvmsg(fave))
+        if args.output:
+            with open(args.output, 'w') as ofile:
+                json.dump(reply, ofile, indent=2)
+        ret = _print_results(reply)
+
     fave.close()
+    sys.exit(ret)
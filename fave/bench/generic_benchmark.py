@@ -25,8 +25,10 @@
 import os
 import os.path
 import sys
+import time
 import logging
 import json
+import resource
 
 import netplumber.dump_np as dumper
 
@@ -36,11 +38,67 @@ from util.aggregator_utils import FAVE_DEFAULT_UNIX, FAVE_DEFAULT_IP, FAVE_DEFAU
 
 TMPDIR = "/dev/shm/np"
 
+# the environment variable naming the file to write phase measurements to
+RESULTS_ENV = "FAVE_BENCH_RESULTS"
+
+# the processes started by the benchmark that keep running in the background
+_SERVICES = ['net_plumber', 'aggregator/aggregator_service.py']
+
 
 def _unpack(topo):
     return topo['devices'], topo['links']
 
 
+def _read_rss(pid):
+    # the resident set size in KiB or 0 if the process is gone
+    try:
+        with open("/proc/%s/status" % pid, 'r') as status:
+            for line in status:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return 0
+
+
+def _service_usage():
+    """ Samples the CPU time and memory of the running FaVe services.
+
+    Returns:
+    A dict mapping process ids to pairs of CPU seconds and RSS in KiB.
+    """
+
+    ticks = os.sysconf('SC_CLK_TCK')
+    usage = {}
+    for pid in [p for p in os.listdir('/proc') if p.isdigit()]:
+        try:
+            with open("/proc/%s/cmdline" % pid, 'rb') as cmdline:
+                cmd = cmdline.read().replace(b'\0', b' ').decode('utf8', 'replace')
+            if not any(service in cmd for service in _SERVICES):
+                continue
+
+            with open("/proc/%s/stat" % pid, 'r') as stat:
+                # fields after the command which may contain spaces
+                fields = stat.read().rsplit(')', 1)[1].split()
+        except OSError:
+            continue
+
+        utime, stime = int(fields[11]), int(fields[12])
+        usage[pid] = ((utime + stime) / float(ticks), _read_rss(pid))
+
+    return usage
+
+
+def _own_cpu():
+    # the CPU time of the benchmark and its finished child processes
+    return sum(
+        ru.ru_utime + ru.ru_stime for ru in [
+            resource.getrusage(resource.RUSAGE_SELF),
+            resource.getrusage(resource.RUSAGE_CHILDREN)
+        ]
+    )
+
+
 class GenericBenchmark(object):
     """ This class provides a canonical benchmark and can be customized by sub classes.
     """
@@ -115,6 +173,9 @@ class GenericBenchmark(object):
 
         self.anomalies = anomalies if anomalies is not None else {}
 
+        self.phases = []
+        self._services = {}
+
     def _pre_preparation(self):
         pass
 
@@ -273,7 +334,7 @@ class GenericBenchmark(object):
 #        os.system("bash scripts/check_parallel.sh %s %s %s" % (
 #            self.files['checks'], self.threads, "np_dump"
 #        ))
-        os.system("python3 bench/compliance_checker.py %s %s" % (
+        os.system("python3 bench/compliance_checker.py -q %s %s" % (
             "-u" if self.use_unix else "",
             self.files['checks']
         ))
@@ -303,19 +364,65 @@ class GenericBenchmark(object):
         self.logger.info("report generated.")
 
 
+    def _phase(self, name, func):
+        """ Runs a benchmark phase and records its resource usage.
+
+        The CPU time covers the benchmark, its finished child processes and
+        the FaVe services. Service CPU time spent after a service's last
+        sample while it exits is not accounted.
+
+        Arguments:
+        name -- the phase's name
+        func -- a function running the phase
+        """
+
+        t_start = time.time()
+        cpu_start = _own_cpu()
+
+        func()
+
+        t_end = time.time()
+        cpu_end = _own_cpu()
+
+        services = _service_usage()
+        service_cpu = sum(
+            cpu - self._services.get(pid, (0.0, 0))[0] for pid, (cpu, _rss) in services.items()
+        )
+        self._services.update(services)
+
+        self.phases.append({
+            'phase' : name,
+            'wall' : t_end - t_start,
+            'cpu' : cpu_end - cpu_start,
+            'service_cpu' : service_cpu,
+            'rss' : _read_rss(os.getpid()),
+            'service_rss' : sum(rss for _cpu, rss in services.values())
+        })
+
+
     def run(self):
         """ Runs the benchmark.
+
+        The per-phase measurements are written as JSON to the file named by the
+        FAVE_BENCH_RESULTS environment variable if it is set.
         """
 
-        self._pre_preparation()
-        self._preparation()
-        self._post_preparation()
-        self._startup()
-        self._initialization()
-        self._reachability()
-        self._compliance()
-        self._anomalies()
-        self._report()
-        if self.use_dump: self._dump_fave()
-        else: self._wait_for_fave()
-        self._teardown()
+        self.phases = []
+        self._services = {}
+
+        self._phase('pre_preparation', self._pre_preparation)
+        self._phase('preparation', self._preparation)
+        self._phase('post_preparation', self._post_preparation)
+        self._phase('startup', self._startup)
+        self._phase('initialization', self._initialization)
+        self._phase('reachability', self._reachability)
+        self._phase('compliance', self._compliance)
+        self._phase('anomalies', self._anomalies)
+        self._phase('report', self._report)
+        if self.use_dump: self._phase('dump', self._dump_fave)
+        else: self._phase('wait', self._wait_for_fave)
+        self._phase('teardown', self._teardown)
+
+        if os.environ.get(RESULTS_ENV):
+            with open(os.environ[RESULTS_ENV], 'w') as results:
+                json.dump(self.phases, results, indent=2)
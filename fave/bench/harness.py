@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+
+# -*- coding: utf-8 -*-
+
+# Copyright 2021 Claas Lorenz <claas_lorenz@genua.de>
+
+# This file is part of FaVe.
+
+# FaVe is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# FaVe is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with FaVe.  If not, see <https://www.gnu.org/licenses/>.
+
+""" This module runs benchmarks repeatedly and records machine-readable
+    measurements.
+
+    Every run executes a workload script, e.g., bench/wl_up/benchmark.py, as
+    managed subprocess that records the wall time, CPU time and memory usage of
+    its phases. The harness adds the totals of each run and summarizes all
+    measurements with their means and 95% confidence intervals in a JSON and a
+    CSV file so that results can be compared across commits.
+"""
+
+import os
+import sys
+import csv
+import json
+import time
+import argparse
+import tempfile
+import subprocess
+
+from bench.generic_benchmark import RESULTS_ENV
+from util.stats_util import summarize
+
+
+# the measurements of a phase
+METRICS = ['wall', 'cpu', 'service_cpu', 'rss', 'service_rss']
+
+
+def _git_commit():
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', 'HEAD'], stderr=subprocess.DEVNULL
+        ).decode('utf8').strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_once(workload, args, log_dir=None):
+    """ Runs a workload once and collects its measurements.
+
+    Arguments:
+    workload -- the path of the workload script
+    args -- a list of the script's arguments
+
+    Keyword arguments:
+    log_dir -- a directory to store the run's stdout and stderr (default: None)
+
+    Returns:
+    A pair of the run's total and a list of its phases' measurements.
+    """
+
+    with tempfile.NamedTemporaryFile(suffix='.json') as results:
+        env = dict(os.environ)
+        env[RESULTS_ENV] = results.name
+
+        stdout = stderr = subprocess.DEVNULL
+        if log_dir:
+            stdout = open(os.path.join(log_dir, 'stdout.log'), 'w')
+            stderr = open(os.path.join(log_dir, 'stderr.log'), 'w')
+
+        t_start = time.time()
+        proc = subprocess.Popen(
+            [sys.executable, workload] + args, env=env, stdout=stdout, stderr=stderr
+        )
+        # the process is reaped by wait4() to obtain its resource usage
+        _pid, status, rusage = os.wait4(proc.pid, 0)
+        t_end = time.time()
+        proc.returncode = os.waitstatus_to_exitcode(status)
+
+        if log_dir:
+            stdout.close()
+            stderr.close()
+
+        if proc.returncode != 0:
+            raise RuntimeError(
+                "workload %s failed with exit code %s" % (workload, proc.returncode)
+            )
+
+        phases = json.load(open(results.name, 'r'))
+
+    total = {
+        'phase' : 'total',
+        'wall' : t_end - t_start,
+        'cpu' : rusage.ru_utime + rusage.ru_stime,
+        'service_cpu' : sum(p['service_cpu'] for p in phases),
+        'rss' : rusage.ru_maxrss,
+        'service_rss' : max([p['service_rss'] for p in phases] + [0])
+    }
+
+    return total, phases
+
+
+def run_benchmark(workload, args, warmups=1, repetitions=10, log_dir=None):
+    """ Runs a workload repeatedly.
+
+    Arguments:
+    workload -- the path of the workload script
+    args -- a list of the script's arguments
+
+    Keyword arguments:
+    warmups -- the number of runs that are not measured (default: 1)
+    repetitions -- the number of measured runs (default: 10)
+    log_dir -- a directory to store the runs' outputs (default: None)
+
+    Returns:
+    The results as JSON object.
+    """
+
+    runs = []
+    for run in range(-warmups, repetitions):
+        # warm-up runs are numbered negatively
+        warmup = run < 0
+        run_dir = None
+        if log_dir:
+            run_dir = os.path.join(log_dir, "w%d" % -run if warmup else str(run))
+            os.makedirs(run_dir, exist_ok=True)
+
+        print(
+            "%s %d: %s... " % ("warm-up" if warmup else "run", abs(run), workload),
+            end='', file=sys.stderr, flush=True
+        )
+        total, phases = run_once(workload, args, log_dir=run_dir)
+        print("%.3f s" % total['wall'], file=sys.stderr)
+
+        if not warmup:
+            for phase in phases + [total]:
+                phase['run'] = run
+                runs.append(phase)
+
+    names = []
+    for phase in runs:
+        if phase['phase'] not in names:
+            names.append(phase['phase'])
+
+    summary = {
+        name : {
+            metric : summarize(
+                [p[metric] for p in runs if p['phase'] == name]
+            ) for metric in METRICS
+        } for name in names
+    }
+
+    return {
+        'workload' : workload,
+        'args' : args,
+        'commit' : _git_commit(),
+        'timestamp' : time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'warmups' : warmups,
+        'repetitions' : repetitions,
+        'units' : {
+            'wall' : 's', 'cpu' : 's', 'service_cpu' : 's', 'rss' : 'KiB', 'service_rss' : 'KiB'
+        },
+        'runs' : runs,
+        'summary' : summary
+    }
+
+
+def write_results(results, prefix):
+    """ Writes results to <prefix>.json and the runs to <prefix>.csv.
+
+    Arguments:
+    results -- the results as returned by run_benchmark()
+    prefix -- the path prefix of the output files
+    """
+
+    with open(prefix + '.json', 'w') as ofile:
+        json.dump(results, ofile, indent=2)
+
+    with open(prefix + '.csv', 'w', newline='') as ofile:
+        writer = csv.DictWriter(ofile, fieldnames=['commit', 'run', 'phase'] + METRICS)
+        writer.writeheader()
+        for phase in results['runs']:
+            row = {k : phase[k] for k in ['run', 'phase'] + METRICS}
+            row['commit'] = results['commit']
+            writer.writerow(row)
+
+
+def main(argv):
+    """ Main method.
+    """
+
+    parser = argparse.ArgumentParser(
+        description="run a workload script repeatedly, e.g., %(prog)s -n 10 bench/wl_up/benchmark.py"
+    )
+    parser.add_argument(
+        '-w', '--warmups',
+        dest='warmups',
+        type=int,
+        default=1
+    )
+    parser.add_argument(
+        '-n', '--repetitions',
+        dest='repetitions',
+        type=int,
+        default=10
+    )
+    parser.add_argument(
+        '-o', '--output',
+        dest='output',
+        default='bench_results'
+    )
+    parser.add_argument(
+        '-l', '--log-dir',
+        dest='log_dir',
+        default=None
+    )
+    parser.add_argument('workload')
+    parser.add_argument('args', nargs=argparse.REMAINDER)
+
+    args = parser.parse_args(argv)
+
+    results = run_benchmark(
+        args.workload,
+        args.args,
+        warmups=args.warmups,
+        repetitions=args.repetitions,
+        log_dir=args.log_dir
+    )
+    write_results(results, args.output)
+
+    for name, metrics in results['summary'].items():
+        wall = metrics['wall']
+        print("%s: %.3f s (95%% CI %.3f - %.3f s)" % (
+            name, wall['mean'], wall['ci_low'], wall['ci_high']
+        ))
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -19,64 +19,174 @@
 # You should have received a copy of the GNU General Public License
 # along with FaVe.  If not, see <https://www.gnu.org/licenses/>.
 
-import time
-import sys
-
-from ip6np.parser import ASTParser as ANTLR
-from misc.pyparsing_test import ASTParser as PYPARSING
-from models.iptables.pybison_singleton import PARSER as PYBISON
-from functools import reduce
-
-RULESET_FILE = 'bench/wl_up/rulesets/pgf.uni-potsdam.de-ruleset'
-
-ROUND = lambda x: round(x, 4)
-
-PARSERS = {
-    'antlr' : ANTLR,
-    'pyparsing' : PYPARSING(),
-    'pybison' : PYBISON()
-}
-
-with open(RULESET_FILE, 'r') as rsf:
-    ruleset = rsf.read()
-    csv = []
-
-    for pname in ['antlr', 'pyparsing', 'pybison']:
-        parser = PARSERS[pname]
-        meas = []
-
-        print('\n%10s -' % pname, end=' ')
-        sys.stdout.flush()
+""" This module compares the ip6tables parser backends.
 
-        for i in range(10):
-            start = time.time()
+    Every backend parses a rule set repeatedly. Optionally, the rule set is
+    scaled up to a given number of lines by repeating its rules so that the
+    backends' growth can be compared as well. The summaries are written to
+    parsers.csv.
+"""
 
-            if pname == 'pybison':
-                parser.parse(RULESET_FILE)
-            else:
-                parser.parse(ruleset)
-
-            end = time.time()
-            dur = end - start
-
-            meas.append(dur)
-            print(i, end=' ')
-            sys.stdout.flush()
-
-        print('')
-
-        mean = ROUND(reduce(lambda x, y: x + y, meas)/len(meas))
-        median = ROUND(sorted(meas)[len(meas)/2])
-
-        minimum = ROUND(min(meas))
-        maximum = ROUND(max(meas))
-
-        print('%10s - mean: %ss, median: %ss, min: %ss, max: %ss' % (
-            pname, mean, median, minimum, maximum
-        ))
-        csv.append((pname, mean, median, minimum, maximum))
-
-    with open('parsers.csv', 'w') as csvf:
-        csvf.write(
-            '\n'.join([','.join([str(i) for i in line]) for line in csv]) + '\n'
-        )
+import os
+import sys
+import csv
+import time
+import argparse
+import tempfile
+
+from util.stats_util import summarize
+
+
+RULESET_FILE = 'bench/wl_tum/rulesets/tum6-ruleset'
+
+BACKENDS = ['bison', 'line']
+
+
+def _load_backend(name):
+    if name == 'bison':
+        from iptables.parser import IP6TablesParser
+        return IP6TablesParser()
+    elif name == 'line':
+        from iptables.line_parser import IP6TablesLineParser
+        return IP6TablesLineParser()
+
+    raise ValueError("unknown parser backend: %s" % name)
+
+
+def scale_ruleset(ruleset, lines, target):
+    """ Scales a rule set up to a number of lines by repeating its rules.
+
+    Arguments:
+    ruleset -- the path of the rule set
+    lines -- the number of lines of the scaled rule set
+    target -- a file object to write the scaled rule set to
+    """
+
+    with open(ruleset, 'r') as rsf:
+        content = rsf.read().splitlines()
+
+    rules = [line for line in content if ' -A ' in line or line.startswith('-A ')]
+    if not rules:
+        raise ValueError("rule set without rules: %s" % ruleset)
+
+    written = 0
+    for line in content:
+        if written == lines:
+            break
+        target.write(line + '\n')
+        written += 1
+
+    while written < lines:
+        target.write(rules[written % len(rules)] + '\n')
+        written += 1
+
+    target.flush()
+
+
+def measure(parser, ruleset, rounds):
+    """ Measures the time a parser needs for a rule set.
+
+    Arguments:
+    parser -- the parser
+    ruleset -- the path of the rule set
+    rounds -- the number of measurements
+
+    Returns:
+    A list of the durations in seconds.
+    """
+
+    meas = []
+    for _ in range(rounds):
+        start = time.time()
+        parser.parse(ruleset)
+        meas.append(time.time() - start)
+
+    return meas
+
+
+def main(argv):
+    """ Main method.
+    """
+
+    parser = argparse.ArgumentParser(
+        description="compare the ip6tables parser backends, e.g., %(prog)s -s 10000 100000"
+    )
+    parser.add_argument(
+        '-r', '--ruleset',
+        dest='ruleset',
+        default=RULESET_FILE
+    )
+    parser.add_argument(
+        '-n', '--rounds',
+        dest='rounds',
+        type=int,
+        default=10
+    )
+    parser.add_argument(
+        '-b', '--backends',
+        dest='backends',
+        nargs='+',
+        default=BACKENDS
+    )
+    parser.add_argument(
+        '-s', '--sizes',
+        dest='sizes',
+        type=int,
+        nargs='+',
+        default=[]
+    )
+    parser.add_argument(
+        '-o', '--output',
+        dest='output',
+        default='parsers.csv'
+    )
+
+    args = parser.parse_args(argv)
+
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        rulesets = [(None, args.ruleset)]
+        for size in args.sizes:
+            scaled = os.path.join(tmp, 'ruleset-%s' % size)
+            with open(scaled, 'w') as target:
+                scale_ruleset(args.ruleset, size, target)
+            rulesets.append((size, scaled))
+
+        for pname in args.backends:
+            try:
+                backend = _load_backend(pname)
+            except ImportError as err:
+                print('%10s - skipped: %s' % (pname, err))
+                continue
+
+            for size, ruleset in rulesets:
+                summary = summarize(measure(backend, ruleset, args.rounds))
+
+                print('%10s - %s lines - mean: %.4fs, median: %.4fs, min: %.4fs, max: %.4fs' % (
+                    pname,
+                    size if size is not None else 'all',
+                    summary['mean'],
+                    summary['median'],
+                    summary['min'],
+                    summary['max']
+                ))
+                sys.stdout.flush()
+
+                rows.append([
+                    pname, size if size is not None else ''
+                ] + [summary[key] for key in [
+                    'mean', 'median', 'stddev', 'min', 'max', 'ci_low', 'ci_high'
+                ]])
+
+    with open(args.output, 'w') as csvf:
+        writer = csv.writer(csvf)
+        writer.writerow([
+            'backend', 'lines', 'mean', 'median', 'stddev', 'min', 'max', 'ci_low', 'ci_high'
+        ])
+        writer.writerows(rows)
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -26,6 +26,25 @@ import json
 from util.collections_util import list_sub, dict_sub
 
 
+def _rule_idx(rule):
+    return rule["idx"] if isinstance(rule, dict) else rule.idx
+
+
+def _rule_changed(new, old):
+    if new is old:
+        return False
+
+    # JSON rules are equal if and only if their canonical strings are
+    if isinstance(new, dict) or isinstance(old, dict):
+        return json.dumps(new, sort_keys=True) != json.dumps(old, sort_keys=True)
+
+    # different hashes prove a change while equal hashes have to be confirmed
+    # as the hash omits the input ports and the raw rule
+    if hash(new) != hash(old):
+        return True
+    return new != old
+
+
 class AbstractDeviceModel(object):
     """ This class stores a basic model for a node.
     """
@@ -207,6 +226,46 @@ class AbstractDeviceModel(object):
         )
 
 
+    def diff(self, other):
+        """ Calculates the rule changes from a previous version of the model.
+
+        Rules are identified by their table and index. Rules with the same
+        identifier that differ in both versions are considered as updated. The
+        rules of removed tables are reported as removed while the tables, ports
+        and wiring themselves are not compared.
+
+        Keyword arguments:
+        other -- the previous version of the model
+
+        Returns:
+        A triple of dicts that map table names to lists of added rules, removed
+        rules, and (old rule, new rule) pairs of updated rules.
+        """
+
+        assert self.node == other.node
+
+        adds = {}
+        deletes = {}
+        updates = {}
+
+        for tab in set(self.tables) | set(other.tables):
+            new_rules = {_rule_idx(r) : r for r in self.tables.get(tab, [])}
+            old_rules = {_rule_idx(r) : r for r in other.tables.get(tab, [])}
+
+            added = [r for idx, r in new_rules.items() if idx not in old_rules]
+            removed = [r for idx, r in old_rules.items() if idx not in new_rules]
+            updated = [
+                (old_rules[idx], r) for idx, r in new_rules.items() if idx in old_rules and \
+                    _rule_changed(r, old_rules[idx])
+            ]
+
+            if added: adds[tab] = added
+            if removed: deletes[tab] = removed
+            if updated: updates[tab] = updated
+
+        return adds, deletes, updates
+
+
     def __eq__(self, other):
         assert isinstance(other, AbstractDeviceModel)
 
@@ -23,7 +23,7 @@
     fields, rules and packet filter models.
 """
 
-from copy import copy, deepcopy
+from copy import copy
 
 from devices.abstract_device import AbstractDeviceModel
 
@@ -144,29 +144,44 @@ class AbstractFirewallModel(AbstractDeviceModel):
                 action.ports = [self.node+".routing_out"]
 
 
+            # the derived rules share the fields which are never modified
+            out_ports = [RuleField.shared("out_port", port) for port in output_ports]
+
             # first, forward traffic that already has the destination and output
             # ports set correctly (via a filtering rule set)
-            rule_exact = deepcopy(rule)
-            rule_exact.idx = _BASE_ROUTING_EXACT + idx
-            rule_exact.match.extend([RuleField("out_port", port) for port in output_ports])
+            rule_exact = Rule(
+                rule.node,
+                self.node+".routing",
+                _BASE_ROUTING_EXACT + idx,
+                in_ports=[self.node+'.routing_in'],
+                match=Match(rule.match + out_ports),
+                actions=list(rule.actions),
+                raw_line_no=rule.raw_line_no,
+                raw_line=rule.raw_line
+            )
 
 
             # second, drop traffic that has an incorrect destination set for an
             # output port
-            rule_wrong_io = deepcopy(rule)
-            rule_wrong_io.idx = _BASE_ROUTING_WRONG_IO + idx
-            rule_wrong_io.match.filter("packet.ipv6.destination")
-            rule_wrong_io.match.extend([RuleField("out_port", port) for port in output_ports])
-            rule_wrong_io.actions = []
+            rule_wrong_io = Rule(
+                rule.node,
+                self.node+".routing",
+                _BASE_ROUTING_WRONG_IO + idx,
+                in_ports=[self.node+'.routing_in'],
+                match=Match([
+                    f for f in rule.match if f.name != "packet.ipv6.destination"
+                ] + out_ports),
+                actions=[],
+                raw_line_no=rule.raw_line_no,
+                raw_line=rule.raw_line
+            )
 
 
             # third, forward traffic with the destination set
-            rewrites = [Rewrite(rewrite=[RuleField("out_port", port) for port in output_ports])]
+            rewrites = [Rewrite(rewrite=list(out_ports))]
             rule.idx = _BASE_ROUTING_RULE + idx
             rule.actions.extend(rewrites)
 
-            rule_exact.tid = self.node+".routing"
-            rule_wrong_io.tid = self.node+".routing"
             rule.tid = self.node+".routing"
 
             exact_rules.append(rule_exact)
@@ -353,7 +353,7 @@ def _derive_general_state_shell(rules, state_checking_rules):
             actions=r.actions,
             raw_line_no=r.raw_line_no,
             raw_line=r.raw_line
-        ) for r in rules if r not in list(state_checking_rules.values())
+        ) for r in rules if r.idx not in state_checking_rules
     ]
 
 
@@ -383,9 +383,10 @@ def _calculate_blocks(rules, intervals):
             if start >= rule.idx or rule.idx >= end:
                 break
 
-            match = Match(dc(rule.match) + [
+            # the fields are shared with the original rule which is dropped
+            match = Match(list(rule.match) + [
                 RuleField('related', '0')
-            ]) if _is_new_state_rule(rule) else dc(rule.match)
+            ]) if _is_new_state_rule(rule) else Match(list(rule.match))
 
             block.append(Rule(
                 rule.node,
@@ -428,15 +429,31 @@ def _adjust_ports(ports, chain):
 
 def _adjust_action(action, chain):
     if isinstance(action, Forward):
-        action.ports = _adjust_ports(action.ports, chain)
-    return action
+        return Forward(_adjust_ports(action.ports, chain))
+    return dc(action)
+
+
+def _match_key(match):
+    return frozenset((f.name, str(f.value), f.negated) for f in match)
+
+
+def _is_shadowed(match_key, previous_keys):
+    # a shell is unreachable if an earlier shell was derived from a state
+    # checking rule with less constraints
+    return any(key <= match_key for key in previous_keys)
 
 
 def _derive_conditional_state_shells(
-        intervals, general_state_shell, state_checking_rules, rules_size, chain
+        intervals, general_state_shell, state_checking_rules, rules_size, chain,
+        shared_shells=False
     ):
     cond_shells = []
 
+    # intersections of a general shell rule with equal state checking rules
+    # are calculated only once and empty intersections are never copied
+    intersections = {}
+    previous_keys = []
+
     for idx, _start, end in intervals:
         if end in state_checking_rules:
             state_checking_rule = state_checking_rules[end]
@@ -444,30 +461,47 @@ def _derive_conditional_state_shells(
             break
         cond_shell = []
 
-        for rule in general_state_shell:
+        match_key = _match_key(state_checking_rule.match)
+        if shared_shells and _is_shadowed(match_key, previous_keys):
+            cond_shells.append(cond_shell)
+            continue
+        previous_keys.append(match_key)
+
+        is_drop = state_checking_rule.actions[0].ports == []
+
+        for pos, rule in enumerate(general_state_shell):
+            try:
+                isect = intersections[(pos, match_key)]
+            except KeyError:
+                isect = rule.match.intersect(state_checking_rule.match)
+                if any(f.value is None for f in isect):
+                    isect = None
+                intersections[(pos, match_key)] = isect
+
+            if isect is None:
+                continue
 
             match = _adjust_interfaces(
-                dc(rule.match.intersect(state_checking_rule.match)),
+                Match([RuleField(f.name, f.value, f.negated) for f in isect]),
                 chain
             )
 
             in_ports = _adjust_ports(rule.in_ports, chain)
 
-            if not any([f.value is None for f in match]):
-                actions = [
-                    Forward([])
-                ] if state_checking_rule.actions[0].ports == [] else [
-                    _adjust_action(dc(a), chain) for a in rule.actions
-                ]
-
-                cond_shell.append(Rule(
-                    rule.node,
-                    rule.node+'.'+chain,
-                    (2*idx+1)*rules_size+rule.idx,
-                    in_ports=in_ports,
-                    match=match,
-                    actions=actions
-                ))
+            actions = [
+                Forward([])
+            ] if is_drop else [
+                _adjust_action(a, chain) for a in rule.actions
+            ]
+
+            cond_shell.append(Rule(
+                rule.node,
+                rule.node+'.'+chain,
+                (2*idx+1)*rules_size+rule.idx,
+                in_ports=in_ports,
+                match=match,
+                actions=actions
+            ))
 
         cond_shells.append(cond_shell)
 
@@ -526,7 +560,8 @@ def _transform_ast_to_model(
         address=None,
         interweaving=True,
         state_snap=False,
-        store_mappings=False
+        store_mappings=False,
+        shared_shells=False
     ):
 
     if state_snap:
@@ -585,7 +620,8 @@ def _transform_ast_to_model(
             chain_general_shells[_SWAP_CHAIN[chain]],
             chain_checking_rules[chain],
             len(chain_rules[chain]),
-            chain
+            chain,
+            shared_shells=shared_shells
         )
         chain_cond_shells[chain] = conditional_state_shells
 
@@ -603,7 +639,7 @@ def _transform_ast_to_model(
     return model
 
 
-def generate(ast, node, address, ports, interweaving=True, state_snap=False):
+def generate(ast, node, address, ports, interweaving=True, state_snap=False, shared_shells=False):
     """ Generates a packet filter model from a rule set AST.
 
     Keyword arguments:
@@ -611,6 +647,9 @@ def generate(ast, node, address, ports, interweaving=True, state_snap=False):
     node -- the node's name
     address -- the node's address
     ports -- the node's physical interfaces
+    interweaving -- interweave the state shells with the rules (default: True)
+    state_snap -- generate a snapshot packet filter (default: False)
+    shared_shells -- omit state shells that are covered by an earlier one (default: False)
     """
 
     # transform AST to basic model
@@ -621,7 +660,8 @@ def generate(ast, node, address, ports, interweaving=True, state_snap=False):
         address=address,
         interweaving=interweaving,
         state_snap=state_snap,
-        store_mappings=False
+        store_mappings=False,
+        shared_shells=shared_shells
     )
 
     return model
@@ -0,0 +1,277 @@
+#!/usr/bin/env python3
+
+# -*- coding: utf-8 -*-
+
+# Copyright 2020 Claas Lorenz <claas_lorenz@genua.de>
+
+# This file is part of FaVe.
+
+# FaVe is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# FaVe is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with FaVe.  If not, see <https://www.gnu.org/licenses/>.
+
+""" This module provides a line-oriented parser for ip6tables rule sets which
+    yields the same AST as the Bison-based parser without compiling a grammar.
+
+    Besides ip6tables command lines, the parser reads ip6tables-save output
+    by treating its rules as if they were given as commands for the current
+    table.
+"""
+
+import gc
+import re
+import sys
+
+from util.tree_util import Tree
+
+# the token and value patterns are compiled once per process
+_TOKENS = re.compile(r'"[ -~]*"|[^ \t"]+')
+_POLICY = re.compile(r'([ \t]+)')
+_ARG = re.compile(r'-[A-Za-z]$|--[A-Za-z][A-Za-z0-9_\-]+$')
+_FLAG = '(SYN|ACK|FIN|RST|URG|PSH|ALL|NONE)'
+_FLAGS = re.compile(r'%s(,%s)*$' % (_FLAG, _FLAG))
+
+# arguments that are normalized to their short form
+_NORMALIZED = {
+    '-s' : '-s', '--source' : '-s',
+    '-d' : '-d', '--destination' : '-d',
+    '-i' : '-i', '--in-interface' : '-i',
+    '-o' : '-o', '--out-interface' : '-o'
+}
+
+# tokens that are not allowed as arguments
+_RESERVED = frozenset(['-A', '-P', '-t', '-j', '--jump'])
+
+_IPT = frozenset(['ip6tables', 'iptables'])
+_ACTIONS = frozenset(['ACCEPT', 'DROP'])
+
+
+class IP6TablesLineParser(object):
+    """ This class provides a line-oriented ip6tables parser.
+    """
+
+    def __init__(self):
+        self._linecount = 1
+        self._table = 'filter'
+
+
+    def parse(self, ruleset):
+        """ Retrieve an AST for an ip6tables rule set.
+
+        Keyword arguments:
+        ruleset - a file name containing an ip6tables rule set
+        """
+
+        with open(ruleset, 'r') as rsf:
+            return self.parse_lines(rsf)
+
+
+    def parse_string(self, ruleset):
+        """ Retrieve an AST for an ip6tables rule set given as string.
+
+        Keyword arguments:
+        ruleset - an ip6tables rule set
+        """
+
+        return self.parse_lines(ruleset.splitlines())
+
+
+    def parse_lines(self, lines):
+        """ Retrieve an AST for an ip6tables rule set given line by line.
+
+        Keyword arguments:
+        lines - an iterable of lines of an ip6tables rule set
+        """
+
+        self._linecount = 1
+        self._table = 'filter'
+
+        # the AST only grows, so collecting garbage meanwhile is futile
+        gc_enabled = gc.isenabled()
+        gc.disable()
+
+        ast = Tree('root')
+        try:
+            for lineno, line in enumerate(lines, start=1):
+                line = line.rstrip('\r\n')
+                try:
+                    tree = self._parse_line(line)
+                except (IndexError, ValueError) as err:
+                    raise ValueError("line %s: %s: %s" % (lineno, err, line))
+
+                if tree is not None:
+                    ast.add_child(tree)
+        finally:
+            if gc_enabled:
+                gc.enable()
+
+        return ast
+
+
+    def _parse_line(self, line):
+        head = line[:1]
+
+        if not line.strip():
+            return None
+
+        # comments and the structure of ip6tables-save output are skipped
+        if head in ['#', '*', ':'] or line == 'COMMIT':
+            if head == '*':
+                self._table = line[1:].strip()
+            elif head == ':':
+                chain, policy = line[1:].split()[:2]
+                if policy != '-':
+                    return self._parse_policy(
+                        "ip6tables -t %s -P %s %s" % (self._table, chain, policy)
+                    )
+            self._linecount += 1
+            return None
+
+        if head == '-':
+            line = "ip6tables -t %s %s" % (self._table, line)
+
+        tokens = _TOKENS.findall(line)
+        if tokens[0] not in _IPT:
+            raise ValueError("unexpected command %s" % tokens[0])
+
+        if tokens[1] == '-P' or (tokens[1] == '-t' and tokens[3] == '-P'):
+            return self._parse_policy(line)
+
+        pos = 1
+        table = None
+        if tokens[pos] == '-t':
+            table = Tree('-t')
+            table.add_child(tokens[pos+1])
+            pos += 2
+
+        if tokens[pos] != '-A':
+            raise ValueError("unexpected command %s" % tokens[pos])
+        ident = tokens[pos+1]
+        pos += 2
+
+        body = []
+        flat_body = []
+        end = len(tokens) - 2
+        if tokens[end-2:end] == ['-j', 'REJECT'] or tokens[end-2:end] == ['--jump', 'REJECT']:
+            end -= 2
+
+        while pos < end and tokens[pos] not in ['-j', '--jump']:
+            negated = tokens[pos] == '!'
+            if negated:
+                pos += 1
+
+            arg = tokens[pos]
+            if arg in _RESERVED or not _ARG.match(arg):
+                raise ValueError("unexpected argument %s" % arg)
+
+            value = tokens[pos+1]
+            pos += 2
+            if _FLAGS.match(value) and pos < end and _FLAGS.match(tokens[pos]):
+                value = "%s %s" % (value, tokens[pos])
+                pos += 1
+
+            arg = _NORMALIZED.get(arg, arg)
+            tree = Tree(arg)
+            tree.add_child(value).set_negated(negated)
+            body.append(tree)
+
+            if negated:
+                flat_body.append("! %s %s " % (arg, value))
+            else:
+                flat_body.append("%s %s " % (arg, value))
+
+        jump = self._parse_jump(tokens[pos:])
+
+        flat_table = [" %s %s" % (table.value, table.get_last().value)] if table else []
+
+        line = Tree("".join(
+            [tokens[0]] + flat_table + [' -A ', ident, ' '] + flat_body + [
+                jump.value, ' ', jump.get_last().value
+            ]
+        ))
+
+        tmp = line.add_child('-A')
+        tmp.add_child(ident)
+        tmp.add_children(body)
+        tmp.add_child(jump)
+
+        if table:
+            line.add_child(table)
+        else:
+            line.add_child('-t').add_child('filter')
+
+        line.add_child('--line-no').add_child(self._linecount)
+        self._linecount += 1
+
+        return line
+
+
+    @staticmethod
+    def _parse_action(tokens):
+        if tokens[0] in _ACTIONS and len(tokens) == 1:
+            return Tree(tokens[0])
+
+        # rejections are handled as drops
+        if tokens[0] == 'REJECT' and len(tokens) == 3 and _ARG.match(tokens[1]):
+            return Tree('DROP')
+
+        raise ValueError("unsupported action %s" % ' '.join(tokens))
+
+
+    def _parse_jump(self, tokens):
+        if not tokens or tokens[0] not in ['-j', '--jump']:
+            raise ValueError("missing jump")
+
+        jump = Tree('-j')
+        jump.add_child(self._parse_action(tokens[1:]))
+        return jump
+
+
+    def _parse_policy(self, line):
+        # policies keep their original whitespace
+        parts = _POLICY.split(line.strip())
+
+        ipt, ws_ipt = parts[:2]
+        table = None
+        if parts[2] == '-t':
+            table = Tree('-t')
+            table.add_child(parts[4])
+            parts = parts[:2] + parts[6:]
+
+        _policy_cmd, ws_cmd, ident, ws_ident = parts[2:6]
+        action = self._parse_action(parts[6::2])
+
+        flat_table = ["%s %s " % (table.value, table.get_last().value)] if table else []
+
+        line = Tree("".join(
+            [ipt, ws_ipt] + flat_table + ['-P', ws_cmd, ident, ws_ident, action.value]
+        ))
+        if table:
+            line.add_child(table)
+
+        tmp = line.add_child('-P')
+        tmp = tmp.add_child(ident)
+        tmp.add_child(action)
+
+        if table:
+            line.add_child(table)
+        else:
+            line.add_child('-t').add_child('filter')
+
+        line.add_child('--line-no').add_child(self._linecount)
+        self._linecount += 1
+
+        return line
+
+
+if __name__ == '__main__':
+    IP6TablesLineParser().parse(sys.argv[1]).print_tree()
@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+
+# -*- coding: utf-8 -*-
+
+# Copyright 2020 Claas Lorenz <claas_lorenz@genua.de>
+
+# This file is part of FaVe.
+
+# FaVe is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# FaVe is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with FaVe.  If not, see <https://www.gnu.org/licenses/>.
+
+""" This module provides an on-disk cache of generated packet filter models.
+
+Models are stored as JSON files named by a hash of the rule set's content, the
+node's name, address and ports, the generator's flags as well as the parser
+backend. The hash also covers the sources of all modules shaping a model, i.e.,
+both parsers, the generator, the models and their utilities, so that entries of
+older versions are never used. The cache directory is given by the environment
+variable FAVE_MODEL_CACHE. Caching is disabled if it is unset.
+"""
+
+import os
+import json
+import hashlib
+import tempfile
+
+from importlib.util import find_spec
+
+from devices.packet_filter import PacketFilterModel
+from devices.snapshot_packet_filter import SnapshotPacketFilterModel
+from iptables.generator import generate
+
+
+MODEL_CACHE_ENV = 'FAVE_MODEL_CACHE'
+
+# the parsers are looked up without importing them as the bison backend may
+# not be available
+MODEL_SOURCES = [
+    'iptables.parser',
+    'iptables.line_parser',
+    'iptables.generator',
+    'devices.abstract_device',
+    'devices.abstract_firewall',
+    'devices.packet_filter',
+    'devices.snapshot_packet_filter',
+    'rule.rule_model',
+    'util.model_util',
+    'util.packet_util',
+    'util.tree_util'
+]
+
+PARSER_BACKENDS = {'bison' : 'iptables.parser', 'line' : 'iptables.line_parser'}
+
+_MODEL_CACHE_STATS = {"hits" : 0, "misses" : 0}
+
+_SOURCES_DIGEST = []
+
+
+def model_cache_info():
+    """ Returns the hit and miss counters of the model cache.
+    """
+
+    return dict(_MODEL_CACHE_STATS)
+
+
+def clear_model_cache_info():
+    """ Resets the hit and miss counters of the model cache.
+    """
+
+    _MODEL_CACHE_STATS["hits"] = 0
+    _MODEL_CACHE_STATS["misses"] = 0
+
+
+def _sources_digest():
+    if not _SOURCES_DIGEST:
+        digest = hashlib.sha256()
+        for module in MODEL_SOURCES:
+            with open(find_spec(module).origin, 'rb') as src:
+                digest.update(src.read())
+        _SOURCES_DIGEST.append(digest.hexdigest())
+
+    return _SOURCES_DIGEST[0]
+
+
+def _parser_backend(parser):
+    if parser is None:
+        return PARSER_BACKENDS.get(
+            os.environ.get('FAVE_IPTABLES_PARSER', 'bison'), PARSER_BACKENDS['bison']
+        )
+    return type(parser).__module__
+
+
+def model_cache_key(
+        content, node, address, ports,
+        interweaving=True, state_snap=False, shared_shells=False, parser=None
+):
+    """ Calculates the cache key of a model.
+
+    Arguments:
+    content -- the rule set as bytes
+    node -- the node's name
+    address -- the node's address
+    ports -- the node's physical interfaces
+
+    Keyword arguments:
+    interweaving -- interweave the state shell (default: True)
+    state_snap -- generate a snapshot packet filter (default: False)
+    shared_shells -- omit covered state shells (default: False)
+    parser -- the rule set parser (default: the backend of the parser singleton)
+
+    Returns:
+    The key as hex string.
+    """
+
+    digest = hashlib.sha256(content)
+    digest.update(json.dumps(
+        [
+            _sources_digest(), _parser_backend(parser),
+            node, address, ports, interweaving, state_snap, shared_shells
+        ],
+        default=str
+    ).encode('utf8'))
+    return digest.hexdigest()
+
+
+def _load_model(path, state_snap):
+    try:
+        with open(path, 'r') as mf:
+            j = json.load(mf)
+    except (OSError, ValueError):
+        return None
+
+    if state_snap:
+        return SnapshotPacketFilterModel.from_json(j)
+    return PacketFilterModel.from_json(j)
+
+
+def _store_model(cache_dir, path, model):
+    os.makedirs(cache_dir, exist_ok=True)
+
+    # entries are replaced atomically so that concurrent readers never see
+    # partially written models
+    with tempfile.NamedTemporaryFile(
+            'w', dir=cache_dir, suffix='.tmp', delete=False
+    ) as mf:
+        json.dump(model.to_json(), mf)
+    os.replace(mf.name, path)
+
+
+def cached_generate(
+        ruleset, node, address, ports,
+        interweaving=True, state_snap=False, shared_shells=False,
+        parser=None, cache_dir=None
+):
+    """ Generates a packet filter model from a rule set file or loads it from
+        the cache.
+
+    Arguments:
+    ruleset -- the path of the rule set
+    node -- the node's name
+    address -- the node's address
+    ports -- the node's physical interfaces
+
+    Keyword arguments:
+    interweaving -- interweave the state shell (default: True)
+    state_snap -- generate a snapshot packet filter (default: False)
+    shared_shells -- omit covered state shells (default: False)
+    parser -- the rule set parser (default: the parser singleton)
+    cache_dir -- the cache directory (default: $FAVE_MODEL_CACHE)
+
+    Returns:
+    The packet filter model.
+    """
+
+    if parser is None:
+        from iptables.parser_singleton import PARSER as parser
+
+    if cache_dir is None:
+        cache_dir = os.environ.get(MODEL_CACHE_ENV)
+
+    if not cache_dir:
+        return generate(
+            parser.parse(ruleset), node, address, ports,
+            interweaving=interweaving, state_snap=state_snap,
+            shared_shells=shared_shells
+        )
+
+    with open(ruleset, 'rb') as rsf:
+        content = rsf.read()
+
+    path = os.path.join(cache_dir, "%s.json" % model_cache_key(
+        content, node, address, ports,
+        interweaving=interweaving, state_snap=state_snap,
+        shared_shells=shared_shells, parser=parser
+    ))
+
+    model = _load_model(path, state_snap)
+    if model is not None:
+        _MODEL_CACHE_STATS["hits"] += 1
+        return model
+
+    _MODEL_CACHE_STATS["misses"] += 1
+    model = generate(
+        parser.parse(ruleset), node, address, ports,
+        interweaving=interweaving, state_snap=state_snap,
+        shared_shells=shared_shells
+    )
+    _store_model(cache_dir, path, model)
+
+    return model
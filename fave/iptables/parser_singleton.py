@@ -17,11 +17,20 @@
 # You should have received a copy of the GNU General Public License
 # along with FaVe.  If not, see <https://www.gnu.org/licenses/>.
 
-""" This module provides a constant to a global PyBison parser.
+""" This module provides a constant to a global ip6tables parser.
+
+The backend is selected by the environment variable FAVE_IPTABLES_PARSER which
+is either bison (default) or line.
 """
 
+import os
+
 PARSER = None
 
-if PARSER is None:
+if PARSER is None and os.environ.get('FAVE_IPTABLES_PARSER', 'bison') == 'line':
+    from iptables.line_parser import IP6TablesLineParser
+    PARSER = IP6TablesLineParser()
+
+elif PARSER is None:
     from iptables.parser import IP6TablesParser
     PARSER = IP6TablesParser()
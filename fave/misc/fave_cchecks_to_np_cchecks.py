@@ -24,6 +24,7 @@ import sys
 import json
 
 from rule.rule_model import RuleField
+from netplumber.mapping import Mapping
 from netplumber.vector import Vector, set_field_in_vector
 from util.ip6np_util import field_value_to_bitvector
 
@@ -35,7 +36,7 @@ def _node_to_id(node, node_ids):
 def _cond_to_vector(cond, mapping):
     if not cond: return None
 
-    vec = Vector(mapping['length'])
+    vec = Vector(mapping.length)
 
     cond = cond.pop()
     field = RuleField(*(cond.split(':')))
@@ -48,7 +49,7 @@ argv = sys.argv[1:]
 cchecks = json.load(open(argv[0], 'r'))
 fave = json.load(open(argv[1], 'r'))
 
-mapping = fave['mapping']
+mapping = Mapping.from_json(fave['mapping'])
 generator_to_id = {v:k for k,v in list(fave['id_to_generator'].items())}
 
 probe_to_id = {v:k for k,v in list(fave['id_to_probe'].items())}
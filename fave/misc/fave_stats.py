@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+
+# -*- coding: utf-8 -*-
+
+# Copyright 2023 Claas Lorenz <claas_lorenz@genua.de>
+
+# This file is part of FaVe.
+
+# FaVe is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# FaVe is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with FaVe.  If not, see <https://www.gnu.org/licenses/>.
+
+""" This module fetches the per-task profiling statistics from FaVe.
+"""
+
+import sys
+import json
+import argparse
+
+from util.aggregator_utils import connect_to_fave, fave_sendmsg
+from util.aggregator_utils import fave_recvmsg, fave_loads
+from util.aggregator_utils import FAVE_DEFAULT_UNIX, FAVE_DEFAULT_IP, FAVE_DEFAULT_PORT
+
+
+def _print_stats(reply):
+    for task_type, stats in sorted(reply['tasks'].items()):
+        print("%s: %s tasks in %.6f s, %s rpcs (%s bytes sent, %s bytes received)" % (
+            task_type,
+            stats['count'],
+            stats['time'],
+            stats['rpc_calls'],
+            stats['rpc_bytes_sent'],
+            stats['rpc_bytes_received']
+        ))
+        for phase, spent in sorted(stats['phases'].items(), key=lambda p: -p[1]):
+            print("  %s: %.6f s" % (phase, spent))
+
+    for task_type, profile in sorted(reply['profiles'].items()):
+        print("\nprofile of %s:\n%s" % (task_type, profile))
+
+    for rejected in reply.get('rejected', []):
+        print("\nrejected %s model of %s: %s" % (
+            rejected['type'], rejected['node'], rejected['error']
+        ))
+
+
+def main(argv):
+    """ Main method.
+    """
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        '-u', '--use-unix',
+        dest='use_unix',
+        action='store_const',
+        const=True,
+        default=False
+    )
+    parser.add_argument(
+        '-r', '--reset',
+        dest='reset',
+        action='store_const',
+        const=True,
+        default=False
+    )
+    parser.add_argument(
+        '-l', '--limit',
+        dest='limit',
+        type=int,
+        default=20
+    )
+    parser.add_argument(
+        '-o', '--output',
+        dest='output',
+        default=None
+    )
+
+    args = parser.parse_args(argv)
+
+    fave = connect_to_fave(
+        *((FAVE_DEFAULT_UNIX, 0) if args.use_unix else (FAVE_DEFAULT_IP, FAVE_DEFAULT_PORT))
+    )
+    fave.setblocking(1)
+
+    fave_sendmsg(
+        fave, json.dumps({'type' : 'stats', 'reset' : args.reset, 'limit' : args.limit})
+    )
+    reply = fave_loads(fave_recvmsg(fave))
+    fave.close()
+
+    if args.output:
+        with open(args.output, 'w') as ofile:
+            json.dump(reply, ofile, indent=2)
+    else:
+        _print_stats(reply)
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
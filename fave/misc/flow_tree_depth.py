@@ -22,18 +22,11 @@
 """ This module prints the depth of a flow tree from a NetPlumber dump.
 """
 
-import json
+import sys
 
-TREES = json.load(open("np_dump/flow_trees.json", "r"))["flows"]
+from util.flow_tree_util import flow_tree_depth
 
-def tree_depth(tree):
-    """ Traverses tree to determine its depth.
-    Arguments:
-    tree -- a flow tree
-    """
-    if "children" not in tree or not tree["children"]:
-        return 1
+DUMP = sys.argv[1] if len(sys.argv) > 1 else "np_dump/flow_trees.json"
 
-    return max(list(map(tree_depth, tree["children"]))) + 1
-
-print((max(list(map(tree_depth, TREES)))))
+with open(DUMP, "r") as dump:
+    print(flow_tree_depth(dump))
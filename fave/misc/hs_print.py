@@ -26,6 +26,7 @@
 import sys
 import json
 
+from netplumber.mapping import Mapping
 from netplumber.vector import HeaderSpace
 
 def print_help():
@@ -41,7 +42,7 @@ if __name__ == '__main__':
         print_help()
         sys.exit(1)
 
-    MAPPING = json.load(open(ARGV[0], 'r'))['mapping']
+    MAPPING = Mapping.from_json(json.load(open(ARGV[0], 'r'))['mapping'])
 
     with open(ARGV[1], 'r') as f:
         HS_STR = f.read()
@@ -22,16 +22,19 @@
 """ This module provides functionality to send ip6tables configurations to FaVe.
 """
 
+import os
 import sys
 import argparse
 import json
 import pprint
 
-from iptables.generator import generate
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from iptables.model_cache import cached_generate
 from iptables.parser_singleton import PARSER
 
 from util.aggregator_utils import FAVE_DEFAULT_IP, FAVE_DEFAULT_PORT, FAVE_DEFAULT_UNIX
-from util.aggregator_utils import connect_to_fave, fave_sendmsg
+from util.aggregator_utils import connect_to_fave, fave_sendmsg, fave_sendobj
 
 def _try_int(var):
     try:
@@ -54,6 +57,123 @@ def _parse_ports(arg):
     return ports
 
 
+def _parse_bulk(arg):
+    return [
+        tuple(ruleset.split('\\')) for ruleset in arg.split('|') if ruleset
+    ]
+
+
+def _generate_model(
+        node, address, ports, ruleset,
+        interweaving=False, shared_shells=False, compact=False
+):
+    """ Parses and generates the model of a rule set unless it is cached.
+
+    This function is run by the worker processes of a bulk ingestion. Every
+    worker process uses its own instance of the parser singleton.
+
+    Arguments:
+    node -- the node's name
+    address -- the node's address
+    ports -- the node's ports
+    ruleset -- the path of the rule set
+
+    Keyword arguments:
+    interweaving -- interweave the state shell (default: False)
+    shared_shells -- omit covered state shells (default: False)
+    compact -- keep the model as object for the compact encoding (default: False)
+
+    Returns:
+    A pair of the node's name and its model as JSON object or string.
+    """
+
+    model = cached_generate(
+        ruleset,
+        node,
+        address,
+        _parse_ports(ports),
+        interweaving=interweaving,
+        shared_shells=shared_shells,
+        parser=PARSER
+    ).to_json()
+
+    return node, model if compact else json.dumps(model)
+
+
+def _send_model(fave, model):
+    if isinstance(model, str):
+        ret = fave_sendmsg(fave, model)
+    else:
+        ret = fave_sendobj(fave, model)
+    if ret != None:
+        raise Exception("ip6np was unable to send configuration correctly")
+
+
+def ingest(
+        rulesets, use_unix=False, interweaving=False, shared_shells=False,
+        compact=False, workers=None, dump=False
+):
+    """ Parses and generates many rule sets in parallel and sends their models
+        to FaVe.
+
+    The models are streamed in the order of their completion over a single
+    connection.
+
+    Arguments:
+    rulesets -- a list of (node, address, ports, rule set path) tuples
+
+    Keyword arguments:
+    use_unix -- connect via the unix domain socket (default: False)
+    interweaving -- interweave the state shells (default: False)
+    shared_shells -- omit covered state shells (default: False)
+    compact -- send the models in the compact encoding (default: False)
+    workers -- the number of worker processes (default: the number of CPUs)
+    dump -- print the models instead of sending them (default: False)
+    """
+
+    workers = min(workers or os.cpu_count() or 1, len(rulesets)) or 1
+
+    fave = None
+    if not dump:
+        if use_unix:
+            fave = connect_to_fave(FAVE_DEFAULT_UNIX)
+        else:
+            fave = connect_to_fave(FAVE_DEFAULT_IP, FAVE_DEFAULT_PORT)
+        fave.setblocking(1)
+
+    def _emit(model):
+        if dump:
+            pprint.pprint(json.loads(model) if isinstance(model, str) else model)
+        else:
+            _send_model(fave, model)
+
+    try:
+        if workers == 1:
+            for node, address, ports, ruleset in rulesets:
+                _node, model = _generate_model(
+                    node, address, ports, ruleset,
+                    interweaving=interweaving, shared_shells=shared_shells,
+                    compact=compact
+                )
+                _emit(model)
+
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                futures = [pool.submit(
+                    _generate_model,
+                    node, address, ports, ruleset,
+                    interweaving=interweaving, shared_shells=shared_shells,
+                    compact=compact
+                ) for node, address, ports, ruleset in rulesets]
+
+                for future in as_completed(futures):
+                    _node, model = future.result()
+                    _emit(model)
+
+    finally:
+        if fave:
+            fave.close()
+
 
 def main(argv):
     """ Connects to FaVe and sends an ip6tables configuration event.
@@ -101,15 +221,56 @@ def main(argv):
         default=False
     )
 
+    parser.add_argument(
+        '-c', '--compact',
+        dest='use_compact',
+        action='store_const',
+        const=True,
+        default=False
+    )
+
+    parser.add_argument(
+        '-S', '--use-shared-shells',
+        dest='use_shared_shells',
+        action='store_const',
+        const=True,
+        default=False
+    )
+    parser.add_argument(
+        '-b', '--bulk',
+        dest='bulk',
+        type=_parse_bulk,
+        default=[]
+    )
+    parser.add_argument(
+        '-w', '--workers',
+        dest='workers',
+        type=int,
+        default=None
+    )
+
     args = parser.parse_args(argv)
 
-    ast = PARSER.parse(args.file)
-    model = generate(
-        ast,
+    if args.bulk:
+        ingest(
+            args.bulk,
+            use_unix=args.use_unix,
+            interweaving=args.use_interweaving,
+            shared_shells=args.use_shared_shells,
+            compact=args.use_compact,
+            workers=args.workers,
+            dump=args.dump
+        )
+        return
+
+    model = cached_generate(
+        args.file,
         args.node,
         args.address,
-        args.ports,
-        interweaving=args.use_interweaving
+        args.port,
+        interweaving=args.use_interweaving,
+        shared_shells=args.use_shared_shells,
+        parser=PARSER
     )
 
     if args.dump:
@@ -121,8 +282,11 @@ def main(argv):
         else:
             fave = connect_to_fave(FAVE_DEFAULT_IP, FAVE_DEFAULT_PORT)
         fave.setblocking(1)
-        model_str = json.dumps(model.to_json())
-        ret = fave_sendmsg(fave, model_str)
+        if args.use_compact:
+            ret = fave_sendobj(fave, model.to_json())
+        else:
+            model_str = json.dumps(model.to_json())
+            ret = fave_sendmsg(fave, model_str)
         if ret != None:
             raise Exception("ip6np was unable to send configuration correctly")
 
@@ -25,6 +25,7 @@
 import sys
 import json
 
+from netplumber.mapping import Mapping
 from netplumber.vector import HeaderSpace
 
 def print_help():
@@ -41,7 +42,7 @@ if __name__ == '__main__':
         sys.exit(1)
 
     FAVE = json.load(open(ARGV[0], 'r'))
-    MAPPING = FAVE['mapping']
+    MAPPING = Mapping.from_json(FAVE['mapping'])
 
     TABLE = json.load(open(ARGV[1], 'r'))
 
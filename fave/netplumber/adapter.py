@@ -25,17 +25,18 @@ import logging
 import json
 import sys
 
-from copy import deepcopy
-
 from aggregator.aggregator_abstract import TRACE
 from aggregator.abstract_engine import AbstractVerificationEngine
 
 import netplumber.jsonrpc as jsonrpc
-from netplumber.mapping import Mapping, FIELD_SIZES
+from netplumber.mapping import Mapping
+from netplumber.mapping import PortCodec, PrefixCodec, PORT_FIELDS, ADDRESS_FIELDS
 from netplumber.vector import set_field_in_vector
 from netplumber.vector import Vector, HeaderSpace
 
-from util.ip6np_util import field_value_to_bitvector
+from util.ip6np_util import field_value_to_bitvector, fields_to_bitvectors
+from util.ip6np_util import field_cache_info
+from util.profile_util import profiled
 from rule.rule_model import Rule, Match, Forward, Rewrite, RuleField
 
 
@@ -73,7 +74,7 @@ def _calc_rule_index(r_idx, t_idx=0, n_idx=0):
 
 
 def _expand_field(field):
-    """ Expands a negated field to a set of vectors.
+    """ Expands a negated field to a set of disjoint vectors.
 
     Keyword argument:
     field -- a negated field to be expanded
@@ -81,24 +82,87 @@ def _expand_field(field):
 
     assert isinstance(field, RuleField)
 
-    vec = field_value_to_bitvector(field)
+    return _expand_vector(field_value_to_bitvector(field))
+
+
+def _expand_vector(vec):
+    """ Expands the complement of a vector to a set of disjoint vectors.
+
+    The complement of a vector with k relevant bits is covered by k vectors
+    where the i-th vector shares the first i-1 relevant bits with the
+    vector's value and flips the i-th one.
+
+    Keyword argument:
+    vec -- the vector to be complemented
+    """
+
     nvectors = []
-    for idx, bit in enumerate(vec.vector):
-        if bit == '0':
-            nvec = deepcopy(vec)
-            nvec.vector = "x"*idx + "1" + "x"*(nvec.length-idx-1)
-            nvectors.append(nvec)
-        elif bit == '1':
-            nvec = deepcopy(vec)
-            nvec.vector = "x"*idx + "0" + "x"*(nvec.length-idx-1)
-            nvectors.append(nvec)
-        else: # 'x'
+    prefix = 0
+    for idx in range(vec.length-1, -1, -1):
+        bit = 1 << idx
+        if not vec.care & bit: # 'x'
             continue
 
+        nvec = Vector(vec.length)
+        nvec.care = prefix | bit
+        nvec.value = (vec.value & prefix) | (~vec.value & bit)
+        nvectors.append(nvec)
+
+        prefix |= bit
+
     return nvectors
 
 
 
+def _count_field(field, usage, values):
+    usage[field.name] = usage.get(field.name, 0) + 1
+    if values is not None:
+        values.setdefault(field.name, []).append(field)
+
+
+def _count_rule_fields(rules, usage, values):
+    for rule in rules:
+        for field in rule.match:
+            _count_field(field, usage, values)
+        for action in [a for a in rule.actions if isinstance(a, Rewrite)]:
+            for field in action.rewrite:
+                _count_field(field, usage, values)
+
+
+def _count_fields(model, usage, values=None):
+    """ Counts how often a model matches or rewrites header fields.
+
+    Keyword arguments:
+    model -- a model
+    usage -- a dict mapping field names to their counts which is updated
+    values -- a dict mapping field names to the fields seen which is updated (default: None)
+    """
+
+    if model.type == 'topology_command':
+        if model.model is not None:
+            _count_fields(model.model, usage, values)
+
+    elif model.type == 'generator':
+        for fields in model.fields.values():
+            for field in fields:
+                _count_field(field, usage, values)
+
+    elif model.type == 'probe':
+        for field in itertools.chain(
+                model.match,
+                itertools.chain.from_iterable(model.filter_fields.values()),
+                itertools.chain.from_iterable(model.test_fields.values())
+        ):
+            _count_field(field, usage, values)
+
+    elif model.type in ['switch_command', 'state_command']:
+        _count_rule_fields(model.rules, usage, values)
+
+    elif hasattr(model, 'tables'):
+        for rules in model.tables.values():
+            _count_rule_fields(rules, usage, values)
+
+
 class NetPlumberAdapter(AbstractVerificationEngine):
     """ Class that maps and translates a FaVe model to a NetPlumber model.
     """
@@ -107,26 +171,42 @@ class NetPlumberAdapter(AbstractVerificationEngine):
         self,
         socks, logger,
         asyncore_socks=None,
-        mapping=None
+        mapping=None,
+        compact=False
     ):
         self.socks = socks
+        self.rpc = jsonrpc.RPCClient(socks)
         self.asyncore_socks = asyncore_socks if asyncore_socks else {}
         self.mapping = Mapping.from_json(mapping) if mapping else Mapping(0)
         self.mapping_keys = set(self.mapping.keys())
+        # compact the encoding of fields when they are planned
+        self.compact = compact
         self.tables = {}
         self.model_types = {}
         self.links = {}
         self.fresh_table_index = 1
         self.ports = {}
         self.rule_ids = {}
+        # reverse indexes: netplumber rule id -> fave rule index, table id ->
+        # name, port number -> name, and port number -> incoming ports
+        self.node_to_rule = {}
+        self.table_names = {}
+        self.port_names = {}
+        self.incoming = {}
         self.generators = {}
         self.probes = {}
         self.logger = logger
+        self.profiler = None
 
     def stop(self):
         """ Stops NetPlumber.
         """
-        jsonrpc.stop(self.socks)
+        jsonrpc.stop(self.rpc)
+
+    def sync(self):
+        """ Waits until NetPlumber has processed all pipelined operations.
+        """
+        self.rpc.sync()
 
     def dump_flows(self, odir):
         """ Dumps flows.
@@ -134,7 +214,7 @@ class NetPlumberAdapter(AbstractVerificationEngine):
         Arguments:
         odir -- the target directory
         """
-        jsonrpc.dump_flows(self.socks, odir)
+        jsonrpc.dump_flows(self.rpc, odir)
 
     def dump_plumbing_network(self, odir):
         """ Dumps plumbing network.
@@ -142,7 +222,7 @@ class NetPlumberAdapter(AbstractVerificationEngine):
         Arguments:
         odir -- the target directory
         """
-        jsonrpc.dump_plumbing_network(self.socks, odir)
+        jsonrpc.dump_plumbing_network(self.rpc, odir)
 
     def dump_pipes(self, odir):
         """ Dumps pipes.
@@ -150,7 +230,7 @@ class NetPlumberAdapter(AbstractVerificationEngine):
         Arguments:
         odir -- the target directory
         """
-        jsonrpc.dump_pipes(self.socks, odir)
+        jsonrpc.dump_pipes(self.rpc, odir)
 
     def dump_flow_trees(self, odir, keep_simple=False):
         """ Dumps flow trees.
@@ -158,13 +238,17 @@ class NetPlumberAdapter(AbstractVerificationEngine):
         Arguments:
         odir -- the target directory
         """
-        jsonrpc.dump_flow_trees(self.socks, odir, keep_simple)
+        jsonrpc.dump_flow_trees(self.rpc, odir, keep_simple)
 
     def check_anomalies(self, use_shadow=False, use_reach=False, use_general=False):
         """ Orders NetPlumber to check all tables for anomalies.
+
+        Returns:
+        A list of the anomalies found, each as dict with the keys type and rule
+        (the netplumber rule id), or None if NetPlumber does not report them.
         """
-        jsonrpc.check_anomalies(
-            self.socks,
+        return jsonrpc.check_anomalies(
+            self.rpc,
             use_shadow=use_shadow,
             use_reach=use_reach,
             use_general=use_general
@@ -185,18 +269,47 @@ class NetPlumberAdapter(AbstractVerificationEngine):
 
 
     def check_compliance(self, rules):
-        """ Orders NetPlumber to check all tables for anomalies.
+        """ Orders NetPlumber to check a set of policy rules for compliance.
+
+        Keyword arguments:
+        rules -- a dict mapping probe names to lists of (source, negated, cond) triples
+
+        Returns:
+        A list of the checks' results in the order of the rules, each as dict
+        with the keys dst, src, negated, compliant and time (in ms), or None if
+        NetPlumber does not report results.
         """
-        jsonrpc.check_compliance(
-            self.socks,
+
+        results = jsonrpc.check_compliance(
+            self.rpc,
             self._create_compliance_rules(rules)
         )
+        if results is None:
+            return None
+
+        # results are matched by probe id and position in the probe's checks
+        by_check = {(res['dst'], res['idx']) : res for res in results}
+
+        res = []
+        for dst, src_rules in rules.items():
+            _, dst_id, _ = self.probes[dst]
+            for idx, (src, negated, _cond) in enumerate(src_rules):
+                result = by_check.get((dst_id, idx))
+                res.append({
+                    'dst' : dst,
+                    'src' : src,
+                    'negated' : negated,
+                    'compliant' : result['compliant'] if result else None,
+                    'time' : result['time'] if result else None
+                })
+
+        return res
 
     def _expand(self):
         self.logger.debug(
             "worker: expand vector length to %s", self.mapping.length
         )
-        jsonrpc.expand(self.socks, self.mapping.length)
+        jsonrpc.expand(self.rpc, self.mapping.length)
 
     def _get_index_for_src(self, src):
         return self.generators.get(src.rstrip('1').rstrip('.'), [-1, 0, 0])[0]
@@ -212,7 +325,7 @@ class NetPlumberAdapter(AbstractVerificationEngine):
         """
 
         jsonrpc.add_links_bulk(
-            self.socks,
+            self.rpc,
             [(
                 self._get_index_for_src(src),
                 self.global_port(src),
@@ -220,6 +333,8 @@ class NetPlumberAdapter(AbstractVerificationEngine):
             ) for src, dst in links],
             use_dynamic=use_dynamic
         )
+        for src, dst in links:
+            self._link(self.global_port(src), self.global_port(dst))
 
     def add_link(self, sport, dport):
         """ Add a link.
@@ -228,21 +343,37 @@ class NetPlumberAdapter(AbstractVerificationEngine):
         sport -- the source port
         dport -- the destination port
         """
-        jsonrpc.add_link(self.socks, self.global_port(sport), self.global_port(dport))
+        jsonrpc.add_link(self.rpc, self.global_port(sport), self.global_port(dport))
+        self._link(self.global_port(sport), self.global_port(dport))
 
 
     def remove_link(self, sport, dport):
         """ Remove a link.
 
         Arguments:
-        sport -- the source port
-        dport -- the destination port
+        sport -- the source port number
+        dport -- the destination port number
         """
-        jsonrpc.remove_link(self.socks, sport, dport)
+        jsonrpc.remove_link(self.rpc, sport, dport)
+        self._unlink(sport, dport)
+
+
+    def _link(self, sport, dport):
+        self.links.setdefault(sport, []).append(dport)
+        self.incoming.setdefault(dport, set()).add(sport)
+
+
+    def _unlink(self, sport, dport):
         self.links[sport].remove(dport)
         if not self.links[sport]: del self.links[sport]
 
+        # a link may have been added several times
+        if dport not in self.links.get(sport, []):
+            self.incoming[dport].discard(sport)
+            if not self.incoming[dport]: del self.incoming[dport]
+
 
+    @profiled('vectors')
     def _expand_negations(self, match):
         """ Expands a match with negated fields to a set of vectors.
 
@@ -254,29 +385,40 @@ class NetPlumberAdapter(AbstractVerificationEngine):
         fields = set([f.name for f in match])
         self._update_mapping(fields)
 
+        # compacted fields are complemented within their encoding
         field_vectors = {}
         for field in match:
+            fvec = field_value_to_bitvector(field)
+            if field.name in self.mapping.codecs:
+                fvec = Vector.from_vector_str(self.mapping.encode(field.name, fvec.vector))
+
             if field.negated:
-                field_vectors[field.name] = _expand_field(field)
+                field_vectors[field.name] = _expand_vector(fvec)
             else:
-                field_vectors[field.name] = [field_value_to_bitvector(field)]
+                field_vectors[field.name] = [fvec]
+
+        # combine the field masks incrementally so that combinations with a
+        # common prefix share its computation
+        length = self.mapping.length
+        partials = [(0, 0)]
+        for name in sorted(fields):
+            shift = length - self.mapping[name] - self.mapping.size(name)
+            partials = [
+                (care | (fvec.care << shift), value | (fvec.value << shift))
+                for care, value in partials for fvec in field_vectors[name]
+            ]
 
         matches = []
-
-        keys = sorted(fields)
-        combinations = itertools.product(*(field_vectors[k] for k in keys))
-
-        for comb in combinations:
-            vec = Vector(self.mapping.length)
-            for i, name in enumerate(keys):
-                set_field_in_vector(
-                    self.mapping, vec, name, comb[i].vector
-                )
+        for care, value in partials:
+            vec = Vector(length)
+            vec.care = care
+            vec.value = value
             matches.append(vec)
 
         return matches
 
 
+    @profiled('mapping')
     def _update_mapping(self, field_names):
         diff = field_names - self.mapping_keys
 
@@ -287,17 +429,120 @@ class NetPlumberAdapter(AbstractVerificationEngine):
             self._expand()
 
 
+    @profiled('mapping')
+    def plan_mapping(self, fields, codecs=None):
+        """ Fixes the layout of fields yet unknown to the mapping at once.
+
+        Expanding the mapping makes NetPlumber widen all stored header spaces.
+        Extending it by all fields of a batch of models up front thus
+        expands at most once per batch.
+
+        Arguments:
+        fields -- the fields in the order they are appended to the mapping
+
+        Keyword arguments:
+        codecs -- a dict of codecs for fields in a compacted encoding (default: None)
+        """
+
+        fields = [f for f in fields if f not in self.mapping_keys]
+        if not fields:
+            return
+
+        codecs = codecs if codecs is not None else {}
+        for field in fields:
+            self.mapping.extend(field, codec=codecs.get(field))
+        self.mapping_keys.update(fields)
+        self._expand()
+
+
+    def _plan_codecs(self, models, values):
+        # ports are dictionary-encoded with room for the ports known so far,
+        # addresses are narrowed to their common prefix
+        models = [
+            m.model if m.type == 'topology_command' and m.model else m for m in models
+        ]
+        ports = len(self.ports) + sum(len(getattr(m, 'ports', {})) for m in models)
+
+        codecs = {}
+        for name, fields in values.items():
+            if name in self.mapping_keys:
+                continue
+
+            if name in PORT_FIELDS:
+                codec = PortCodec.plan(name, max(ports, len(fields)))
+            elif name in ADDRESS_FIELDS:
+                codec = PrefixCodec.plan(
+                    name, [field_value_to_bitvector(f).vector for f in fields]
+                )
+            else:
+                codec = None
+
+            if codec is not None:
+                codecs[name] = codec
+
+        return codecs
+
+
+    def plan_models(self, models):
+        """ Fixes the layout of all fields used by a batch of models at once.
+
+        The fields are ordered by decreasing usage so that rarely matched,
+        i.e., mostly wildcarded, fields are grouped at the end of the vectors.
+
+        Arguments:
+        models -- a list of models
+        """
+
+        usage = {}
+        values = {} if self.compact else None
+        for model in models:
+            _count_fields(model, usage, values=values)
+
+        self.plan_mapping(
+            sorted(usage, key=lambda f: (-usage[f], f)),
+            codecs=self._plan_codecs(models, values) if self.compact else None
+        )
+
+
+    def check_model(self, model):
+        """ Checks whether all field values of a model fit the compacted fields.
+
+        Compacted fields cannot be widened once vectors have been stored, so
+        models exceeding their codecs have to be rejected before any of
+        their parts is added.
+
+        Arguments:
+        model -- a model
+
+        A ValueError is raised if a field value cannot be encoded.
+        """
+
+        if not self.mapping.codecs:
+            return
+
+        values = {}
+        _count_fields(model, {}, values=values)
+        for name, fields in values.items():
+            try:
+                self.mapping.check(
+                    name, set(field_value_to_bitvector(f).vector for f in fields)
+                )
+            except ValueError as err:
+                raise ValueError("%s: %s" % (name, err))
+
+
+    def _mask_field(self, name):
+        # masks are no field values and thus set in the field's encoding
+        return RuleField(name, Vector.from_vector_str('1'*self.mapping.size(name)))
+
+
+    @profiled('vectors')
     def _build_vector(self, fields, preset='x'):
         self._update_mapping(set([f.name for f in fields]))
 
         vec = Vector(length=self.mapping.length, preset=preset)
-        for field in fields:
-            set_field_in_vector(
-                self.mapping,
-                vec,
-                field.name,
-                field_value_to_bitvector(field).vector
-            )
+        for field, fvec in zip(fields, fields_to_bitvectors(fields)):
+            set_field_in_vector(self.mapping, vec, field.name, fvec)
 
         return vec
 
@@ -322,7 +567,7 @@ class NetPlumberAdapter(AbstractVerificationEngine):
                 ns_diff if ns_diff else None
             )
 
-        jsonrpc.add_slice(self.socks, sid, ns_list, ns_diff if ns_diff else None)
+        jsonrpc.add_slice(self.rpc, sid, ns_list, ns_diff if ns_diff else None)
 
 
     def del_slice(self, sid):
@@ -336,7 +581,7 @@ class NetPlumberAdapter(AbstractVerificationEngine):
             self.logger.debug(
                 "worker: remove slice %s from netplumber", sid
             )
-        jsonrpc.remove_slice(self.socks, sid)
+        jsonrpc.remove_slice(self.rpc, sid)
 
 
     def add_tables(self, model):
@@ -348,6 +593,7 @@ class NetPlumberAdapter(AbstractVerificationEngine):
 
         self.model_types.setdefault(model.node, model.type)
 
+        tables = []
         for table in model.tables:
             name = table
 
@@ -360,6 +606,7 @@ class NetPlumberAdapter(AbstractVerificationEngine):
                     self.fresh_table_index += 1
 
                 self.tables[name] = idx
+                self.table_names[idx] = name
 
                 ports = []
                 for port in [port for port in model.ports if model.ports[port] == table]:
@@ -367,13 +614,17 @@ class NetPlumberAdapter(AbstractVerificationEngine):
 
                     ports.append(portno)
                     self.ports[port] = portno
+                    self.port_names[portno] = port
 
                 if self.logger.isEnabledFor(logging.DEBUG):
                     self.logger.debug(
                         "worker: add table to netplumber: %s with index %s and ports %s",
                         name, idx, [hex(p) for p in ports]
                     )
-                jsonrpc.add_table(self.socks, idx, ports)
+                tables.append((idx, ports))
+
+        if tables:
+            jsonrpc.add_tables_batch(self.rpc, tables)
 
 
     def add_wiring(self, model):
@@ -384,6 +635,7 @@ class NetPlumberAdapter(AbstractVerificationEngine):
         """
 
         # add links between tables
+        links = []
         for port1, port2 in model.wiring:
 
             # The internals input and the post routing output are never the
@@ -412,10 +664,11 @@ class NetPlumberAdapter(AbstractVerificationEngine):
                     "worker: add link to netplumber from %s:%s to %s:%s",
                     port1, hex(gport1), port2, hex(gport2)
                 )
-            jsonrpc.add_link(self.socks, gport1, gport2)
+            links.append((gport1, gport2))
+            self._link(gport1, gport2)
 
-            self.links.setdefault(gport1, [])
-            self.links[gport1].append(gport2)
+        if links:
+            jsonrpc.add_links_batch(self.rpc, links)
 
 
     def _add_pre_routing_rules(self, model):
@@ -439,7 +692,7 @@ class NetPlumberAdapter(AbstractVerificationEngine):
             mask = None
             if "in_port" not in self.mapping:
                 self.mapping.extend("in_port")
-                rvec.enlarge(FIELD_SIZES["in_port"])
+                rvec.enlarge(self.mapping.size("in_port"))
 
             rewrite = Vector(length=self.mapping.length)
             mask = Vector(length=rewrite.length, preset='0')
@@ -455,10 +708,7 @@ class NetPlumberAdapter(AbstractVerificationEngine):
 
                 mask = self._build_vector(
                     [
-                        RuleField(
-                            f.name,
-                            "1"*FIELD_SIZES[f.name]
-                        ) if f.name in [
+                        self._mask_field(f.name) if f.name in [
                             'in_port', 'out_port', 'interface'
                         ] else f for f in action.rewrite
                     ],
@@ -477,7 +727,7 @@ class NetPlumberAdapter(AbstractVerificationEngine):
                     [hex(p) for p in out_ports]
                 )
             r_id = jsonrpc.add_rule(
-                self.socks,
+                self.rpc,
                 self.tables[table],
                 _calc_rule_index(rid),
                 in_ports,
@@ -487,8 +737,7 @@ class NetPlumberAdapter(AbstractVerificationEngine):
                 rewrite.vector
             )
             np_rid = _calc_rule_index(rid, t_idx=tid)
-            self.rule_ids.setdefault(np_rid, [])
-            self.rule_ids[np_rid].append(r_id)
+            self._add_rule_id(np_rid, r_id)
 
 
     def _add_post_routing_rules(self, model):
@@ -512,9 +761,7 @@ class NetPlumberAdapter(AbstractVerificationEngine):
 
             mask = self._build_vector(
                 [
-                    RuleField(
-                        p, '1'*FIELD_SIZES[p]
-                    ) for p in ['in_port', 'out_port'] if p in self.mapping
+                    self._mask_field(p) for p in ['in_port', 'out_port'] if p in self.mapping
                 ],
                 preset='0'
             )
@@ -547,7 +794,7 @@ class NetPlumberAdapter(AbstractVerificationEngine):
                     [hex(p) for p in out_ports]
                 )
             r_id = jsonrpc.add_rule(
-                self.socks,
+                self.rpc,
                 tid,
                 _calc_rule_index(rid),
                 in_ports,
@@ -557,8 +804,12 @@ class NetPlumberAdapter(AbstractVerificationEngine):
                 rewrite.vector if rewrite else None
             )
             np_rid = _calc_rule_index(rid, t_idx=tid)
-            self.rule_ids.setdefault(np_rid, [])
-            self.rule_ids[np_rid].append(r_id)
+            self._add_rule_id(np_rid, r_id)
+
+
+    def _add_rule_id(self, rid, r_id):
+        self.rule_ids.setdefault(rid, []).append(r_id)
+        self.node_to_rule[r_id] = rid
 
 
     def _prepare_generic_rule(self, rule):
@@ -581,11 +832,9 @@ class NetPlumberAdapter(AbstractVerificationEngine):
                         'interface', 'in_port', 'out_port'
                     ] else f for f in action.rewrite
                 ])
-                mask = self._build_vector([
-                    RuleField(
-                        f.name, '1'*FIELD_SIZES[f.name]
-                    ) for f in action.rewrite
-                ], preset='0')
+                mask = self._build_vector(
+                    [self._mask_field(f.name) for f in action.rewrite], preset='0'
+                )
 
             else:
                 if self.logger.isEnabledFor(logging.WARN):
@@ -655,7 +904,7 @@ class NetPlumberAdapter(AbstractVerificationEngine):
                         rewrite if rewrite else "*"
                     )
                 r_id = jsonrpc.add_rule(
-                    self.socks,
+                    self.rpc,
                     tid,
                     fave_rid,
                     in_ports,
@@ -664,7 +913,7 @@ class NetPlumberAdapter(AbstractVerificationEngine):
                     mask,
                     rewrite
                 )
-                self.rule_ids[np_rid].append(r_id)
+                self._add_rule_id(np_rid, r_id)
 
 
     def add_rules(self, model):
@@ -742,11 +991,16 @@ class NetPlumberAdapter(AbstractVerificationEngine):
 
         rids = []
         if batch != []:
-            rids = jsonrpc.add_rules_batch(self.socks, batch)
+            rids = jsonrpc.add_rules_batch(self.rpc, batch)
 
         for r_id, rule in zip(rids, batch):
             np_rid, _tid, _fave_rid, _in, _out, _match, _mask, _rewrite = rule
-            self.rule_ids[np_rid].append(r_id)
+            self._add_rule_id(np_rid, r_id)
+
+        if self.logger.isEnabledFor(logging.DEBUG):
+            self.logger.debug(
+                "worker: field vector cache after batch: %s", field_cache_info()
+            )
 
 
     def delete_rules(self, model):
@@ -756,18 +1010,28 @@ class NetPlumberAdapter(AbstractVerificationEngine):
         model -- a device model
         """
 
+        r_ids = []
         for table in model.tables:
-            tid = table
-
-            only_rid = lambda x: x[0]
-            for rid in [only_rid(x) for x in model.tables[table]]:
-                for r_id in self.rule_ids[_calc_rule_index(rid, t_idx=tid)]:
-                    if self.logger.isEnabledFor(logging.DEBUG):
-                        self.logger.debug(
-                            "worker: remove rule %s from netplumber", r_id
-                        )
-                    jsonrpc.remove_rule(self.socks, r_id)
-                del self.rule_ids[_calc_rule_index(rid, t_idx=tid)]
+            tid = self.tables[table]
+
+            for rule in model.tables[table]:
+                rid = rule["idx"] if isinstance(rule, dict) else rule.idx
+
+                # a rule may have been expanded into several netplumber rules
+                nid = 0
+                while _calc_rule_index(rid, t_idx=tid, n_idx=nid) in self.rule_ids:
+                    np_rid = _calc_rule_index(rid, t_idx=tid, n_idx=nid)
+                    for r_id in self.rule_ids.pop(np_rid):
+                        self.node_to_rule.pop(r_id, None)
+                        if self.logger.isEnabledFor(logging.DEBUG):
+                            self.logger.debug(
+                                "worker: remove rule %s from netplumber", r_id
+                            )
+                        r_ids.append(r_id)
+                    nid += 1
+
+        if r_ids:
+            jsonrpc.remove_rules_batch(self.rpc, r_ids)
 
 
     def delete_wiring(self, model):
@@ -779,6 +1043,7 @@ class NetPlumberAdapter(AbstractVerificationEngine):
 
         prefix = lambda x: '.'.join(x.split('.')[:len(x.split('.'))-1])
 
+        links = []
         for port1, port2 in model.wiring:
             node1 = prefix(port1)
             node2 = prefix(port2)
@@ -786,17 +1051,19 @@ class NetPlumberAdapter(AbstractVerificationEngine):
             idx1 = self.tables[node1]
             idx2 = self.tables[node2]
 
+            gport1 = _calc_port(idx1, model, port1)
+            gport2 = _calc_port(idx2, model, port2)
+
             if self.logger.isEnabledFor(logging.DEBUG):
                 self.logger.debug(
-                    "worker: remove link from %s to %s from netplumber",
-                    _calc_port(idx1, model, port1),
-                    _calc_port(idx2, model, port2)
+                    "worker: remove link from %s to %s from netplumber", gport1, gport2
                 )
-            jsonrpc.remove_link(
-                self.socks,
-                _calc_port(idx1, model, port1),
-                _calc_port(idx2, model, port2)
-            )
+            links.append((gport1, gport2))
+            if gport2 in self.links.get(gport1, []):
+                self._unlink(gport1, gport2)
+
+        if links:
+            jsonrpc.remove_links_batch(self.rpc, links)
 
 
     def delete_tables(self, model):
@@ -807,16 +1074,22 @@ class NetPlumberAdapter(AbstractVerificationEngine):
         """
 
         for table in model.tables:
+            idx = self.tables.get(table)
+            if idx is None:
+                continue
 
-            if not self.tables[table]:
-                if self.logger.isEnabledFor(logging.DEBUG):
-                    self.logger.debug(
-                        "worker: remove table %s with id %s from netplumber",
-                        table,
-                        self.tables[table]
-                    )
-                jsonrpc.remove_table(self.socks, self.tables[table])
-                del self.tables[table]
+            if self.logger.isEnabledFor(logging.DEBUG):
+                self.logger.debug(
+                    "worker: remove table %s with id %s from netplumber", table, idx
+                )
+            jsonrpc.remove_table(self.rpc, idx)
+            del self.table_names[idx]
+            del self.tables[table]
+
+            for port in [p for p in model.ports if model.ports[p] == table]:
+                portno = self.ports.pop(port, None)
+                if portno is not None:
+                    self.port_names.pop(portno, None)
 
 
     def _prepare_generator(self, model):
@@ -826,12 +1099,14 @@ class NetPlumberAdapter(AbstractVerificationEngine):
 
         idx = self.fresh_table_index
         self.tables[name] = idx
+        self.table_names[idx] = name
         self.fresh_table_index += 1
 
         port = name+'.1'
         portno = _calc_port(idx, model, port)
 
         self.ports[port] = portno
+        self.port_names[portno] = port
 
         outgoing = self._build_headerspace(model.fields)
 
@@ -856,7 +1131,7 @@ class NetPlumberAdapter(AbstractVerificationEngine):
                 [v.vector for v in outgoing.hs_diff]
             )
         sid = jsonrpc.add_source(
-            self.socks,
+            self.rpc,
             idx,
             [v.vector for v in outgoing.hs_list],
             [v.vector for v in outgoing.hs_diff],
@@ -896,7 +1171,7 @@ class NetPlumberAdapter(AbstractVerificationEngine):
                 )
 
         sids = jsonrpc.add_sources_bulk(
-            self.socks,
+            self.rpc,
             [
                 (
                     idx,
@@ -919,32 +1194,48 @@ class NetPlumberAdapter(AbstractVerificationEngine):
         node -- the generator's name
         """
 
+        self.delete_generators_bulk([node])
+
+
+    def delete_generators_bulk(self, nodes):
+        """ Deletes a bulk of generator models.
+
+        Arguments:
+        nodes -- the generators' names
+        """
+
         only_sid = lambda x: x[1]
-        sid = only_sid(self.generators[node])
 
-        # delete links
-        port1 = self.global_port(node+'.1')
-        ports = self.links[port1]
-        for port2 in ports:
+        links = []
+        sids = []
+        for node in nodes:
+            sid = only_sid(self.generators[node])
+
+            # delete links
+            port1 = self.global_port(node+'.1')
+            for port2 in list(self.links.get(port1, [])):
+                if self.logger.isEnabledFor(logging.DEBUG):
+                    self.logger.debug(
+                        "worker: remove link from %s to %s from netplumber", port1, port2
+                    )
+                links.append((port1, port2))
+                self._unlink(port1, port2)
+
+            # delete source and probe
             if self.logger.isEnabledFor(logging.DEBUG):
                 self.logger.debug(
-                    "worker: remove link from %s to %s from netplumber", port1, port2
+                    "worker: remove source %s with id %s from netplumber", node, sid
                 )
-            jsonrpc.remove_link(self.socks, port1, port2)
+            sids.append(sid)
 
-            self.links[port1].remove(port2)
+            del self.port_names[port1]
+            del self.table_names[self.tables[node]]
+            del self.tables[node]
 
-        if not self.links[port1]: del self.links[port1]
-
-
-        # delete source and probe
-        if self.logger.isEnabledFor(logging.DEBUG):
-            self.logger.debug(
-                "worker: remove source %s with id %s from netplumber", node, sid
-            )
-        jsonrpc.remove_source(self.socks, sid)
-
-        del self.tables[node]
+        if links:
+            jsonrpc.remove_links_batch(self.rpc, links)
+        if sids:
+            jsonrpc.remove_sources_batch(self.rpc, sids)
 
 
     def _get_model_table(self, node):
@@ -984,12 +1275,14 @@ class NetPlumberAdapter(AbstractVerificationEngine):
 
         idx = self.fresh_table_index
         self.tables[name] = idx
+        self.table_names[idx] = name
         self.fresh_table_index += 1
 
         port = name + '.1'
         portno = _calc_port(idx, model, port)
 
         self.ports[port] = portno
+        self.port_names[portno] = port
 
 #        filter_fields = self._build_headerspace(model.filter_fields)
         test_fields = self._build_headerspace(model.test_fields)
@@ -1056,7 +1349,7 @@ class NetPlumberAdapter(AbstractVerificationEngine):
                 "worker: add probe %s and port %s", name, portno
             )
         pid = jsonrpc.add_source_probe(
-            self.socks,
+            self.rpc,
             [portno],
             model.quantor,
             self._build_vector([
@@ -1085,25 +1378,32 @@ class NetPlumberAdapter(AbstractVerificationEngine):
 
         # find links towards probe
         port2 = self.global_port(node+'.1')
-        sports = [sport for sport in self.links if port2 in self.ports[sport]]
+        sports = list(self.incoming.get(port2, []))
 
+        links = []
         for port1 in sports:
             if self.logger.isEnabledFor(logging.DEBUG):
                 self.logger.debug(
                     "worker: remove link from %s to %s from netplumber", port1, port2
                 )
-            jsonrpc.remove_link(self.socks, port1, port2)
 
-            self.links[port1].remove(port2)
-            if not self.links[port1]: del self.links[port1]
+            # remove all duplicates of the link
+            while port2 in self.links.get(port1, []):
+                links.append((port1, port2))
+                self._unlink(port1, port2)
+
+        if links:
+            jsonrpc.remove_links_batch(self.rpc, links)
 
         # delete source and probe
         if self.logger.isEnabledFor(logging.DEBUG):
             self.logger.debug(
                 "worker: remove probe %s from netplumber", sid
             )
-        jsonrpc.remove_source_probe(self.socks, sid)
+        jsonrpc.remove_source_probe(self.rpc, sid)
 
+        del self.port_names[port2]
+        del self.table_names[self.tables[node]]
         del self.tables[node]
 
 
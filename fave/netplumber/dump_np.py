@@ -38,8 +38,9 @@ def print_help():
     """
 
     print(
-        "dump_np -ahfnp -o <dir>",
+        "dump_np -abhfnp -o <dir>",
         "\t-a dump fave aggregator",
+        "\t-b dump flow trees and convert them to the binary format",
         "\t-h print this help and exit",
         "\t-f dump flows",
         "\t-n dump plumbing network (tables, links, rules, policy)",
@@ -60,7 +61,7 @@ def main(argv):
 
     try:
         only_opts = lambda opts, _args: opts
-        opts = only_opts(*getopt.getopt(argv, "ahfno:pstu"))
+        opts = only_opts(*getopt.getopt(argv, "abhfno:pstu"))
     except getopt.GetoptError:
         print_help()
         sys.exit(2)
@@ -71,6 +72,7 @@ def main(argv):
     use_pipes = False
     use_trees = False
     keep_simple = False
+    use_binary = False
     use_unix = False
 
     odir = "np_dump"
@@ -84,6 +86,10 @@ def main(argv):
         elif opt == '-a':
             use_fave = True
 
+        elif opt == '-b':
+            use_trees = True
+            use_binary = True
+
         elif opt == '-f':
             use_flows = True
 
@@ -126,7 +132,8 @@ def main(argv):
         'network':use_network,
         'pipes':use_pipes,
         'trees':use_trees,
-        'simple':keep_simple
+        'simple':keep_simple,
+        'binary':use_binary
     }
 
     if any([use_fave, use_flows, use_network, use_pipes, use_trees]):
@@ -28,6 +28,8 @@ import json
 import time
 import socket
 
+from util.profile_util import profiled
+
 #import util.dynamic_distribution as dynamic_distribution  # XXX
 
 NET_PLUMBER_DEFAULT_UNIX = '/dev/shm/np1.socket'
@@ -91,6 +93,24 @@ def _asend_recv(socks, msg):
 
 
 
+def _notify(socks, data):
+    """ RPC call without result. The call is pipelined if issued via a client.
+    """
+    if isinstance(socks, RPCClient):
+        socks.submit(data, notify=True)
+    else:
+        _asend_recv(socks, json.dumps(data))
+
+
+def _request(socks, data):
+    """ RPC call that waits for its result and returns the first response.
+    """
+    if isinstance(socks, RPCClient):
+        return socks.submit(data).result()
+
+    return _asend_recv(socks, json.dumps(data))[0]
+
+
 def _extract_node(msg):
     """ Extracts the node ID from node-related RPC call results.
     """
@@ -120,6 +140,210 @@ class RPCError(Exception):
     """
     pass
 
+
+class RPCFuture(object):
+    """ This class provides a handle for the pending result of a pipelined RPC call.
+    """
+
+    def __init__(self, client, idx, targets, notify=False):
+        """ Constructs a future.
+
+        Keyword arguments:
+        client -- the client that issued the call
+        idx -- the call's JSON-RPC ID
+        targets -- the indices of the sockets the call has been sent to
+        notify -- whether nobody waits for the call's result (default: False)
+        """
+
+        self.client = client
+        self.idx = idx
+        self.waiting = set(targets)
+        self.response = None
+        self.error = None
+        self.notify = notify
+
+
+    def done(self):
+        """ Checks whether all responses have arrived.
+        """
+        return not self.waiting
+
+
+    def result(self):
+        """ Waits for the call to finish and returns the first response.
+        """
+
+        self.client.wait(self)
+        if self.error is not None:
+            raise RPCError(self.error)
+
+        return self.response
+
+
+class RPCClient(object):
+    """ This class provides a pipelined JSON-RPC client on persistent NetPlumber
+        connections.
+
+    Calls are buffered and sent in bulk. Responses are matched to their calls by
+    the JSON-RPC ID so that callers only need to wait where they require a result.
+    Errors are stored with their call and raised by its future. Errors of calls
+    without result are collected and raised by the next sync().
+    """
+
+    def __init__(self, socks, buffer_size=65536, max_pending=1024):
+        """ Constructs a client.
+
+        Keyword arguments:
+        socks -- A list of sockets connected to NetPlumber instances or an RPC client
+        buffer_size -- the number of bytes buffered per socket before sending (default: 65536)
+        max_pending -- the maximum number of unanswered calls per socket (default: 1024)
+        """
+
+        self.socks = socks
+        self.buffer_size = buffer_size
+        self.max_pending = max_pending
+        self.next_id = 1
+        self.futures = {}
+        self.errors = []
+        self._wbufs = [[] for _sock in socks]
+        self._wlens = [0 for _sock in socks]
+        self._rbufs = [bytearray() for _sock in socks]
+        self._unanswered = [0 for _sock in socks]
+        self.profiler = None
+        self.calls = 0
+        self.bytes_sent = 0
+        self.bytes_received = 0
+
+
+    def __len__(self):
+        return len(self.socks)
+
+
+    def submit(self, data, targets=None, notify=False):
+        """ Queues an RPC call and returns a future for its result.
+
+        Keyword arguments:
+        data -- the RPC message as dict (its ID is overwritten)
+        targets -- the indices of the sockets to send the call to (default: all)
+        notify -- report errors at the next sync() as nobody waits for the result (default: False)
+        """
+
+        if targets is None:
+            targets = list(range(len(self.socks)))
+
+        data["id"] = self.next_id
+        self.next_id += 1
+
+        msg = (json.dumps(data) + '\n').encode('utf8')
+
+        future = RPCFuture(self, data["id"], targets, notify=notify)
+        self.futures[future.idx] = future
+
+        self.calls += len(targets)
+        for tidx in targets:
+            self._wbufs[tidx].append(msg)
+            self._wlens[tidx] += len(msg)
+            if self._wlens[tidx] >= self.buffer_size or \
+                    len(self._wbufs[tidx]) >= self.max_pending:
+                self._flush(tidx)
+
+        return future
+
+
+    def flush(self):
+        """ Sends all buffered calls.
+        """
+
+        for tidx in range(len(self.socks)):
+            self._flush(tidx)
+
+
+    @profiled('rpc')
+    def _flush(self, tidx):
+        if not self._wbufs[tidx]:
+            return
+
+        self.socks[tidx].sendall(b''.join(self._wbufs[tidx]))
+        self.bytes_sent += self._wlens[tidx]
+        self._unanswered[tidx] += len(self._wbufs[tidx])
+        self._wbufs[tidx] = []
+        self._wlens[tidx] = 0
+
+        # drain responses so that NetPlumber never blocks on a full send buffer
+        while self._unanswered[tidx] > self.max_pending:
+            self._recv_response(tidx)
+
+
+    def _recv_response(self, tidx):
+        buf = self._rbufs[tidx]
+        pos = buf.find(b'\n')
+        while pos == -1:
+            start = len(buf)
+            chunk = self.socks[tidx].recv(65536)
+            if not chunk:
+                raise RPCError("connection to net_plumber closed")
+            buf.extend(chunk)
+            pos = buf.find(b'\n', start)
+
+        data = json.loads(buf[:pos].decode('utf8'))
+        del buf[:pos+1]
+        self._unanswered[tidx] -= 1
+        self.bytes_received += pos + 1
+
+        future = self.futures[data["id"]]
+        future.waiting.discard(tidx)
+        if future.response is None:
+            future.response = data
+        if future.done():
+            del self.futures[future.idx]
+
+        # errors do not abort the call that happens to read the response
+        if "error" in data and data["error"]["code"] != 0 and future.error is None:
+            future.error = data["error"]["message"]
+            if future.notify:
+                self.errors.append("%s: %s" % (data["id"], future.error))
+
+
+    @profiled('rpc')
+    def wait(self, future):
+        """ Waits for all responses of a call.
+
+        Keyword arguments:
+        future -- the future of the call
+        """
+
+        for tidx in list(future.waiting):
+            self._flush(tidx)
+            while tidx in future.waiting:
+                self._recv_response(tidx)
+
+
+    @profiled('rpc')
+    def sync(self):
+        """ Waits for the responses of all queued calls and raises the errors of
+            calls without result.
+        """
+
+        self.flush()
+        for tidx in range(len(self.socks)):
+            while self._unanswered[tidx]:
+                self._recv_response(tidx)
+
+        if self.errors:
+            errors = self.errors
+            self.errors = []
+            raise RPCError("; ".join(errors))
+
+
+    def close(self):
+        """ Waits for all queued calls and closes the connections.
+        """
+
+        self.sync()
+        for sock in self.socks:
+            sock.close()
+
+
 def connect_to_netplumber(server, port=0):
     """ Creates a connected socket to NetPlumber.
 
@@ -163,14 +387,14 @@ def stop(socks):
     """ Stops the NetPlumber service.
 
     Keyword arguments:
-    socks -- A list of sockets connected to NetPlumber instances
+    socks -- A list of sockets connected to NetPlumber instances or an RPC client
     """
 
     data = _basic_rpc()
     data["method"] = "stop"
     data["params"] = None
-    _asend_recv(socks, json.dumps(data))
-    for sock in socks:
+    _request(socks, data)
+    for sock in (socks.socks if isinstance(socks, RPCClient) else socks):
         sock.close()
 
 
@@ -178,33 +402,33 @@ def init(socks, length):
     """ Initializes NetPlumber instances with vectors of a certain length.
 
     Keyword arguments:
-    socks -- A list of sockets connected to NetPlumber instances
+    socks -- A list of sockets connected to NetPlumber instances or an RPC client
     length -- The vector length
     """
 
     data = _basic_rpc()
     data["method"] = "init"
     data["params"] = {"length":length}
-    _asend_recv(socks, json.dumps(data))
+    _request(socks, data)
 
 
 def destroy(socks):
     """ Destroys the active NetPlumber instances.
 
     Keyword arguments:
-    socks -- A list of sockets connected to NetPlumber instances
+    socks -- A list of sockets connected to NetPlumber instances or an RPC client
     """
 
     data = _basic_rpc()
     data["method"] = "destroy"
-    _asend_recv(socks, json.dumps(data))
+    _request(socks, data)
 
 
 def add_table(socks, t_idx, ports):
     """ Adds a table.
 
     Keyword arguments:
-    socks -- A list of sockets connected to NetPlumber instances
+    socks -- A list of sockets connected to NetPlumber instances or an RPC client
     t_idx -- The table's ID
     ports -- The table's ports
     """
@@ -212,28 +436,46 @@ def add_table(socks, t_idx, ports):
     data = _basic_rpc()
     data["method"] = "add_table"
     data["params"] = {"id":t_idx, "in":ports}
-    _asend_recv(socks, json.dumps(data))
+    _notify(socks, data)
+
+
+def add_tables_batch(socks, tables):
+    """ Adds a list of tables.
+
+    Keyword arguments:
+    socks -- A list of sockets connected to NetPlumber instances or an RPC client
+    tables -- The list of tables. Each table is a tuple containing the following:
+        t_idx -- The table's ID
+        ports -- The table's ports
+    """
+
+    data = _basic_rpc()
+    data["method"] = "add_tables"
+    data["params"] = {
+        "tables" : [{"id":t_idx, "in":ports} for t_idx, ports in tables]
+    }
+    _notify(socks, data)
 
 
 def remove_table(socks, t_idx):
     """ Removes a table.
 
     Keyword arguments:
-    socks -- A list of sockets connected to NetPlumber instances
+    socks -- A list of sockets connected to NetPlumber instances or an RPC client
     t_idx -- The table's ID
     """
 
     data = _basic_rpc()
     data["method"] = "remove_table"
     data["params"] = {"id":t_idx}
-    _asend_recv(socks, json.dumps(data))
+    _notify(socks, data)
 
 
 def add_rule(socks, t_idx, r_idx, in_ports, out_ports, match, mask, rewrite):
     """ Adds a rule to a table.
 
     Keyword arguments:
-    socks -- A list of sockets connected to NetPlumber instances
+    socks -- A list of sockets connected to NetPlumber instances or an RPC client
     t_idx -- The table's ID
     r_idx -- The rule's ID
     in_ports -- The rule's matched ports
@@ -254,15 +496,14 @@ def add_rule(socks, t_idx, r_idx, in_ports, out_ports, match, mask, rewrite):
         "mask":mask,
         "rw":rewrite
     }
-    res = _asend_recv(socks, json.dumps(data))
-    return _extract_node(res[0])
+    return _extract_node(_request(socks, data))
 
 
 def add_rules_batch(socks, rules):
     """ Adds a list of rules.
 
     Keyword arguments:
-    socks -- A list of sockets connected to NetPlumber instances
+    socks -- A list of sockets connected to NetPlumber instances or an RPC client
     rules -- The list of rules. Each rule is a tuple containing the following:
         t_idx -- The table's ID
         r_idx -- The rule's ID
@@ -288,29 +529,42 @@ def add_rules_batch(socks, rules):
             } for _np_rid, t_idx, r_idx, in_ports, out_ports, match, mask, rewrite in rules
         ]
     }
-    res = _asend_recv(socks, json.dumps(data))
-    return _extract_nodes(res[0])
+    return _extract_nodes(_request(socks, data))
 
 
 def remove_rule(socks, r_idx):
     """ Removes a rule.
 
     Keyword arguments:
-    socks -- A list of sockets connected to NetPlumber instances
+    socks -- A list of sockets connected to NetPlumber instances or an RPC client
     r_idx -- The rule's ID as returned by its previous add call.
     """
 
     data = _basic_rpc()
     data["method"] = "remove_rule"
     data["params"] = {"node":r_idx}
-    _asend_recv(socks, json.dumps(data))
+    _notify(socks, data)
+
+
+def remove_rules_batch(socks, r_idxs):
+    """ Removes a list of rules.
+
+    Keyword arguments:
+    socks -- A list of sockets connected to NetPlumber instances or an RPC client
+    r_idxs -- The rules' IDs as returned by their previous add calls.
+    """
+
+    data = _basic_rpc()
+    data["method"] = "remove_rules"
+    data["params"] = {"nodes":r_idxs}
+    _notify(socks, data)
 
 
 def add_link(socks, from_port, to_port):
     """ Adds a directed link between two ports.
 
     Keyword arguments:
-    socks -- A list of sockets connected to NetPlumber instances
+    socks -- A list of sockets connected to NetPlumber instances or an RPC client
     from_port -- The link's start port
     to_port -- The link's target port
     """
@@ -318,17 +572,45 @@ def add_link(socks, from_port, to_port):
     data = _basic_rpc()
     data["method"] = "add_link"
     data["params"] = {"from_port":from_port, "to_port":to_port}
-    _asend_recv(socks, json.dumps(data))
+    _notify(socks, data)
+
+
+def add_links_batch(socks, links):
+    """ Adds a list of directed links.
+
+    Keyword arguments:
+    socks -- A list of sockets connected to NetPlumber instances or an RPC client
+    links -- A list of source and destination port pairs
+    """
+
+    data = _basic_rpc()
+    data["method"] = "add_links"
+    data["params"] = {
+        "links" : [
+            {"from_port":from_port, "to_port":to_port} for from_port, to_port in links
+        ]
+    }
+    _notify(socks, data)
 
 
 def add_links_bulk(socks, links, use_dynamic=False):
     """ Adds directed links.
 
     Keyword arguments:
-    socks -- A list of sockets connected to NetPlumber instances
+    socks -- A list of sockets connected to NetPlumber instances or an RPC client
     links -- A list of source and destination port pairs
     """
 
+    if isinstance(socks, RPCClient):
+        for idx, from_port, to_port in links:
+            data = _basic_rpc(idx)
+            data["method"] = "add_link"
+            data["params"] = {"from_port":from_port, "to_port":to_port}
+            socks.submit(
+                data, targets=[idx % len(socks)] if idx != -1 else None, notify=True
+            )
+        return
+
     for idx, from_port, to_port in links:
         if use_dynamic: break
 
@@ -366,7 +648,7 @@ def remove_link(socks, from_port, to_port):
     """ Removes a link.
 
     Keyword arguments:
-    socks -- A list of sockets connected to NetPlumber instances
+    socks -- A list of sockets connected to NetPlumber instances or an RPC client
     from_port -- The link's start port.
     to_port -- The link's target port.
     """
@@ -374,14 +656,32 @@ def remove_link(socks, from_port, to_port):
     data = _basic_rpc()
     data["method"] = "remove_link"
     data["params"] = {"from_port":from_port, "to_port":to_port}
-    _asend_recv(socks, json.dumps(data))
+    _notify(socks, data)
+
+
+def remove_links_batch(socks, links):
+    """ Removes a list of links.
+
+    Keyword arguments:
+    socks -- A list of sockets connected to NetPlumber instances or an RPC client
+    links -- A list of source and destination port pairs
+    """
+
+    data = _basic_rpc()
+    data["method"] = "remove_links"
+    data["params"] = {
+        "links" : [
+            {"from_port":from_port, "to_port":to_port} for from_port, to_port in links
+        ]
+    }
+    _notify(socks, data)
 
 
 def add_source(socks, idx, hs_list, hs_diff, ports, use_dynamic=False):
     """ Adds a source node.
 
     Keyword arguments:
-    socks -- A list of sockets connected to NetPlumber instances
+    socks -- A list of sockets connected to NetPlumber instances or an RPC client
     hs_list -- A list of vectors emitted by the source
     hs_diff -- A list of vectors subtracted by the source's emission
     ports -- The source's egress ports
@@ -411,6 +711,9 @@ def add_source(socks, idx, hs_list, hs_diff, ports, use_dynamic=False):
         #dynamic_distribution.add_node_to_dict(idx, msg) # XXX
         return idx
 
+    if isinstance(socks, RPCClient):
+        return _extract_node(socks.submit(data, targets=[idx % len(socks)]).result())
+
     res = _asend_recv(socks[idx%len(socks):idx%len(socks)+1], json.dumps(data))
     return _extract_node(res[0])
 
@@ -419,7 +722,7 @@ def add_sources_bulk(socks, sources, use_dynamic=False):
     """ Adds source nodes as bulk operation.
 
     Keyword arguments:
-    socks -- A list of sockets connected to NetPlumber instances
+    socks -- A list of sockets connected to NetPlumber instances or an RPC client
     sources -- An index, a list of tuples containing a list of emitted vectors, a list of
                vectors to be subtracted from the source's emission, a list of
                egress ports
@@ -447,6 +750,10 @@ def add_sources_bulk(socks, sources, use_dynamic=False):
                 "ports":ports
             }
 
+        if isinstance(socks, RPCClient):
+            sids[idx] = socks.submit(data, targets=[idx % len(socks)])
+            continue
+
         msg = json.dumps(data)
 
         if use_dynamic:
@@ -455,6 +762,9 @@ def add_sources_bulk(socks, sources, use_dynamic=False):
         else:
             _async_send(socks[idx % len(socks):idx % len(socks)+1], msg)
 
+    if isinstance(socks, RPCClient):
+        return {idx : _extract_node(future.result()) for idx, future in sids.items()}
+
     if not use_dynamic:
         for idx, _hs_list, _hs_diff, _ports in sources:
             res = _sync_recv(socks[idx % len(socks):idx % len(socks)+1])
@@ -468,21 +778,35 @@ def remove_source(socks, s_idx):
     """ Removes a source node.
 
     Keyword arguments:
-    socks -- A list of sockets connected to NetPlumber instances
+    socks -- A list of sockets connected to NetPlumber instances or an RPC client
     s_idx -- The source's ID as returned by its previous add call
     """
 
     data = _basic_rpc()
     data["method"] = "remove_source"
     data["params"] = {"id":s_idx}
-    _asend_recv(socks, json.dumps(data))
+    _notify(socks, data)
+
+
+def remove_sources_batch(socks, s_idxs):
+    """ Removes a list of source nodes.
+
+    Keyword arguments:
+    socks -- A list of sockets connected to NetPlumber instances or an RPC client
+    s_idxs -- The sources' IDs as returned by their previous add calls
+    """
+
+    data = _basic_rpc()
+    data["method"] = "remove_sources"
+    data["params"] = {"ids":s_idxs}
+    _notify(socks, data)
 
 
 def add_source_probe(socks, ports, mode, match, filterexp, test, idx):
     """ Adds a probe node.
 
     Keyword arguments:
-    socks -- A list of sockets connected to NetPlumber instances
+    socks -- A list of sockets connected to NetPlumber instances or an RPC client
     ports -- The probe's ingress ports
     mode -- The probe's mode (existential|universal)
     match -- The probe's match
@@ -500,29 +824,28 @@ def add_source_probe(socks, ports, mode, match, filterexp, test, idx):
         "test":test,
         "id" : idx
     }
-    res = _asend_recv(socks, json.dumps(data))
-    return _extract_node(res[0])
+    return _extract_node(_request(socks, data))
 
 
 def remove_source_probe(socks, sp_idx):
     """ Removes probe node.
 
     Keyword arguments:
-    socks -- A list of sockets connected to NetPlumber instances
+    socks -- A list of sockets connected to NetPlumber instances or an RPC client
     sp_idx -- The probe's ID as returned by its previous add call
     """
 
     data = _basic_rpc()
     data["method"] = "remove_source_probe"
     data["params"] = {"id":sp_idx}
-    _asend_recv(socks, json.dumps(data))
+    _notify(socks, data)
 
 
 def add_slice(socks, nid, ns_list, ns_diff):
     """ Adds a network slice.
 
     Keyword arguments:
-    socks -- A list of sockets connected to NetPlumber instances
+    socks -- A list of sockets connected to NetPlumber instances or an RPC client
     nid -- The slice's ID
     ns_list -- A list of vectors included in the slice
     ns_diff -- A list of vectors subtracted from the slice
@@ -537,21 +860,21 @@ def add_slice(socks, nid, ns_list, ns_diff):
             "diff":ns_diff
         }
     }
-    _asend_recv(socks, json.dumps(data))
+    _notify(socks, data)
 
 
 def remove_slice(socks, nid):
     """ Removes a network slice.
 
     Keyword arguments:
-    socks -- A list of sockets connected to NetPlumber instances
+    socks -- A list of sockets connected to NetPlumber instances or an RPC client
     nid -- The slice's ID
     """
 
     data = _basic_rpc()
     data["method"] = "remove_slice"
     data["params"] = {"id":nid}
-    _asend_recv(socks, json.dumps(data))
+    _notify(socks, data)
 
 
 def add_slice_matrix(socks, matrix):
@@ -561,14 +884,14 @@ def add_slice_matrix(socks, matrix):
     between which reachability is allowed.
 
     Keyword arguments:
-    socks -- A list of sockets connected to NetPlumber instances
+    socks -- A list of sockets connected to NetPlumber instances or an RPC client
     matrix -- The reachability matrix as CSV
     """
 
     data = _basic_rpc()
     data["method"] = "add_slice_matrix"
     data["params"] = {"matrix":matrix}
-    _asend_recv(socks, json.dumps(data))
+    _notify(socks, data)
 
 
 def remove_slice_matrix(socks):
@@ -576,12 +899,12 @@ def remove_slice_matrix(socks):
         for network slices.
 
     Keyword arguments:
-    socks -- A list of sockets connected to NetPlumber instances
+    socks -- A list of sockets connected to NetPlumber instances or an RPC client
     """
 
     data = _basic_rpc()
     data["method"] = "remove_slice_matrix"
-    _asend_recv(socks, json.dumps(data))
+    _notify(socks, data)
 
 
 def add_slice_allow(socks, id1, id2):
@@ -589,7 +912,7 @@ def add_slice_allow(socks, id1, id2):
         id1->id2 between which reachability is allowed
 
     Keyword arguments:
-    socks -- A list of sockets connected to NetPlumber instances
+    socks -- A list of sockets connected to NetPlumber instances or an RPC client
     id1  --- src slice id
     id2  --- dst slice id
     """
@@ -598,7 +921,7 @@ def add_slice_allow(socks, id1, id2):
     data["method"] = "add_slice_allow"
     data["params"] = {"id1": id1,
                       "id2": id2}
-    _asend_recv(socks, json.dumps(data))
+    _notify(socks, data)
 
 
 def remove_slice_allow(socks, id1, id2):
@@ -606,7 +929,7 @@ def remove_slice_allow(socks, id1, id2):
         id1->id2 between which reachability is allowed
 
     Keyword arguments:
-    socks -- A list of sockets connected to NetPlumber instances
+    socks -- A list of sockets connected to NetPlumber instances or an RPC client
     id1  --- src slice id
     id2  --- dst slice id
     """
@@ -615,160 +938,167 @@ def remove_slice_allow(socks, id1, id2):
     data["method"] = "remove_slice_allow"
     data["params"] = {"id1": id1,
                       "id2": id2}
-    _asend_recv(socks, json.dumps(data))
+    _notify(socks, data)
 
 
 def print_slice_matrix(socks):
     """ Prints the reachability matrix to slice logger.
 
     Keyword arguments:
-    socks -- A list of sockets connected to NetPlumber instances
+    socks -- A list of sockets connected to NetPlumber instances or an RPC client
     """
 
     data = _basic_rpc()
     data["method"] = "print_slice_matrix"
-    _asend_recv(socks, json.dumps(data))
+    _request(socks, data)
 
 
 def print_table(socks, t_idx):
     """ Prints a table using NetPlumber's default logger.
 
     Keyword arguments:
-    socks -- A list of sockets connected to NetPlumber instances
+    socks -- A list of sockets connected to NetPlumber instances or an RPC client
     t_idx -- The table's ID
     """
 
     data = _basic_rpc()
     data["method"] = "print_table"
     data["params"] = {"id":t_idx}
-    _asend_recv(socks, json.dumps(data))
+    _request(socks, data)
 
 
 def print_topology(socks):
     """ Prints NetPlumber's topology using its default logger.
 
     Keyword arguments:
-    socks -- A list of sockets connected to NetPlumber instances
+    socks -- A list of sockets connected to NetPlumber instances or an RPC client
     """
 
     data = _basic_rpc()
     data["method"] = "print_topology"
     data["params"] = None
-    _asend_recv(socks, json.dumps(data))
+    _request(socks, data)
 
 
 def print_plumbing_network(socks):
     """ Prints NetPlumber's plumbing network using its default logger.
 
     Keyword arguments:
-    socks -- A list of sockets connected to NetPlumber instances
+    socks -- A list of sockets connected to NetPlumber instances or an RPC client
     """
 
     data = _basic_rpc()
     data["method"] = "print_plumbing_network"
     data["params"] = None
-    _asend_recv(socks, json.dumps(data))
+    _request(socks, data)
 
 def reset_plumbing_network(socks):
     """ Resets NetPlumber to its defaults.
 
     Keyword arguments:
-    socks -- A list of sockets connected to NetPlumber instances
+    socks -- A list of sockets connected to NetPlumber instances or an RPC client
     """
 
     data = _basic_rpc()
     data["method"] = "reset_plumbing_network"
     data["params"] = None
-    _asend_recv(socks, json.dumps(data))
+    _request(socks, data)
 
 
 def expand(socks, new_length):
     """ Expands NetPlumber's vectors to a new length.
 
     Keyword arguments:
-    socks -- A list of sockets connected to NetPlumber instances
+    socks -- A list of sockets connected to NetPlumber instances or an RPC client
     new_length -- The vector's new length
     """
 
     data = _basic_rpc()
     data["method"] = "expand"
     data["params"] = {"length":new_length}
-    _asend_recv(socks, json.dumps(data))
+    _notify(socks, data)
 
 
 def dump_plumbing_network(socks, odir):
     """ Dumps NetPlumber's plumbing network as JSON including tables and rules.
 
     Keyword arguments:
-    socks -- A list of sockets connected to NetPlumber instances
+    socks -- A list of sockets connected to NetPlumber instances or an RPC client
     odir -- The output directory for the JSON files
     """
 
     data = _basic_rpc()
     data["method"] = "dump_plumbing_network"
     data["params"] = {"dir" : odir}
-    _asend_recv(socks[:1], json.dumps(data))
+    if isinstance(socks, RPCClient):
+        socks.submit(data, targets=[0]).result()
+    else:
+        _asend_recv(socks[:1], json.dumps(data))
 
 
 def dump_flows(socks, odir):
     """ Dumps the flows residing in NetPlumber.
 
     Keyword arguments:
-    socks -- A list of sockets connected to NetPlumber instances
+    socks -- A list of sockets connected to NetPlumber instances or an RPC client
     odir -- The output directory for the JSON file
     """
     data = _basic_rpc()
     data["method"] = "dump_flows"
     data["params"] = {"dir" : odir}
-    _asend_recv(socks, json.dumps(data))
+    _request(socks, data)
 
 
 def dump_flow_trees(socks, odir, keep_simple=False):
     """ Dumps the flows residing in NetPlumber as trees.
 
     Keyword arguments:
-    socks -- A list of sockets connected to NetPlumber instances
+    socks -- A list of sockets connected to NetPlumber instances or an RPC client
     odir -- The output directory for the JSON file
     """
     data = _basic_rpc()
     data["method"] = "dump_flow_trees"
     data["params"] = {"dir" : odir, "simple" : keep_simple}
-    _asend_recv(socks, json.dumps(data))
+    _request(socks, data)
 
 
 def dump_pipes(socks, odir):
     """ Dumps the pipelines residing in NetPlumber.
 
     Keyword arguments:
-    socks -- A list of sockets connected to NetPlumber instances
+    socks -- A list of sockets connected to NetPlumber instances or an RPC client
     odir -- The output directory for the JSON file
     """
 
     data = _basic_rpc()
     data["method"] = "dump_pipes"
     data["params"] = {"dir" : odir}
-    _asend_recv(socks, json.dumps(data))
+    _request(socks, data)
 
 
 def dump_slices_pipes(socks, odir):
     """ Dumps the pipelines with slice information residing in NetPlumber.
 
     Keyword arguments:
-    socks -- A list of sockets connected to NetPlumber instances
+    socks -- A list of sockets connected to NetPlumber instances or an RPC client
     odir -- The output directory for the JSON file
     """
 
     data = _basic_rpc()
     data["method"] = "dump_slices_pipes"
     data["params"] = {"dir" : odir}
-    _asend_recv(socks, json.dumps(data))
+    _request(socks, data)
 
 def check_anomalies(socks, table=0, use_shadow=False, use_reach=False, use_general=False):
     """ Checks whether a table contains anomalies such as shadowed or unreachable rules.
 
     Keyword arguments:
-    socks -- A list of sockets connected to NetPlumber instances
+    socks -- A list of sockets connected to NetPlumber instances or an RPC client
     table -- The table ID (0 if all tables should be checked)
+
+    Returns:
+    A list of the anomalies found with the keys type and rule or None if
+    NetPlumber does not report them.
     """
 
     data = _basic_rpc()
@@ -779,17 +1109,21 @@ def check_anomalies(socks, table=0, use_shadow=False, use_reach=False, use_gener
         "use_reach" : use_reach,
         "use_general" : use_general
     }
-    _asend_recv(socks, json.dumps(data))
+    return _request(socks, data)["result"]
 
 def check_compliance(socks, rules):
     """ Checks a set of policy rules for compliance.
 
     Keyword arguments:
-    socks -- A list of sockets connected to NetPlumber instances
+    socks -- A list of sockets connected to NetPlumber instances or an RPC client
     rules -- The compliance rules
+
+    Returns:
+    A list of the checks' results with the keys dst, idx, src, valid, compliant
+    and time (in ms) or None if NetPlumber does not report them.
     """
 
     data = _basic_rpc()
     data["method"] = "check_compliance"
     data["params"] = {"rules":rules}
-    _asend_recv(socks, json.dumps(data))
+    return _request(socks, data)["result"]
@@ -74,16 +74,262 @@ FIELD_SIZES = {
 }
 
 
+# fields whose values can be dictionary-encoded or narrowed to a prefix
+PORT_FIELDS = ["in_port", "out_port", "interface"]
+ADDRESS_FIELDS = [
+    "packet.ipv4.source",
+    "packet.ipv4.destination",
+    "packet.ipv6.source",
+    "packet.ipv6.destination"
+]
+
+
+class PortCodec(object):
+    """ This class dictionary-encodes exact port values to a narrow code.
+
+    Codes are assigned in the order values are encoded. Code 0 is reserved so
+    that the all-zero pattern never denotes a port. The code width is fixed
+    when the field is laid out, so the dictionary cannot grow beyond the
+    ports it was planned for. Models with further ports have to be rejected
+    (see check()) as vectors already stored by NetPlumber cannot be widened.
+    """
+
+    def __init__(self, size, values=None):
+        """ Constructs a port codec.
+
+        Keyword arguments:
+        size -- the code width in bits
+        values -- the values encoded so far in the order of their codes (default: None)
+        """
+
+        self.size = size
+        self.values = values if values is not None else []
+        self.codes = {v : c for c, v in enumerate(self.values, start=1)}
+
+
+    @staticmethod
+    def plan(field, count):
+        """ Creates a codec with room for twice the given number of ports.
+
+        Keyword arguments:
+        field -- the port field
+        count -- the number of ports known up front
+
+        Returns:
+        A codec or None if the codes would not be narrower than the field.
+        """
+
+        size = (2 * count + 1).bit_length()
+        return PortCodec(size) if size < FIELD_SIZES[field] else None
+
+
+    def encode(self, value):
+        """ Encodes a full-width vector string.
+
+        Keyword arguments:
+        value -- an exact or wildcard vector string
+
+        Returns:
+        The code as vector string.
+        """
+
+        if 'x' in value:
+            if value.count('x') != len(value):
+                raise ValueError("cannot encode partial port wildcard: %s" % value)
+            return 'x' * self.size
+
+        try:
+            code = self.codes[value]
+        except KeyError:
+            code = len(self.values) + 1
+            if code >= 1 << self.size:
+                raise ValueError("port dictionary of %s bits is exhausted" % self.size)
+            self.values.append(value)
+            self.codes[value] = code
+
+        return ('{0:0%sb}' % self.size).format(code)
+
+
+    def check(self, values):
+        """ Checks whether a set of values can be encoded without assigning codes.
+
+        Keyword arguments:
+        values -- full-width vector strings
+
+        A ValueError is raised if a value is a partial wildcard or the
+        dictionary lacks room.
+        """
+
+        new = set()
+        for value in values:
+            if 'x' in value:
+                if value.count('x') != len(value):
+                    raise ValueError("cannot encode partial port wildcard: %s" % value)
+            elif value not in self.codes:
+                new.add(value)
+
+        if len(self.values) + len(new) >= 1 << self.size:
+            raise ValueError("port dictionary of %s bits is exhausted" % self.size)
+
+
+    def decode(self, code):
+        """ Decodes a code to its full-width vector string.
+
+        Keyword arguments:
+        code -- the code as vector string
+
+        Returns:
+        The vector string or None if the code is not exact or unassigned.
+        """
+
+        if 'x' in code or int(code, 2) == 0 or int(code, 2) > len(self.values):
+            return None
+        return self.values[int(code, 2) - 1]
+
+
+    def to_json(self):
+        """ Converts the codec to JSON.
+        """
+
+        return {"type" : "port", "size" : self.size, "values" : self.values}
+
+
+class PrefixCodec(object):
+    """ This class narrows address fields to the bits below a common prefix.
+
+    The codec keeps a single prefix shared by all addresses planned with the
+    field instead of a tree of prefixes. A leading flag bit tells whether an
+    address lies within the prefix (1) or not (0). Addresses outside the
+    prefix are not distinguished further and thus cannot be encoded, neither
+    can prefixes shorter than the common one. Models using them have to be
+    rejected (see check()). The codec therefore only pays off for address
+    fields confined to a single network, e.g., a site's internal range.
+    """
+
+    def __init__(self, field, prefix):
+        """ Constructs a prefix codec.
+
+        Keyword arguments:
+        field -- the address field
+        prefix -- the common prefix of all addresses as bit string
+        """
+
+        self.field = field
+        self.prefix = prefix
+        self.size = 1 + FIELD_SIZES[field] - len(prefix)
+
+
+    @staticmethod
+    def plan(field, values):
+        """ Finds the common prefix of a set of address values.
+
+        Keyword arguments:
+        field -- the address field
+        values -- the full-width vector strings of all addresses
+
+        Returns:
+        A codec or None if the addresses do not share a prefix of at least two bits.
+        """
+
+        prefixes = []
+        for value in values:
+            plen = len(value.rstrip('x'))
+            if 'x' in value[:plen]:
+                return None
+            if plen:
+                prefixes.append(value[:plen])
+
+        if not prefixes:
+            return None
+
+        common = min(prefixes, key=len)
+        for prefix in prefixes:
+            while not prefix.startswith(common):
+                common = common[:-1]
+
+        return PrefixCodec(field, common) if len(common) > 1 else None
+
+
+    def encode(self, value):
+        """ Encodes a full-width vector string.
+
+        Keyword arguments:
+        value -- a prefix-shaped vector string
+
+        Returns:
+        The narrowed vector string.
+        """
+
+        plen = len(value.rstrip('x'))
+        if plen == 0:
+            return 'x' * self.size
+        if plen < len(self.prefix) or not value.startswith(self.prefix):
+            raise ValueError(
+                "address %s does not extend the planned prefix %s" % (value, self.prefix)
+            )
+        return '1' + value[len(self.prefix):]
+
+
+    def check(self, values):
+        """ Checks whether a set of values can be encoded.
+
+        Keyword arguments:
+        values -- prefix-shaped full-width vector strings
+
+        A ValueError is raised if a value does not extend the prefix.
+        """
+
+        for value in values:
+            self.encode(value)
+
+
+    def decode(self, code):
+        """ Decodes a narrowed vector string.
+
+        Keyword arguments:
+        code -- the narrowed vector string
+
+        Returns:
+        The full-width vector string or None if it does not lie within the prefix.
+        """
+
+        if code == 'x' * self.size:
+            return 'x' * FIELD_SIZES[self.field]
+        if code[0] != '1':
+            return None
+        return self.prefix + code[1:]
+
+
+    def to_json(self):
+        """ Converts the codec to JSON.
+        """
+
+        return {"type" : "prefix", "field" : self.field, "prefix" : self.prefix}
+
+
+def codec_from_json(j):
+    """ Constructs a field codec from JSON.
+
+    Keyword arguments:
+    j -- a JSON object
+    """
+
+    if j["type"] == "port":
+        return PortCodec(j["size"], values=j["values"])
+    return PrefixCodec(j["field"], j["prefix"])
+
+
 class Mapping(dict):
     """ This class stores mappings of fields giving meaning to bits on a vector.
     """
 
-    def __init__(self, length=0, mapping=None):
+    def __init__(self, length=0, mapping=None, codecs=None):
         """ Contructs a mapping object.
 
         Keyword arguments:
         length -- the total length of the fields chained on a vector
         mapping -- a predefined mapping stored as a dict
+        codecs -- a dict of codecs for fields in a compacted encoding (default: None)
         """
 
         if mapping is None:
@@ -91,6 +337,7 @@ class Mapping(dict):
 
         super(Mapping, self).__init__(mapping)
         self.length = length
+        self.codecs = codecs if codecs is not None else {}
 
 
     def __str__(self):
@@ -109,6 +356,8 @@ class Mapping(dict):
 
         tmp = dict(self)
         tmp["length"] = self.length
+        if self.codecs:
+            tmp["codecs"] = {f : c.to_json() for f, c in self.codecs.items()}
         return tmp
 
 
@@ -125,7 +374,8 @@ class Mapping(dict):
 
         length = j["length"]
         del j["length"]
-        return Mapping(length=length, mapping=j)
+        codecs = {f : codec_from_json(c) for f, c in j.pop("codecs", {}).items()}
+        return Mapping(length=length, mapping=j, codecs=codecs)
 
 
     def __cmp__(self, other):
@@ -144,17 +394,87 @@ class Mapping(dict):
         return True
 
 
-    def extend(self, field):
+    def size(self, field):
+        """ Returns the number of bits a field occupies on a vector.
+
+        Keyword arguments:
+        field -- the field identifier
+        """
+
+        try:
+            return self.codecs[field].size
+        except KeyError:
+            return FIELD_SIZES[field]
+
+
+    def encode(self, field, value):
+        """ Encodes a full-width field value for this mapping.
+
+        Keyword arguments:
+        field -- the field identifier
+        value -- the value as vector string
+
+        Returns:
+        The value as vector string in the field's encoding.
+        """
+
+        try:
+            codec = self.codecs[field]
+        except KeyError:
+            return value
+        return codec.encode(value)
+
+
+    def check(self, field, values):
+        """ Checks whether full-width field values can be encoded for this
+            mapping without changing it.
+
+        Keyword arguments:
+        field -- the field identifier
+        values -- the values as vector strings
+
+        A ValueError is raised if a value cannot be encoded.
+        """
+
+        try:
+            codec = self.codecs[field]
+        except KeyError:
+            return
+        codec.check(values)
+
+
+    def decode(self, field, value):
+        """ Decodes a field value of this mapping to its full width.
+
+        Keyword arguments:
+        field -- the field identifier
+        value -- the value as vector string in the field's encoding
+
+        Returns:
+        The full-width vector string or None if it cannot be represented.
+        """
+
+        try:
+            codec = self.codecs[field]
+        except KeyError:
+            return value
+        return codec.decode(value)
+
+
+    def extend(self, field, codec=None):
         """ Extends the mapping with a field.
 
         Keyword arguments:
         field -- the field identifier to extend the mapping
+        codec -- a codec to compact the field's encoding (default: None)
         """
         if field in self:
             return
 
+        if codec is not None:
+            self.codecs[field] = codec
         self[field] = self.length
-        self.length += FIELD_SIZES[field]
+        self.length += self.size(field)
 
 
     def __add__(self, other):
@@ -164,7 +484,7 @@ class Mapping(dict):
         other -- the added mapping
         """
 
-        mapping = Mapping(length=self.length, mapping=self)
+        mapping = Mapping(length=self.length, mapping=self, codecs=dict(self.codecs))
         mapping.expand(other)
         return mapping
 
@@ -183,5 +503,4 @@ class Mapping(dict):
 
         uncommon = [k for k in other if k not in self]
         for k in uncommon:
-            self[k] = self.length
-            self.length += FIELD_SIZES[k]
+            self.extend(k, codec=other.codecs.get(k))
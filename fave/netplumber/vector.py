@@ -24,7 +24,7 @@
 """
 
 import json
-from netplumber.mapping import FIELD_SIZES
+from netplumber.mapping import FIELD_SIZES, Mapping
 
 def align_headerspace(smapping, tmapping, hspace):
     """ Aligns a headerspace to conform a target mapping.
@@ -73,8 +73,17 @@ def copy_field_between_vectors(s_map, t_map, s_vec, t_vec, field):
     field -- the copied field
     """
 
-    value = get_field_from_vector(s_map, s_vec, field)
-    set_field_in_vector(t_map, t_vec, field, value)
+    s_start = s_map[field]
+    t_start = t_map[field]
+    size = _field_size(s_map, field)
+    care, value = s_vec.get_masks(slice(s_start, s_start+size))
+    t_vec.set_masks(slice(t_start, t_start+size), care, value)
+
+
+def _field_size(mapping, field):
+    if isinstance(mapping, Mapping):
+        return mapping.size(field)
+    return FIELD_SIZES[field]
 
 
 def get_field_from_vector(mapping, vector, field):
@@ -87,7 +96,7 @@ def get_field_from_vector(mapping, vector, field):
     """
 
     start = mapping[field]
-    stop = start + FIELD_SIZES[field]
+    stop = start + _field_size(mapping, field)
     return vector[start:stop]
 
 
@@ -98,11 +107,18 @@ def set_field_in_vector(mapping, vector, field, value):
     mapping -- the vector's mapping
     vector -- the vector
     field -- the field to be set
-    value -- the value to be set
+    value -- the value to be set (either a vector string or a vector)
+
+    Values of the field's full width are encoded if the mapping compacts the
+    field.
     """
 
     start = mapping[field]
-    stop = start + FIELD_SIZES[field]
+    stop = start + _field_size(mapping, field)
+    if stop - start != FIELD_SIZES[field] and len(value) == FIELD_SIZES[field]:
+        value = mapping.encode(
+            field, value.vector if isinstance(value, Vector) else value
+        )
     vector[start:stop] = value
 
 
@@ -110,30 +126,73 @@ def intersect_vectors(vec1, vec2):
     """ Intersects two vectors.
 
     Arguments:
-    vec1 -- a vector
-    vec2 -- another vector
+    vec1 -- a vector or vector string
+    vec2 -- another vector or vector string of the same type
 
     Returns:
     A vector that represents the intersection or None if the intersection is empty.
+    The result is a vector string if both arguments are vector strings.
     """
 
     assert len(vec1) == len(vec2)
 
-    res = ''
+    if isinstance(vec1, Vector) and isinstance(vec2, Vector):
+        return vec1.intersect(vec2)
 
-    for idx, bit1 in enumerate(vec1):
-        bit2 = vec2[idx]
-        if bit1 == 'x': res += bit2
-        elif bit2 == 'x': res += bit1
-        elif bit1 == bit2: res += bit1
-        else:
-            return None
+    res = Vector.from_vector_str(vec1).intersect(Vector.from_vector_str(vec2))
+    return res.vector if res is not None else None
+
+
+_CARE_TABLE = str.maketrans('01x', '110')
+_VALUE_TABLE = str.maketrans('01x', '010')
+_TERNARY_TABLE = str.maketrans('2', 'x')
+
+
+def _str_to_masks(bits):
+    """ Converts a vector string to a pair of care and value masks.
+
+    Keyword arguments:
+    bits -- a vector string
+    """
+
+    if not bits:
+        return 0, 0
+
+    return int(bits.translate(_CARE_TABLE), 2), int(bits.translate(_VALUE_TABLE), 2)
+
+
+def _masks_to_str(care, value, length):
+    """ Converts a pair of care and value masks to a vector string.
 
-    return res
+    Keyword arguments:
+    care -- the care mask
+    value -- the value mask
+    length -- the number of bits
+    """
+
+    if not length:
+        return ''
+
+    fmt = '0%db' % length
+    zeros = int.from_bytes(b'0' * length, 'big')
+    values = int.from_bytes(format(value, fmt).encode('ascii'), 'big')
+    wildcards = int.from_bytes(
+        format(((1 << length) - 1) & ~care, fmt).encode('ascii'), 'big'
+    ) - zeros
+
+    # Adds the wildcard bits as 2 to the ASCII digits. Since value bits of
+    # wildcards are always unset this yields '0', '1', or '2' without carry.
+    digits = values + (wildcards << 1)
+    return digits.to_bytes(length, 'big').decode('ascii').translate(_TERNARY_TABLE)
 
 
 class Vector(object):
     """ This class stores vectors.
+
+    A vector is stored as two bit masks: the care mask has a bit set for every
+    position that is either '0' or '1' and the value mask holds the bits of
+    these positions. The first position of the vector string is the most
+    significant bit of both masks.
     """
 
     def __init__(self, length=0, preset="x"):
@@ -146,8 +205,11 @@ class Vector(object):
 
         assert length >= 0 and preset in ["0", "1", "x"]
 
+        full = (1 << length) - 1
+
         self.length = length
-        self.vector = preset*length
+        self.care = 0 if preset == "x" else full
+        self.value = full if preset == "1" else 0
 
 
     @staticmethod
@@ -167,10 +229,7 @@ class Vector(object):
         if name and len(vectors) != FIELD_SIZES[name]:
             return False
 
-        for bit in vectors:
-            if bit not in ['0', '1', 'x']:
-                return False
-        return True
+        return not vectors.strip('01x')
 
 
     @staticmethod
@@ -185,13 +244,25 @@ class Vector(object):
 
         assert Vector.is_vector(vectors)
 
-        vlen = len(vectors)
-        vec = Vector(vlen)
-        vec.vector = vectors
+        vec = Vector(len(vectors))
+        vec.care, vec.value = _str_to_masks(vectors)
 
         return vec
 
 
+    @property
+    def vector(self):
+        """ The vector string consisting of '0', '1', and 'x'.
+        """
+        return _masks_to_str(self.care, self.value, self.length)
+
+
+    @vector.setter
+    def vector(self, vectors):
+        assert len(vectors) == self.length
+        self.care, self.value = _str_to_masks(vectors)
+
+
     def enlarge(self, size):
         """ Enlarges the vector.
 
@@ -199,23 +270,97 @@ class Vector(object):
         size -- the length added to the vector
         """
         self.length += size
-        self.vector += "x"*size
+        self.care <<= size
+        self.value <<= size
 
 
-    def __setitem__(self, key, value):
+    def _bounds(self, key):
         assert isinstance(key, slice)
-        start = key.start if key.start else 0
-        stop = key.stop if key.stop else self.length
-        before = self.vector[:start]
-        after = self.vector[stop:]
-        self.vector = before + value + after
+        start, stop, step = key.indices(self.length)
+        assert step == 1
+        stop = max(start, stop)
+        return self.length - stop, stop - start
+
+
+    def get_masks(self, key):
+        """ Retrieves the care and value masks of a slice of the vector.
+
+        Keyword arguments:
+        key -- a slice of the vector
+        """
+
+        shift, width = self._bounds(key)
+        full = (1 << width) - 1
+        return (self.care >> shift) & full, (self.value >> shift) & full
+
+
+    def set_masks(self, key, care, value):
+        """ Sets the care and value masks of a slice of the vector.
+
+        Keyword arguments:
+        key -- a slice of the vector
+        care -- the slice's care mask
+        value -- the slice's value mask
+        """
+
+        shift, width = self._bounds(key)
+        full = (1 << width) - 1
+        clear = ~(full << shift)
+        self.care = (self.care & clear) | ((care & full) << shift)
+        self.value = (self.value & clear) | ((value & care & full) << shift)
+
+
+    def intersect(self, other):
+        """ Intersects the vector with another vector.
+
+        Keyword arguments:
+        other -- another vector of the same length
+
+        Returns:
+        A vector that represents the intersection or None if the intersection is empty.
+        """
+
+        assert isinstance(other, Vector) and self.length == other.length
 
-        assert len(self.vector) == self.length
+        if (self.value ^ other.value) & self.care & other.care:
+            return None
+
+        vec = Vector(self.length)
+        vec.care = self.care | other.care
+        vec.value = self.value | other.value
+        return vec
+
+
+    def issubset(self, other):
+        """ Checks whether the vector is covered by another vector.
+
+        Keyword arguments:
+        other -- another vector of the same length
+        """
+
+        assert isinstance(other, Vector) and self.length == other.length
+
+        return not (other.care & ~self.care) and \
+            not ((self.value ^ other.value) & other.care)
+
+
+    def __setitem__(self, key, value):
+        if isinstance(value, Vector):
+            care, val = value.care, value.value
+        else:
+            care, val = _str_to_masks(value)
+
+        assert len(value) == self._bounds(key)[1]
+        self.set_masks(key, care, val)
 
 
     def __getitem__(self, key):
         assert isinstance(key, slice)
-        return self.vector[key]
+        if key.step not in (None, 1):
+            return self.vector[key]
+
+        care, value = self.get_masks(key)
+        return _masks_to_str(care, value, self._bounds(key)[1])
 
 
     def __str__(self):
@@ -227,7 +372,9 @@ class Vector(object):
 
     def __eq__(self, other):
         assert isinstance(other, Vector)
-        return self.length == other.length and self.vector == other.vector
+        return self.length == other.length and \
+            self.care == other.care and \
+            self.value == other.value
 
 
 class HeaderSpace(object):
@@ -370,7 +517,7 @@ class HeaderSpace(object):
             hslv = []
             for field in fields:
                 value = bitvector_to_field_value(
-                    get_field_from_vector(mapping, vector, field), field
+                    get_field_from_vector(mapping, vector, field), field, mapping=mapping
                 )
                 if value:
                     hslv.append("%s = %s" % (field, value))
@@ -382,7 +529,7 @@ class HeaderSpace(object):
             hsdv = []
             for field in fields:
                 value = bitvector_to_field_value(
-                    get_field_from_vector(mapping, vector, field), field
+                    get_field_from_vector(mapping, vector, field), field, mapping=mapping
                 )
                 if value:
                     hsdv.append("%s = %s" % (field, value))
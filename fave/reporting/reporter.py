@@ -1,11 +1,8 @@
 #!/usr/bin/env python3
 
-import time
+from queue import Queue
 import threading
 
-from util.ip6np_util import bitvector_to_field_value
-from netplumber.mapping import FIELD_SIZES
-from netplumber.vector import Vector, get_field_from_vector
 #from enum import Enum
 
 #Log = Enum('Log', ['Compliance', 'Anomalies'])
@@ -14,95 +11,87 @@ class Log:
     Anomalies = 1
 
 
-def _parse_cond(cond, mapping):
-    vec = Vector.from_vector_str(cond)
+class Reporter(threading.Thread):
+    """ Collects compliance violations and anomalies for reports.
 
-    return [
-        (
-            name,
-            bitvector_to_field_value(
-                get_field_from_vector(mapping, vec, name),
-                name
-            )
-        ) for name in mapping if get_field_from_vector(
-            mapping, vec, name
-        ) != 'x' * FIELD_SIZES[name]
-    ]
+    Events are published to a channel as structured tuples while the reporter
+    blocks on the channel and indexes the events by probe and rule as they
+    arrive:
 
+    (Log.Compliance, negated, source, probe, cond) -- a violated compliance
+        check where cond is a list of (field, value) pairs
+    (Log.Anomalies, anomaly, np_rid) -- an anomalous netplumber rule
+    """
 
-class Reporter(threading.Thread):
-    def __init__(self, fave, np_log):
+    def __init__(self, fave):
         super(Reporter, self).__init__()
 
-        self.events = []
-        self.last_compliance = 0
-        self.last_anomalies = 0
+        self.channel = Queue()
         self.stop_reporter = False
         self.fave = fave
-        self.np_log = open(np_log, 'r')
 
+        # probe name -> [(negated, source, cond)]
+        self.violations = {}
+        # fave rule index -> anomaly -> set of netplumber rule ids
+        self.anomalies = {}
 
-    def dump_report(self, dump):
-        # name : (idx, sid, model)
-        id_to_generator = {g[1] : n for n, g in list(self.fave.verification_engine.generators.items())}
 
-        # name : (idx, pid, model)
-        id_to_probe = {g[1] : n for n, g in list(self.fave.verification_engine.probes.items())}
+    def publish(self, event):
+        """ Publishes an event to the reporter.
+
+        Keyword arguments:
+        event -- a compliance or anomaly event
+        """
+
+        self.channel.put(event)
+
+
+    def dump_report(self, dump):
+        # wait until all published events are indexed
+        self.channel.join()
 
         report = [
             "# Report",
             "<introductionary text>"
         ]
 
-        cur_event = len(self.events)
-
-        # fetch recent compliance and anomaly events
-        compliance_events = [entry for entry in self.events[self.last_compliance:cur_event] if entry[0] == Log.Compliance]
-
-        anomaly_events = [entry for entry in self.events[self.last_anomalies:cur_event] if entry[0] == Log.Anomalies]
-
         # generate report
         report.append("\n## Compliance Check")
-        if compliance_events:
+        if self.violations:
             report.append("The following compliance violations have been found:\n")
-            for event in compliance_events:
-                _, negated, from_, to_, cond = event
-                report.append("- `{}` {} `{}`{}".format(
-                    id_to_generator[int(from_)],
-                    "reaches" if not negated else "does not reach",
-                    id_to_probe[int(to_)],
-                    " with \n    - " + '\n    - '.join(
-                        ['='.join(fv) for fv in _parse_cond(cond, self.fave.verification_engine.mapping)]
-                    ) if cond else ""
-                ))
+            for probe, violations in self.violations.items():
+                for negated, source, cond in violations:
+                    report.append("- `{}` {} `{}`{}".format(
+                        source,
+                        "reaches" if negated else "does not reach",
+                        probe,
+                        " with \n    - " + '\n    - '.join(
+                            ['='.join(fv) for fv in cond]
+                        ) if cond else ""
+                    ))
         else:
             report.append("No compliance violations have been found.")
 
+
         report.append("\n## Anomaly Check")
-        if anomaly_events:
+        engine = self.fave.verification_engine
+        shadowed = {
+            fave_rid : np_rids['Shadowed'] for fave_rid, np_rids in self.anomalies.items() \
+                if 'Shadowed' in np_rids
+        }
+        if shadowed:
             report.append("The following anomalies have been found:\n")
 
-            inv_rids = {}
-            for fave_rid, np_rids in list(self.fave.verification_engine.rule_ids.items()):
-                for np_rid in np_rids:
-                    inv_rids[np_rid] = fave_rid
-
-            shadowed_rids = {}
-            for _, np_rid in anomaly_events:
-                fave_rid = inv_rids[np_rid]
-                shadowed_rids.setdefault(fave_rid, [])
-                shadowed_rids[fave_rid].append(np_rid)
-
-            id_to_table = {
-                self.fave.verification_engine.tables[k]:k for k in self.fave.verification_engine.tables
-            }
-
-            for fave_rid, np_rids in list(shadowed_rids.items()):
-                if set(np_rids) == set(self.fave.verification_engine.rule_ids[fave_rid]):
-                    table_id = fave_rid >> 32
-                    model_name = '.'.join(id_to_table[table_id].split('.')[:-1])
+            for fave_rid, np_rids in shadowed.items():
+                # a rule is shadowed if all of its netplumber rules are
+                if np_rids == set(engine.rule_ids.get(fave_rid, [])):
+                    table = engine.table_names.get(fave_rid >> 32)
+                    if table is None:
+                        continue
+
+                    model_name = '.'.join(table.split('.')[:-1])
                     rule_id = (fave_rid & 0xffffffff) >> 12
-                    rules = self.fave.models[model_name].tables[id_to_table[table_id]]
+                    rules = self.fave.models[model_name].tables[table]
                     rule = [r for r in rules if r.idx == rule_id and r.raw_line is not None]
 
                     if not rule:
@@ -118,45 +107,37 @@ class Reporter(threading.Thread):
 
 
     def mark_compliance(self):
-        self.last_compliance = len(self.events)
+        self.channel.join()
+        self.violations = {}
 
 
     def mark_anomalies(self):
-        self.last_anomalies = len(self.events)
+        self.channel.join()
+        self.anomalies = {}
 
 
     def stop(self):
         self.stop_reporter = True
+        self.channel.put(None)
 
 
     def run(self):
         while not self.stop_reporter:
-            raw_line = self.np_log.readline()
+            event = self.channel.get()
 
-            if not raw_line:
-                time.sleep(0.001)
+            if event is None:
+                self.channel.task_done()
                 continue
 
-            # parse line
-            tokens = raw_line.rstrip().split()
-
-            # check if reportable
-            if "DefaultComplianceLogger" in tokens:
-                negated = 1 if tokens[16] == '!' else 0
-                from_ = tokens[16 + negated]
-                to_ = tokens[18 + negated]
-                cond = tokens[20 + negated] if len(tokens) >= 21 + negated else None
-
-                line = (Log.Compliance, negated == 1, from_, to_, cond)
-
-            elif "DefaultAnomalyLogger" in tokens:
-                np_rid = int(tokens[14].rstrip(')'))
-
-                line = (Log.Anomalies, np_rid)
-            else:
-                continue
+            if event[0] == Log.Compliance:
+                _, negated, source, probe, cond = event
+                self.violations.setdefault(probe, []).append((negated, source, cond))
 
-            # add to event buffer
-            self.events.append(line)
+            elif event[0] == Log.Anomalies:
+                _, anomaly, np_rid = event
+                fave_rid = self.fave.verification_engine.node_to_rule.get(np_rid)
+                self.anomalies.setdefault(
+                    fave_rid, {}
+                ).setdefault(anomaly, set()).add(np_rid)
 
-        self.np_log.close()
+            self.channel.task_done()
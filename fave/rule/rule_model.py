@@ -31,10 +31,16 @@ from netplumber.vector import Vector, intersect_vectors
 from netplumber.mapping import FIELD_SIZES
 
 
+# shared field instances by name, value and negation
+_SHARED_FIELDS = {}
+
+
 class RuleField(object):
     """ This class provides a model for switch rules.
     """
 
+    __slots__ = ('name', 'value', 'negated')
+
     def __init__(self, name, value, negated=False):
         self.name = name
         self.value = value
@@ -84,6 +90,26 @@ class RuleField(object):
         )
 
 
+    @staticmethod
+    def shared(name, value, negated=False):
+        """ Returns a field instance that is shared by all callers with the
+            same arguments. The instance must not be modified.
+
+        Arguments:
+        name -- the field's name
+        value -- the field's value
+
+        Keyword arguments:
+        negated -- the field's negation (default: False)
+        """
+
+        key = (name, value, negated)
+        try:
+            return _SHARED_FIELDS[key]
+        except KeyError:
+            return _SHARED_FIELDS.setdefault(key, RuleField(name, value, negated=negated))
+
+
     def __eq__(self, other):
         if other is None: return False
         assert isinstance(other, RuleField)
@@ -253,6 +279,8 @@ class Match(list):
     """ This class provides models for switch rule matches.
     """
 
+    __slots__ = ()
+
     def __init__(self, fields=None):
         super(Match, self).__init__(fields if fields is not None else [])
 
@@ -303,9 +331,7 @@ class Match(list):
         else:
             raise Exception("cannot filter match for a field of type: %s" % type(field))
 
-        for fld in self:
-            if fld.name == name:
-                self.remove(fld)
+        self[:] = [fld for fld in self if fld.name != name]
 
 
     def get(self, field):
@@ -373,6 +399,11 @@ class Rule(object):
     """ This class provides a model for switch rules.
     """
 
+    __slots__ = (
+        'node', 'mtype', 'tid', 'idx', 'in_ports', 'match', 'actions',
+        'raw_line_no', 'raw_line'
+    )
+
     def __init__(self, node, tid, idx, in_ports=None, match=None, actions=None, raw_line_no=None, raw_line=None):
         self.node = node
         self.mtype = "switch_rule"
@@ -25,11 +25,4 @@ THREADS=$2
 
 DUMP=$3
 
-for i in $(seq 0 $((THREADS-1))); do
-     python3 test/check_flows.py -b -r -t "$i:$THREADS" -f "$CHECKS" -d $DUMP &
-     pids[${i}]=$!
-done
-
-for pid in ${pids[*]}; do
-     wait $pid
-done
+python3 test/check_flows.py -b -r -P "$THREADS" -f "$CHECKS" -d $DUMP
@@ -474,7 +474,9 @@ class TopologyRenderer(object):
 
         for field, offset in list(self.fave_mapping.items()):
             binary = get_field_from_vector(self.fave_mapping, vec, field)
-            readable = bitvector_to_field_value(binary, field, **kwargs)
+            readable = bitvector_to_field_value(
+                binary, field, mapping=self.fave_mapping, **kwargs
+            )
             if readable:
                 res.append("%s=%s" % (field, readable))
 
@@ -26,12 +26,14 @@ SOCK_PARAMS="-s 127.0.0.1 -p 44000"
 BACK_PARAMS=""
 DEBUG_PARAMS=""
 MAP_PARAMS=""
+WORKER_PARAMS=""
+ASYNC_PARAMS=""
 
 UNIX=""
 
-usage() { echo "usage: $0 [-hdut] [-S <backend>] [-m <mapping>]" 2>&2; }
+usage() { echo "usage: $0 [-hdutA] [-S <backend>] [-m <mapping>] [-w <workers>] [-q <depth>]" 2>&2; }
 
-while getopts "hadm:uS:t" o; do
+while getopts "hadm:uS:tw:Aq:" o; do
     case "${o}" in
         h)
             usage
@@ -55,6 +57,15 @@ while getopts "hadm:uS:t" o; do
         t)
             DEBUG_PARAMS="-t"
             ;;
+        w)
+            WORKER_PARAMS="-w ${OPTARG}"
+            ;;
+        A)
+            ASYNC_PARAMS="-A $ASYNC_PARAMS"
+            ;;
+        q)
+            ASYNC_PARAMS="$ASYNC_PARAMS -q ${OPTARG}"
+            ;;
         *)
             usage
             exit 1
@@ -67,7 +78,7 @@ if [ -n "$UNIX" ]; then
     SOCK_PARAMS="$SOCK_PARAMS -u"
 fi
 
-python3 aggregator/aggregator_service.py $MAP_PARAMS $SOCK_PARAMS $BACK_PARAMS $DEBUG_PARAMS &
+python3 aggregator/aggregator_service.py $MAP_PARAMS $SOCK_PARAMS $BACK_PARAMS $DEBUG_PARAMS $WORKER_PARAMS $ASYNC_PARAMS &
 
 #PID=$!
 #echo $PID > $DIR/aggr.pid
@@ -22,12 +22,14 @@
 """ This module provides functionality to check FaVe dumps for flow conformity.
 """
 
+import os
 import sys
 import json
 import csv
 import time
 import argparse
-import cachetools
+
+from concurrent.futures import ProcessPoolExecutor
 import pyparsing as pp
 
 from filelock import FileLock
@@ -37,7 +39,8 @@ from util.ip6np_util import field_value_to_bitvector
 from util.match_util import OXM_FIELD_TO_MATCH_FIELD
 from netplumber.vector import get_field_from_vector
 from netplumber.vector import HeaderSpace
-from netplumber.mapping import FIELD_SIZES
+from netplumber.mapping import FIELD_SIZES, Mapping
+from util.flow_tree_util import iter_flow_tree_leaves, FlowTreeDump
 
 
 _MEASUREMENTS = []
@@ -59,14 +62,21 @@ def check_field(flow, field, value, mapping):
     value -- the value to be checked
     mapping -- the mapping between field names and positions in a flow
     """
-    field = _NORMALIZE_FIELD[field]
     header_space = HeaderSpace.from_str(flow)
+    return _check_field_vector(header_space.hs_list[0], field, value, mapping)
+
+
+def _check_field_vector(vector, field, value, mapping):
+    field = _NORMALIZE_FIELD[field]
 
     try:
-        vector = get_field_from_vector(mapping, header_space.hs_list[0], field)
+        vector = get_field_from_vector(mapping, vector, field)
     except KeyError:
         return False
 
+    if isinstance(mapping, Mapping):
+        vector = mapping.decode(field, vector)
+
     rule_field = RuleField(field, value)
     rule_vector = field_value_to_bitvector(rule_field).vector
     return vector == rule_vector or vector == 'x'*FIELD_SIZES[field]
@@ -136,13 +146,11 @@ def check_tree(flow, tree, depth=0):
     return False
 
 
-def check_flow(flow_spec, flow_tree, inv_fave):
-    """ Checks if a flow tree satisfies a flow path specification.
+def _compile_flow_spec(flow_spec, inv_fave):
+    """ Translates a parsed flow path specification to node ids.
 
-    Keyword arguments:
-    flow_spec -- path to be checked
-    flow_tree -- flow tree to be matched
-    inv_fave -- inverse fave mappings
+    Returns:
+    A pair of the negation and the list of checks.
     """
 
     nflow = []
@@ -158,7 +166,7 @@ def check_flow(flow_spec, flow_tree, inv_fave):
             try:
                 crule = ('START', [inv_fave["generator_to_id"][tname]])
             except KeyError as key_error:
-                print("skip unknown generator: %s" % key_error.message, file=sys.stderr)
+                print("skip unknown generator: %s" % key_error, file=sys.stderr)
                 raise
             nflow.append(crule)
         elif tok in ['EX', 'EF']:
@@ -171,7 +179,7 @@ def check_flow(flow_spec, flow_tree, inv_fave):
                     inv_fave["table_id_to_rules"].get(inv_fave["table_to_id"][tname], [])
                 )
             except KeyError as key_error:
-                print("skip unknown entity: %s" % key_error.message, file=sys.stderr)
+                print("skip unknown entity: %s" % key_error, file=sys.stderr)
                 raise
             nflow.append(crules)
 
@@ -185,9 +193,185 @@ def check_flow(flow_spec, flow_tree, inv_fave):
         else:
             raise Exception("cannot handle token: %s" % tok)
 
+    return negated, nflow
+
+
+def check_flow(flow_spec, flow_tree, inv_fave):
+    """ Checks if a flow tree satisfies a flow path specification.
+
+    Keyword arguments:
+    flow_spec -- path to be checked
+    flow_tree -- flow tree or flow tree index to be matched
+    inv_fave -- inverse fave mappings
+    """
+
+    negated, nflow = _compile_flow_spec(flow_spec, inv_fave)
+
+    if isinstance(flow_tree, FlowTreeIndex):
+        return negated != flow_tree.check(nflow)
+
     return negated != check_tree(nflow, flow_tree)
 
 
+class FlowTreeIndex(object):
+    """ This class provides an index of a flow tree for repeated checks.
+
+    The tree is flattened in pre-order so that every subtree occupies a
+    contiguous range of positions. Flows are decoded once on first use.
+    """
+
+    def __init__(self, flow_tree, dump=None):
+        """ Builds the index of a flow tree.
+
+        Keyword arguments:
+        flow_tree -- a flow tree as dumped by NetPlumber or the index of its
+            root in a binary dump
+        dump -- a binary flow tree dump (default: None)
+        """
+
+        self.nodes = []
+        self.depths = []
+        self.parents = []
+        self.ends = []
+        self.children = []
+        self.raw_flows = []
+        self.flows = {}
+        self.dump = dump
+
+        # the positions of every node id in pre-order
+        self.positions = {}
+        # the node ids reached per depth
+        self.depth_nodes = []
+        # the leaves per node id
+        self.leaves = {}
+
+        if dump is None:
+            node_of = lambda tree: tree['node']
+            flow_of = lambda tree: tree.get('flow')
+            children_of = lambda tree: tree.get('children')
+        else:
+            # flows stay in the memory-mapped dump until they are decoded
+            node_of = dump.node
+            flow_of = lambda idx: idx
+            children_of = lambda idx: None if dump.is_leaf(idx) else dump.children(idx)
+
+        stack = [(flow_tree, -1, 0)]
+        while stack:
+            tree, parent, depth = stack.pop()
+            pos = len(self.nodes)
+            node = node_of(tree)
+
+            self.nodes.append(node)
+            self.depths.append(depth)
+            self.parents.append(parent)
+            self.ends.append(pos + 1)
+            self.children.append([])
+            self.raw_flows.append(flow_of(tree))
+            self.positions.setdefault(node, []).append(pos)
+
+            if depth == len(self.depth_nodes):
+                self.depth_nodes.append(set())
+            self.depth_nodes[depth].add(node)
+
+            if parent >= 0:
+                self.children[parent].append(pos)
+
+            children = children_of(tree)
+            if children is not None:
+                for child in reversed(children):
+                    stack.append((child, pos, depth + 1))
+            else:
+                self.leaves[node] = pos
+
+        # subtree ends are determined bottom-up
+        for pos in range(len(self.nodes) - 1, 0, -1):
+            parent = self.parents[pos]
+            self.ends[parent] = max(self.ends[parent], self.ends[pos])
+
+
+    def flow(self, pos):
+        """ Returns the decoded flow vector of the node at a position.
+        """
+
+        try:
+            return self.flows[pos]
+        except KeyError:
+            raw = self.raw_flows[pos]
+            if self.dump is not None:
+                raw = self.dump.flow(raw)
+            vec = HeaderSpace.from_str(raw).hs_list[0]
+            self.flows[pos] = vec
+            return vec
+
+
+    def leaf_flow(self, node):
+        """ Returns the decoded flow of a leaf or None if no such leaf exists.
+        """
+
+        pos = self.leaves.get(node)
+        return self.flow(pos) if pos is not None else None
+
+
+    def _first_occurrences(self, pos, nodes):
+        # yields descendants with a node id in nodes that have no such ancestor
+        # below pos which mirrors the traversal of check_tree()
+        end = self.ends[pos]
+        for node in nodes:
+            for cand in self.positions.get(node, []):
+                if cand <= pos or cand >= end:
+                    continue
+
+                anc = self.parents[cand]
+                while anc != pos and self.nodes[anc] not in nodes:
+                    anc = self.parents[anc]
+                if anc == pos:
+                    yield cand
+
+
+    def check(self, flow, pos=0):
+        """ Checks whether a compiled flow specification matches a branch.
+
+        This yields the same result as check_tree() on the original tree.
+
+        Keyword arguments:
+        flow -- a compiled flow specification
+        pos -- the position of the subtree to be checked (default: 0)
+        """
+
+        if not flow:
+            return True
+
+        op = flow[0][0]
+
+        if op == 'START':
+            return self.nodes[pos] in flow[0][1] and self.check(flow[1:], pos)
+
+        elif op == 'EX':
+            nodes = set(flow[0][1])
+            depth = self.depths[pos] + 1
+            if depth == len(self.depth_nodes) or self.depth_nodes[depth].isdisjoint(nodes):
+                return False
+
+            return any(
+                self.nodes[child] in nodes and self.check(flow[1:], child)
+                for child in self.children[pos]
+            )
+
+        elif op == 'EF':
+            nodes = set(flow[0][1])
+            if not self.children[pos]:
+                return self.nodes[pos] in nodes and not flow[1:]
+
+            return any(
+                self.check(flow[1:], cand) for cand in self._first_occurrences(pos, nodes)
+            )
+
+        elif op == 'FLOW':
+            return _check_field_vector(self.flow(pos), flow[0][1], flow[0][2], flow[0][3])
+
+        return False
+
+
 def _get_inverse_fave(dump):
     fave = json.load(open(dump+"/fave.json", "r"))
 
@@ -205,7 +389,7 @@ def _get_inverse_fave(dump):
         "table_id_to_rules" : table_id_to_rules,
         "generator_to_id" : dict([(v, int(k)) for k, v in list(fave["id_to_generator"].items())]),
         "probe_to_id" : dict([(v, int(k)) for k, v in list(fave["id_to_probe"].items())]),
-        "mapping" : fave["mapping"]
+        "mapping" : Mapping.from_json(dict(fave["mapping"]))
     }
 
 
@@ -307,25 +491,127 @@ def _get_flow_tree_leaves(flow_tree):
     return leaves
 
 
+def _get_flow_tree_indexes(dump, cache):
+    if dump not in cache:
+        binary = dump[:-len("json")] + "bin"
+        # binary dumps older than their json dump are left over from a
+        # previous dump and thus ignored
+        if os.path.exists(binary) and \
+                os.path.getmtime(binary) >= os.path.getmtime(dump):
+            # binary dumps are memory-mapped and walked by offset
+            tree_dump = FlowTreeDump(binary)
+            cache[dump] = [FlowTreeIndex(root, tree_dump) for root in tree_dump.roots]
+        else:
+            cache[dump] = [FlowTreeIndex(ft) for ft in _get_flow_tree(dump, {})]
+
+    return cache[dump]
+
+
 def _check_flow_trees(flow_spec, flow_trees, inv_fave, cache):
     source = _get_source(flow_spec)
-    fts = _get_flow_tree(flow_trees[source], cache)
+    indexes = _get_flow_tree_indexes(flow_trees[source], cache)
 
     t_start = time.time()
 
     res = False
-    for flow_tree in fts:
-        if check_flow(flow_spec, flow_tree, inv_fave):
+    for index in indexes:
+        if check_flow(flow_spec, index, inv_fave):
             res = True
             break
 
     t_end = time.time()
-    print("checked flow in %s ms" % ((t_end - t_start) * 1000.0))
     _MEASUREMENTS.append((t_end - t_start) * 1000.0)
 
     return res
 
 
+def _get_flow_tree_leaves_streamed(dump):
+    # streams the leaves of the dump's first flow tree
+    with open(dump, "r") as dump_file:
+        return {
+            leaf.node : leaf.flow for leaf in iter_flow_tree_leaves(dump_file) if leaf.tree == 0
+        }
+
+
+def _check_broad_flow_specs(leaves, specs, inv_fave):
+    mapping = inv_fave['mapping']
+    decoded = {}
+
+    results = []
+    for spec_no, (dst, neg, flds, _spec) in specs:
+        node = inv_fave['probe_to_id'][dst]
+
+        if node not in leaves:
+            results.append((spec_no, neg))
+            continue
+
+        if node not in decoded:
+            decoded[node] = HeaderSpace.from_str(leaves[node]).hs_list[0]
+        leaf = decoded[node]
+
+        res = True
+        for fld in flds:
+            field, value = fld.split(':')
+            res = res and _check_field_vector(leaf, field, value, mapping)
+
+        results.append((spec_no, not (res and neg)))
+
+    return results
+
+
+_INV_FAVE = {}
+
+
+def _init_worker(inv_fave):
+    _INV_FAVE.clear()
+    _INV_FAVE.update(inv_fave)
+
+
+def _check_source(path, specs, broad):
+    """ Checks all flow specifications of a source.
+
+    This function is run by the checker's worker processes.
+
+    Keyword arguments:
+    path -- the path to the source's flow tree dump
+    specs -- a list of numbered flow specifications
+    broad -- check the specifications' probes and fields only
+
+    Returns:
+    A pair of the results per specification number and the measurements.
+    Results are None if the specification refers to unknown entities.
+    """
+
+    mark = len(_MEASUREMENTS)
+
+    if broad:
+        leaves = _get_flow_tree_leaves_streamed(path)
+
+        t_start = time.time()
+        results = _check_broad_flow_specs(leaves, specs, _INV_FAVE)
+        t_end = time.time()
+
+        print("checked flow tree %s in %s ms" % (path, ((t_end - t_start) * 1000.0)))
+        _MEASUREMENTS.append((t_end - t_start) * 1000.0)
+
+    else:
+        cache = {}
+        results = []
+        for spec_no, flow_spec in specs:
+            try:
+                successful = _check_flow_trees(
+                    flow_spec, {_get_source(flow_spec) : path}, _INV_FAVE, cache
+                )
+            except KeyError:
+                successful = None
+            results.append((spec_no, successful))
+
+    measurements = _MEASUREMENTS[mark:]
+    del _MEASUREMENTS[mark:]
+
+    return results, measurements
+
+
 def _build_ordered_flow_specs(flow_specs):
     ordered_flow_specs = {}
     for flow_spec in flow_specs:
@@ -388,10 +674,6 @@ def _parse_flow_spec_json(arg):
     return [_parse_flow_spec(flow, parser) for flow in json.load(open(arg, 'r'))]
 
 
-def _parse_threads(arg):
-    return (int(x) for x in arg.split(':'))
-
-
 def main(argv):
     """ Main method.
     """
@@ -435,10 +717,10 @@ def main(argv):
         default=[]
     )
     parser.add_argument(
-        '-t', '--threads',
-        dest='threads',
-        type=_parse_threads,
-        default=(0, 1)
+        '-P', '--processes',
+        dest='processes',
+        type=int,
+        default=1
     )
 
     args = parser.parse_args(argv)
@@ -449,8 +731,6 @@ def main(argv):
         parser.print_help()
         return 2
 
-    tid, threads = args.threads
-
     with FileLock("%s/.lock" % args.dump, timeout=-1):
         inv_fave = _get_inverse_fave(args.dump)
         flow_trees = {
@@ -459,62 +739,68 @@ def main(argv):
             ) for k, v in inv_fave["generator_to_id"].items()
         }
 
-    failed = []
-    reach = {'' : {'' : ''}}
-    cache = cachetools.LRUCache(10)
+    # shard the specifications by source
+    shards = {}
     if args.broad:
-        ordered_flow_specs = _build_ordered_flow_specs(args.flow_specs)
-
-        mapping = inv_fave['mapping']
-
-        for src, specs in [
-                item for idx, item in enumerate(
-                    ordered_flow_specs.items()
-                ) if idx % threads == tid
-            ]:
-            flow_tree = _get_flow_tree(flow_trees[src], cache)[0]
-
-            t_start = time.time()
-
-            flow_tree_leaves = _get_flow_tree_leaves(flow_tree)
-
-            for dst, neg, flds, spec in specs:
-
-                if not inv_fave['probe_to_id'][dst] in flow_tree_leaves:
-                    if not neg:
-                        failed.append(' '.join([e for e in spec if e != ' ']))
-                    continue
+        flow_specs = []
+        for src, specs in _build_ordered_flow_specs(args.flow_specs).items():
+            for spec in specs:
+                shards.setdefault(src, []).append((len(flow_specs), spec))
+                flow_specs.append(spec[-1])
+    else:
+        flow_specs = args.flow_specs
+        for spec_no, flow_spec in enumerate(flow_specs):
+            try:
+                src = _get_source(flow_spec)
+            except Exception:
+                src = None
+            shards.setdefault(src, []).append((spec_no, flow_spec))
+
+    # specifications of unknown sources have no results
+    tasks = [
+        (flow_trees[src], specs) for src, specs in shards.items() if src in flow_trees
+    ]
 
-                leaf = flow_tree_leaves[inv_fave['probe_to_id'][dst]]
-                res = True
+    if args.processes > 1:
+        with ProcessPoolExecutor(
+                max_workers=args.processes,
+                initializer=_init_worker,
+                initargs=(inv_fave,)
+        ) as pool:
+            shard_results = list(pool.map(
+                _check_source,
+                [path for path, _specs in tasks],
+                [specs for _path, specs in tasks],
+                [args.broad] * len(tasks)
+            ))
+    else:
+        _init_worker(inv_fave)
+        shard_results = [
+            _check_source(path, specs, args.broad) for path, specs in tasks
+        ]
 
-                for fld in flds:
-                    field, value = fld.split(':')
-                    res = res and check_field(leaf['flow'], field, value, mapping)
+    results = {}
+    for shard_result, measurements in shard_results:
+        results.update(shard_result)
+        _MEASUREMENTS.extend(measurements)
 
-                if res and neg:
-                    failed.append(' '.join([e for e in spec if e != ' ']))
+    failed = []
+    reach = {'' : {'' : ''}}
+    for spec_no, flow_spec in enumerate(flow_specs, start=1):
+        successful = results.get(spec_no - 1)
 
-            t_end = time.time()
-            print("thread %s: checked flow tree in %s ms" % (tid, ((t_end - t_start) * 1000.0)))
-            _MEASUREMENTS.append((t_end - t_start) * 1000.0)
+        if successful is None and not args.broad:
+            _update_reachability_matrix(reach, flow_spec, False, exception=True)
+            continue
 
-    else:
-        for spec_no, flow_spec in enumerate(args.flow_specs, start=1):
-            try:
-                successful = _check_flow_trees(flow_spec, flow_trees, inv_fave, cache)
-            except KeyError:
-                _update_reachability_matrix(reach, flow_spec, False, exception=True)
-                continue
+        if not successful:
+            failed.append(' '.join([e for e in flow_spec if e != ' ']))
 
-            if not successful:
-                failed.append(' '.join([e for e in flow_spec if e != ' ']))
-                _update_reachability_matrix(reach, flow_spec, False)
-            else:
-                _update_reachability_matrix(reach, flow_spec, True)
+        if not args.broad:
+            _update_reachability_matrix(reach, flow_spec, bool(successful))
 
-            if spec_no % 1000 == 0:
-                print("  checked %s flows" % spec_no)
+        if spec_no % 1000 == 0:
+            print("  checked %s flows" % spec_no)
 
     print((
         "success: all %s checked flows matched" % len(args.flow_specs)
@@ -525,7 +811,7 @@ def main(argv):
     ))
 
     print(("\n\t".join([
-        "thread %s: runtimes:" % tid,
+        "runtimes:",
         "total: %s ms" % sum(_MEASUREMENTS),
         "mean: %s ms" % (sum(_MEASUREMENTS)/len(_MEASUREMENTS)),
         "median: %s ms" % sorted(_MEASUREMENTS)[int(len(_MEASUREMENTS)/2)],
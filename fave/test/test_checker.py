@@ -23,9 +23,13 @@
 """
 
 import unittest
+import tempfile
+import json
+import io
 
-from test.check_flows import check_flow, _parse_flow_spec
+from test.check_flows import check_flow, _parse_flow_spec, FlowTreeIndex
 from test.check_flows import _get_parser as get_default_parser
+from util.flow_tree_util import write_binary_flow_trees, FlowTreeDump
 
 class TestChecker(unittest.TestCase):
     """ This class provides tests for the flow checking tool.
@@ -130,5 +134,67 @@ class TestChecker(unittest.TestCase):
             )
 
 
+    def test_flow_tree_index(self):
+        """ Tests path specifications against an indexed flow tree.
+        """
+
+        index = FlowTreeIndex(self.flow_tree)
+
+        self.assertEqual(index.nodes, [1, 4294967297, 2, 8589934594])
+        self.assertEqual(index.depth_nodes, [{1}, {4294967297, 8589934594}, {2}])
+        self.assertEqual(index.leaves, {2 : 2, 8589934594 : 3})
+        self.assertEqual(index.leaf_flow(2).vector, "00000001")
+        self.assertIsNone(index.leaf_flow(3))
+
+        checks = [
+            "s=source1 && EX t=table1",
+            "s=source1 && EX t=table3",
+            "! s=source1 && EX t=table3",
+            "s=source1 && EF p=probe1",
+            "s=source1 && EF p=probe2",
+            "s=source1 && EF p=probe1 && f=related:1",
+            "s=source1 && EF p=probe1 && f=related:0",
+            "! s=source1 && EF p=probe1 && f=related:0",
+            "s=source1 && EX t=table2 && f=related:0",
+            "s=source1 && EX t=table2 && f=related:1",
+            "s=source1 && EX t=table1 && EX p=probe1",
+            "s=source1 && EF t=table1 && EF p=probe1"
+        ]
+
+        for check in checks:
+            flow_spec = _parse_flow_spec(check, self.parser)
+            self.assertEqual(
+                check_flow(flow_spec, index, self.inv_fave),
+                check_flow(flow_spec, self.flow_tree, self.inv_fave),
+                check
+            )
+
+
+    def test_binary_flow_tree_index(self):
+        """ Tests indexing a flow tree from a binary dump.
+        """
+
+        with tempfile.NamedTemporaryFile(suffix='.flow_tree.bin') as ofile:
+            write_binary_flow_trees(
+                io.StringIO(json.dumps({'flows' : [self.flow_tree]}, sort_keys=True)),
+                ofile
+            )
+            ofile.flush()
+
+            with FlowTreeDump(ofile.name) as dump:
+                index = FlowTreeIndex(dump.roots[0], dump)
+                expected = FlowTreeIndex(self.flow_tree)
+
+                self.assertEqual(index.nodes, expected.nodes)
+                self.assertEqual(index.ends, expected.ends)
+                self.assertEqual(index.leaves, expected.leaves)
+                self.assertEqual(index.leaf_flow(2).vector, "00000001")
+
+                flow_spec = _parse_flow_spec(
+                    "s=source1 && EF p=probe1 && f=related:1", self.parser
+                )
+                self.assertTrue(check_flow(flow_spec, index, self.inv_fave))
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+
+# -*- coding: utf-8 -*-
+
+# Copyright 2020 Claas Lorenz <claas_lorenz@genua.de>
+
+# This file is part of FaVe.
+
+# FaVe is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# FaVe is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with FaVe.  If not, see <https://www.gnu.org/licenses/>.
+
+""" This module provides tests for the line-oriented ip6tables parser.
+"""
+
+import unittest
+import os
+import gc
+
+from iptables.line_parser import IP6TablesLineParser
+from util.tree_util import Tree
+
+
+def _build_tree_from_tuples(tpls):
+    if not isinstance(tpls, tuple):
+        val = tpls
+        neg = isinstance(val, str) and val.startswith("! ")
+        if neg:
+            val = val[2:]
+        leaf = Tree(val)
+        if neg:
+            leaf.set_negated()
+        return leaf
+
+    tree = _build_tree_from_tuples(tpls[0])
+    for tpl in tpls[1:]:
+        tree.add_child(_build_tree_from_tuples(tpl))
+    return tree
+
+
+class TestLineParser(unittest.TestCase):
+    """ This class provides tests for the line-oriented ip6tables parser.
+    """
+
+
+    def setUp(self):
+        self.parser = IP6TablesLineParser()
+
+
+    def tearDown(self):
+        del self.parser
+
+
+    def _assert_tree(self, res, exp):
+        self.assertEqual(res.stringify(), exp.stringify())
+
+
+    def test_minimal_ruleset(self):
+        """ Tests a minimal rule set consisting of only one policy rule.
+        """
+
+        ruleset = "ip6tables -P FORWARD ACCEPT"
+
+        name = "/tmp/ruleset-line-minimal"
+        try:
+            with open(name, 'w') as rfile:
+                rfile.write(ruleset + '\n')
+
+            res = self.parser.parse(name)
+
+        finally:
+            os.remove(name)
+
+        exp = _build_tree_from_tuples((
+            "root", (
+                ruleset, (
+                    "-P", (
+                        "FORWARD", ("ACCEPT",)
+                    )
+                ),
+                ("-t", ("filter",)),
+                ("--line-no", (1,))
+            )
+        ))
+
+        self._assert_tree(res, exp)
+
+
+    def test_small_ruleset(self):
+        """ Tests a small rule set consisting of one policy and two regular rules.
+        """
+
+        res = self.parser.parse_string("""\
+ip6tables -P FORWARD DROP
+ip6tables -t filter -A FORWARD -d 2001:db8::1 -j ACCEPT
+
+ip6tables -A FORWARD ! --source 2001:db8::2 -m tcp --dport 80 -j ACCEPT
+""")
+
+        exp = _build_tree_from_tuples((
+            "root", (
+                "ip6tables -P FORWARD DROP",
+                ("-P", ("FORWARD", ("DROP",))),
+                ("-t", ("filter",)),
+                ("--line-no", (1,))
+            ), (
+                "ip6tables -t filter -A FORWARD -d 2001:db8::1 -j ACCEPT",
+                (
+                    "-A",
+                    ("FORWARD",),
+                    ("-d", ("2001:db8::1",)),
+                    ("-j", ("ACCEPT",))
+                ),
+                ("-t", ("filter",)),
+                ("--line-no", (2,))
+            ), (
+                "ip6tables -A FORWARD ! -s 2001:db8::2 -m tcp --dport 80 -j ACCEPT",
+                (
+                    "-A",
+                    ("FORWARD",),
+                    ("-s", ("! 2001:db8::2",)),
+                    ("-m", ("tcp",)),
+                    ("--dport", ("80",)),
+                    ("-j", ("ACCEPT",))
+                ),
+                ("-t", ("filter",)),
+                ("--line-no", (3,))
+            )
+        ))
+
+        self._assert_tree(res, exp)
+
+
+    def test_save_format(self):
+        """ Tests a rule set in the format of ip6tables-save.
+        """
+
+        res = self.parser.parse_string("""\
+# Generated by ip6tables-save
+*filter
+:FORWARD DROP [0:0]
+-A FORWARD -p tcp --tcp-flags SYN,ACK SYN -j REJECT --reject-with tcp-reset
+COMMIT
+""")
+
+        exp = _build_tree_from_tuples((
+            "root", (
+                "ip6tables -t filter -P FORWARD DROP",
+                ("-t", ("filter",)),
+                ("-P", ("FORWARD", ("DROP",))),
+                ("-t", ("filter",)),
+                ("--line-no", (3,))
+            ), (
+                "ip6tables -t filter -A FORWARD -p tcp --tcp-flags SYN,ACK SYN -j DROP",
+                (
+                    "-A",
+                    ("FORWARD",),
+                    ("-p", ("tcp",)),
+                    ("--tcp-flags", ("SYN,ACK SYN",)),
+                    ("-j", ("DROP",))
+                ),
+                ("-t", ("filter",)),
+                ("--line-no", (4,))
+            )
+        ))
+
+        self._assert_tree(res, exp)
+
+
+    def test_line_count_reset(self):
+        """ Tests that every parse run counts its lines from the start.
+        """
+
+        ruleset = "ip6tables -A FORWARD -j ACCEPT"
+
+        for _ in range(2):
+            res = self.parser.parse_string(ruleset)
+            self.assertEqual(res.get_first().get_child('--line-no').get_first().value, 1)
+
+
+    def test_errors(self):
+        """ Tests that malformed lines are reported with their line number.
+        """
+
+        for ruleset in [
+                "ip6tables -A FORWARD -d 2001:db8::1",
+                "ip6tables -A FORWARD -j LOG",
+                "ip6tables -A FORWARD -d -j ACCEPT",
+                "ip6tables -X FORWARD"
+        ]:
+            with self.assertRaises(ValueError) as ctx:
+                self.parser.parse_string("ip6tables -P FORWARD DROP\n" + ruleset)
+            self.assertTrue(str(ctx.exception).startswith("line 2:"))
+
+
+    def test_gc(self):
+        """ Tests that the garbage collector is restored after parsing.
+        """
+
+        self.assertTrue(gc.isenabled())
+        self.parser.parse_string("ip6tables -A FORWARD -j ACCEPT")
+        self.assertTrue(gc.isenabled())
+
+        self.assertRaises(ValueError, self.parser.parse_string, "ip6tables -A FORWARD")
+        self.assertTrue(gc.isenabled())
+
+        gc.disable()
+        try:
+            self.parser.parse_string("ip6tables -A FORWARD -j ACCEPT")
+            self.assertFalse(gc.isenabled())
+        finally:
+            gc.enable()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+
+# -*- coding: utf-8 -*-
+
+# Copyright 2020 Claas Lorenz <claas_lorenz@genua.de>
+
+# This file is part of FaVe.
+
+# FaVe is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# FaVe is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with FaVe.  If not, see <https://www.gnu.org/licenses/>.
+
+""" This module provides tests for the cache of generated packet filter models.
+"""
+
+import unittest
+import os
+import shutil
+import tempfile
+
+from devices.snapshot_packet_filter import SnapshotPacketFilterModel
+from iptables.generator import generate
+from iptables.line_parser import IP6TablesLineParser
+from iptables.model_cache import cached_generate, model_cache_key
+from iptables.model_cache import model_cache_info, clear_model_cache_info
+
+
+RULESET = """\
+ip6tables -P FORWARD DROP
+ip6tables -A FORWARD -m state --state RELATED,ESTABLISHED -j ACCEPT
+ip6tables -A FORWARD -d 2001:db8::1 -p tcp --dport 22 -j ACCEPT
+ip6tables -A FORWARD -d 2001:db8::2 -j ACCEPT
+"""
+
+
+class TestModelCache(unittest.TestCase):
+    """ This class provides tests for the model cache.
+    """
+
+
+    def setUp(self):
+        self.parser = IP6TablesLineParser()
+        self.cache_dir = tempfile.mkdtemp()
+        self.ruleset = os.path.join(self.cache_dir, 'ruleset')
+        with open(self.ruleset, 'w') as rsf:
+            rsf.write(RULESET)
+        clear_model_cache_info()
+
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_dir)
+
+
+    def _generate(self, **kwargs):
+        return cached_generate(
+            self.ruleset, 'pf', '2001:db8::3', ['1', '2'],
+            parser=self.parser, cache_dir=self.cache_dir, **kwargs
+        )
+
+
+    def test_hit(self):
+        """ Tests that a cached model equals the generated one.
+        """
+
+        exp = generate(self.parser.parse(self.ruleset), 'pf', '2001:db8::3', ['1', '2'])
+
+        self.assertEqual(self._generate().to_json(), exp.to_json())
+        self.assertEqual(model_cache_info(), {"hits" : 0, "misses" : 1})
+
+        self.assertEqual(self._generate().to_json(), exp.to_json())
+        self.assertEqual(model_cache_info(), {"hits" : 1, "misses" : 1})
+
+
+    def test_snapshot(self):
+        """ Tests that snapshot models are cached separately.
+        """
+
+        model = self._generate()
+        snapshot = self._generate(state_snap=True)
+
+        self.assertEqual(model_cache_info(), {"hits" : 0, "misses" : 2})
+        self.assertIsInstance(self._generate(state_snap=True), SnapshotPacketFilterModel)
+        self.assertEqual(self._generate().to_json(), model.to_json())
+        self.assertNotEqual(snapshot.to_json(), model.to_json())
+        self.assertEqual(model_cache_info(), {"hits" : 2, "misses" : 2})
+
+
+    def test_key(self):
+        """ Tests that the key covers the rule set and the generator's inputs.
+        """
+
+        content = RULESET.encode('utf8')
+        key = model_cache_key(content, 'pf', '2001:db8::3', ['1', '2'])
+
+        self.assertEqual(key, model_cache_key(content, 'pf', '2001:db8::3', ['1', '2']))
+        self.assertNotEqual(key, model_cache_key(content + b'\n', 'pf', '2001:db8::3', ['1', '2']))
+        self.assertNotEqual(key, model_cache_key(content, 'pf2', '2001:db8::3', ['1', '2']))
+        self.assertNotEqual(key, model_cache_key(content, 'pf', '2001:db8::4', ['1', '2']))
+        self.assertNotEqual(key, model_cache_key(content, 'pf', '2001:db8::3', ['1']))
+        self.assertNotEqual(
+            key, model_cache_key(content, 'pf', '2001:db8::3', ['1', '2'], interweaving=False)
+        )
+        self.assertNotEqual(
+            key, model_cache_key(content, 'pf', '2001:db8::3', ['1', '2'], state_snap=True)
+        )
+
+
+    def test_parser_key(self):
+        """ Tests that the key covers the parser backend.
+        """
+
+        content = RULESET.encode('utf8')
+        env = os.environ.pop('FAVE_IPTABLES_PARSER', None)
+        try:
+            key = model_cache_key(content, 'pf', '2001:db8::3', ['1', '2'])
+            os.environ['FAVE_IPTABLES_PARSER'] = 'line'
+            line_key = model_cache_key(content, 'pf', '2001:db8::3', ['1', '2'])
+        finally:
+            os.environ.pop('FAVE_IPTABLES_PARSER', None)
+            if env is not None:
+                os.environ['FAVE_IPTABLES_PARSER'] = env
+
+        self.assertNotEqual(key, line_key)
+        self.assertEqual(
+            line_key,
+            model_cache_key(content, 'pf', '2001:db8::3', ['1', '2'], parser=self.parser)
+        )
+
+
+    def test_changed_ruleset(self):
+        """ Tests that a changed rule set is generated anew.
+        """
+
+        self._generate()
+        with open(self.ruleset, 'a') as rsf:
+            rsf.write("ip6tables -A FORWARD -d 2001:db8::4 -j ACCEPT\n")
+
+        model = self._generate()
+        self.assertEqual(model_cache_info(), {"hits" : 0, "misses" : 2})
+        self.assertTrue(any(
+            '2001:db8::4' in str(rule.to_json()) for rule in model.tables['pf.forward_filter']
+        ))
+
+
+    def test_corrupt_entry(self):
+        """ Tests that an unreadable entry is replaced.
+        """
+
+        exp = self._generate().to_json()
+        for name in os.listdir(self.cache_dir):
+            if name.endswith('.json'):
+                with open(os.path.join(self.cache_dir, name), 'w') as entry:
+                    entry.write('{')
+
+        self.assertEqual(self._generate().to_json(), exp)
+        self.assertEqual(self._generate().to_json(), exp)
+        self.assertEqual(model_cache_info(), {"hits" : 1, "misses" : 2})
+
+
+    def test_disabled(self):
+        """ Tests that nothing is cached without a cache directory.
+        """
+
+        env = os.environ.pop('FAVE_MODEL_CACHE', None)
+        try:
+            cached_generate(self.ruleset, 'pf', '2001:db8::3', ['1', '2'], parser=self.parser)
+        finally:
+            if env is not None:
+                os.environ['FAVE_MODEL_CACHE'] = env
+
+        self.assertEqual(model_cache_info(), {"hits" : 0, "misses" : 0})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -25,11 +25,14 @@
 
 import unittest
 
-from netplumber.mapping import Mapping
+from netplumber.mapping import Mapping, PortCodec, PrefixCodec
 from netplumber.vector import Vector, HeaderSpace
 from netplumber.vector import get_field_from_vector, set_field_in_vector
-from netplumber.vector import copy_field_between_vectors
+from netplumber.vector import copy_field_between_vectors, intersect_vectors
+from netplumber.adapter import _expand_field
 from devices.abstract_device import AbstractDeviceModel
+from rule.rule_model import Rule, Match, RuleField, Forward
+from util.ip6np_util import field_value_to_bitvector, bitvector_to_field_value
 
 
 class TestMapping(unittest.TestCase):
@@ -120,6 +123,71 @@ class TestMapping(unittest.TestCase):
         )
 
 
+    def test_compact(self):
+        """ Tests compacted field encodings.
+        """
+
+        dst = 'packet.ipv6.destination'
+        addresses = [
+            field_value_to_bitvector(RuleField(dst, a)).vector for a in [
+                '2001:db8::1', '2001:db8:0:1::/64', '2001:db8::/32'
+            ]
+        ]
+        self.mapping.extend(dst, codec=PrefixCodec.plan(dst, addresses))
+        self.mapping.extend('in_port', codec=PortCodec.plan('in_port', 3))
+        self.assertEqual(self.mapping.size(dst), 97)
+        self.assertEqual(self.mapping.size('in_port'), 3)
+        self.assertEqual(self.mapping.length, 100)
+
+        vec = Vector(self.mapping.length)
+        set_field_in_vector(self.mapping, vec, dst, addresses[1])
+        set_field_in_vector(self.mapping, vec, 'in_port', '{:032b}'.format(65537))
+        self.assertEqual(
+            get_field_from_vector(self.mapping, vec, dst), '1' + addresses[1][32:]
+        )
+        self.assertEqual(get_field_from_vector(self.mapping, vec, 'in_port'), '001')
+
+        mapping = Mapping.from_json(self.mapping.to_json())
+        self.assertEqual(mapping, self.mapping)
+        self.assertEqual(
+            bitvector_to_field_value(
+                get_field_from_vector(mapping, vec, dst), dst, mapping=mapping
+            ),
+            '2001:db8:0:1:0:0:0:0/64'
+        )
+        self.assertEqual(
+            bitvector_to_field_value(
+                get_field_from_vector(mapping, vec, 'in_port'), 'in_port', mapping=mapping
+            ),
+            '65537'
+        )
+
+        # addresses outside the planned prefix cannot be represented
+        self.assertEqual(mapping.decode(dst, '0' + 'x'*96), None)
+        self.assertRaises(
+            ValueError,
+            mapping.encode,
+            dst,
+            field_value_to_bitvector(RuleField(dst, '2001:db9::1')).vector
+        )
+        self.assertRaises(
+            ValueError,
+            mapping.check,
+            dst,
+            [field_value_to_bitvector(RuleField(dst, '2001:db9::1')).vector]
+        )
+        mapping.check(dst, addresses)
+
+        # the port dictionary has room for seven ports of which one is taken
+        ports = ['{:032b}'.format(port) for port in range(65538, 65545)]
+        self.assertRaises(ValueError, mapping.check, 'in_port', ports)
+        mapping.check('in_port', ports[:6])
+        self.assertEqual(len(mapping.codecs['in_port'].values), 1)
+
+        self.assertEqual(PrefixCodec.plan(dst, addresses + ['x'*128]).prefix, addresses[2][:32])
+        self.assertEqual(PrefixCodec.plan(dst, ['0' + 'x'*127, '1' + 'x'*127]), None)
+
+
 class TestVector(unittest.TestCase):
     """ This class tests vector handling.
     """
@@ -166,6 +234,69 @@ class TestVector(unittest.TestCase):
         self.assertEqual(self.vector[120:128], 'x'*8)
 
 
+    def test_masks(self):
+        """ Tests the mask representation of a vector.
+        """
+
+        self.vector = Vector.from_vector_str('10x0x1')
+        self.assertEqual(self.vector.care, 0b110101)
+        self.assertEqual(self.vector.value, 0b100001)
+        self.assertEqual(self.vector.vector, '10x0x1')
+        self.assertEqual(self.vector.get_masks(slice(1, 4)), (0b101, 0b000))
+
+        self.vector.set_masks(slice(2, 5), 0b111, 0b011)
+        self.assertEqual(self.vector.vector, '100111')
+
+        self.assertEqual(Vector(4, preset='1').vector, '1111')
+        self.assertEqual(Vector(4, preset='0').vector, '0000')
+
+
+    def test_intersect(self):
+        """ Tests the intersection of vectors.
+        """
+
+        vec1 = Vector.from_vector_str('1xx0')
+        vec2 = Vector.from_vector_str('x1x0')
+        vec3 = Vector.from_vector_str('0xxx')
+
+        self.assertEqual(vec1.intersect(vec2), Vector.from_vector_str('11x0'))
+        self.assertIsNone(vec1.intersect(vec3))
+        self.assertEqual(intersect_vectors('1xx0', 'x1x0'), '11x0')
+        self.assertIsNone(intersect_vectors('1xx0', '0xxx'))
+
+
+    def test_issubset(self):
+        """ Tests the subset relation of vectors.
+        """
+
+        vec1 = Vector.from_vector_str('1100')
+        vec2 = Vector.from_vector_str('1xx0')
+
+        self.assertTrue(vec1.issubset(vec2))
+        self.assertTrue(vec2.issubset(vec2))
+        self.assertFalse(vec2.issubset(vec1))
+        self.assertFalse(Vector.from_vector_str('0100').issubset(vec2))
+
+
+    def test_expand_field(self):
+        """ Tests the expansion of negated fields to disjoint vectors.
+        """
+
+        field = RuleField('packet.ipv6.proto', 'xx11x0x1', negated=True)
+        vectors = _expand_field(field)
+
+        self.assertEqual(
+            [v.vector for v in vectors],
+            ['xx0xxxxx', 'xx10xxxx', 'xx11x1xx', 'xx11x0x0']
+        )
+
+        for val in range(256):
+            point = Vector.from_vector_str('{:08b}'.format(val))
+            covering = [v for v in vectors if point.issubset(v)]
+            negated = not point.issubset(Vector.from_vector_str('xx11x0x1'))
+            self.assertEqual(len(covering), 1 if negated else 0)
+
+
     def test_get_field_from_vector(self):
         """ Tests reading a field from a vector.
         """
@@ -413,5 +544,51 @@ class TestModel(unittest.TestCase):
         self.assertEqual(self.model - other, result)
 
 
+    def test_diff(self):
+        """ Tests the rule level difference of a model to its previous version.
+        """
+
+        rule = lambda idx, port: Rule(
+            'foo', 'foo.1', idx,
+            match=Match([RuleField('packet.upper.dport', port)]),
+            actions=[Forward(['foo.2'])]
+        )
+
+        old = AbstractDeviceModel(
+            'foo',
+            tables={'foo.1' : [rule(1, '80'), rule(2, '443'), rule(3, '22')]},
+            ports={'foo.1' : 'foo.1', 'foo.2' : 'foo.1'}
+        )
+        new = AbstractDeviceModel(
+            'foo',
+            tables={'foo.1' : [rule(1, '80'), rule(2, '8443'), rule(4, '25')]},
+            ports={'foo.1' : 'foo.1', 'foo.2' : 'foo.1'}
+        )
+
+        adds, deletes, updates = new.diff(old)
+        self.assertEqual(adds, {'foo.1' : [rule(4, '25')]})
+        self.assertEqual(deletes, {'foo.1' : [rule(3, '22')]})
+        self.assertEqual(updates, {'foo.1' : [(rule(2, '443'), rule(2, '8443'))]})
+
+        self.assertEqual(new.diff(new), ({}, {}, {}))
+
+        # rules with equal hashes but different input ports are updates
+        moved = AbstractDeviceModel(
+            'foo',
+            tables={'foo.1' : [rule(1, '80'), rule(2, '8443'), rule(4, '25')]},
+            ports={'foo.1' : 'foo.1', 'foo.2' : 'foo.1'}
+        )
+        moved.tables['foo.1'][0].in_ports = ['foo.2']
+        self.assertEqual(
+            moved.diff(new),
+            ({}, {}, {'foo.1' : [(rule(1, '80'), moved.tables['foo.1'][0])]})
+        )
+
+        # rules of removed tables are reported as removed
+        old.tables['foo.2'] = [rule(5, '53')]
+        adds, deletes, updates = new.diff(old)
+        self.assertEqual(deletes, {'foo.1' : [rule(3, '22')], 'foo.2' : [rule(5, '53')]})
+
+
 if __name__ == '__main__':
     unittest.main()
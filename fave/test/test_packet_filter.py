@@ -27,6 +27,8 @@ import tempfile
 
 from iptables.generator import generate
 from iptables.parser import IP6TablesParser
+from devices.abstract_firewall import _BASE_ROUTING_EXACT, _BASE_ROUTING_WRONG_IO
+from devices.abstract_firewall import _BASE_ROUTING_RULE
 from devices.packet_filter import PacketFilterModel
 from devices.switch import SwitchModel
 from rule.rule_model import Forward, Rewrite, Rule, Match, RuleField
@@ -350,6 +352,62 @@ class TestPacketFilterModel(unittest.TestCase):
         )
 
 
+    def test_add_rules(self):
+        """ Tests the derivation of routing rules.
+        """
+
+        rule = Rule(
+            "foo", "foo.routing", 1,
+            match=Match([
+                RuleField("packet.ipv6.destination", "2001:db8::0/64"),
+                RuleField("packet.ipv6.proto", "6")
+            ]),
+            actions=[Forward(["2"])],
+            raw_line_no=1,
+            raw_line="route"
+        )
+        self.model.add_rules([rule])
+
+        exact, wrong_io, normal = self.model._adds["foo.routing"]
+
+        self.assertEqual(exact.match, Match([
+            RuleField("packet.ipv6.destination", "2001:db8::0/64"),
+            RuleField("packet.ipv6.proto", "6"),
+            RuleField("out_port", "foo.2_egress")
+        ]))
+        self.assertEqual(exact.actions, [Forward(["foo.routing_out"])])
+
+        self.assertEqual(wrong_io.match, Match([
+            RuleField("packet.ipv6.proto", "6"),
+            RuleField("out_port", "foo.2_egress")
+        ]))
+        self.assertEqual(wrong_io.actions, [])
+
+        self.assertEqual(normal.match, Match([
+            RuleField("packet.ipv6.destination", "2001:db8::0/64"),
+            RuleField("packet.ipv6.proto", "6")
+        ]))
+        self.assertEqual(normal.actions, [
+            Forward(["foo.routing_out"]),
+            Rewrite([RuleField("out_port", "foo.2_egress")])
+        ])
+
+        self.assertEqual(
+            [r.idx for r in (exact, wrong_io, normal)],
+            [
+                _BASE_ROUTING_EXACT + 1,
+                _BASE_ROUTING_WRONG_IO + 1,
+                _BASE_ROUTING_RULE + 1
+            ]
+        )
+        self.assertTrue(all(r.tid == "foo.routing" for r in (exact, wrong_io, normal)))
+        self.assertTrue(all(r.raw_line_no == 1 for r in (exact, wrong_io, normal)))
+
+        # unchanged fields are shared by the derived rules
+        self.assertIs(exact.match[1], normal.match[1])
+        self.assertIs(exact.match[2], wrong_io.match[1])
+
+
 class TestSwitchModel(unittest.TestCase):
     """ This class provides tests for the switch model.
     """
@@ -751,5 +809,49 @@ class TestPacketFilterGenerator(unittest.TestCase):
         self.assertEqual(result, self.model)
 
 
+    def test_shared_shells(self):
+        """ Tests whether state shells that are covered by an earlier one are
+            omitted if requested.
+        """
+        iptables = '\n'.join([
+            'ip6tables -P FORWARD DROP',
+            'ip6tables -A FORWARD -m conntrack --ctstate ESTABLISHED -j ACCEPT',
+            'ip6tables -A FORWARD -d 2001:db8::0/64 -p tcp --dport 80 -j ACCEPT',
+            'ip6tables -A FORWARD -m conntrack --ctstate ESTABLISHED -j ACCEPT',
+            'ip6tables -A FORWARD -d 2001:db8::1 -j ACCEPT'
+        ])
+
+        node = 'foo'
+        address = '2001:db8::2'
+        ports = ['1', '2']
+
+        _fd, iptables_file = tempfile.mkstemp()
+        with open(iptables_file, 'w') as tmp_file:
+            tmp_file.write(iptables + '\n')
+        parser = IP6TablesParser()
+        ast = parser.parse(iptables_file)
+
+        full = generate(ast, node, address, ports)
+        shared = generate(ast, node, address, ports, shared_shells=True)
+
+        # the shell preceding the second state checking rule equals the first
+        # one and is dropped
+        full_rules = full.tables['foo.forward_filter']
+        self.assertEqual(len(full_rules), 9)
+        self.assertEqual(
+            [(str(r.match), [str(a) for a in r.actions]) for r in full_rules[:3]],
+            [(str(r.match), [str(a) for a in r.actions]) for r in full_rules[4:7]]
+        )
+
+        exp = full_rules[:4] + full_rules[7:]
+        for idx, rule in enumerate(exp):
+            rule.idx = idx
+
+        self.assertEqual(
+            [r.to_json() for r in shared.tables['foo.forward_filter']],
+            [r.to_json() for r in exp]
+        )
+
+
 if __name__ == '__main__':
     unittest.main()
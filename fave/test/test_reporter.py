@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+
+# -*- coding: utf-8 -*-
+
+# Copyright 2020 Claas Lorenz <claas_lorenz@genua.de>
+
+# This file is part of FaVe.
+
+# FaVe is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# FaVe is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with FaVe.  If not, see <https://www.gnu.org/licenses/>.
+
+""" This module provides tests for the reporter.
+"""
+
+import unittest
+import tempfile
+
+from collections import namedtuple
+
+from reporting.reporter import Reporter, Log
+
+
+_Engine = namedtuple('_Engine', ['rule_ids', 'node_to_rule', 'table_names'])
+_Fave = namedtuple('_Fave', ['verification_engine', 'models'])
+_Rule = namedtuple('_Rule', ['idx', 'raw_line', 'raw_line_no'])
+_Model = namedtuple('_Model', ['tables'])
+
+
+class TestReporter(unittest.TestCase):
+    """ This class provides tests for the reporter.
+    """
+
+    def setUp(self):
+        """ Starts a reporter for a fake aggregator.
+        """
+
+        # rule 1 of table 1 is expanded to two netplumber rules
+        fave_rid = (1 << 32) | (1 << 12)
+        engine = _Engine(
+            rule_ids={fave_rid : [11, 12]},
+            node_to_rule={11 : fave_rid, 12 : fave_rid},
+            table_names={1 : 'pf.forward_filter'}
+        )
+        models = {'pf' : _Model(tables={
+            'pf.forward_filter' : [_Rule(1, '-A FORWARD -j DROP', 3)]
+        })}
+
+        self.reporter = Reporter(_Fave(engine, models))
+        self.reporter.daemon = True
+        self.reporter.start()
+
+
+    def tearDown(self):
+        """ Stops the reporter.
+        """
+
+        self.reporter.stop()
+        self.reporter.join(1)
+
+
+    def _report(self):
+        with tempfile.NamedTemporaryFile('r', suffix='.md') as report:
+            self.reporter.dump_report(report.name)
+            return report.read()
+
+
+    def test_compliance(self):
+        """ Tests the indexing and reporting of compliance violations.
+        """
+
+        self.reporter.publish((Log.Compliance, True, 'source1', 'probe1', []))
+        self.reporter.publish(
+            (Log.Compliance, False, 'source2', 'probe1', [('packet.ipv6.proto', '6')])
+        )
+        self.reporter.channel.join()
+
+        self.assertEqual(self.reporter.violations, {'probe1' : [
+            (True, 'source1', []),
+            (False, 'source2', [('packet.ipv6.proto', '6')])
+        ]})
+
+        report = self._report()
+        self.assertIn("- `source1` reaches `probe1`", report)
+        self.assertIn("- `source2` does not reach `probe1`", report)
+        self.assertIn("    - packet.ipv6.proto=6", report)
+
+        self.reporter.mark_compliance()
+        self.assertIn("No compliance violations have been found.", self._report())
+
+
+    def test_anomalies(self):
+        """ Tests the indexing and reporting of shadowed rules.
+        """
+
+        self.assertIn("No anomalies have been found.", self._report())
+
+        # the rule is not shadowed as long as one of its expansions is not
+        self.reporter.publish((Log.Anomalies, 'Shadowed', 11))
+        self.assertNotIn("- shadowed rule", self._report())
+
+        self.reporter.publish((Log.Anomalies, 'Shadowed', 12))
+        report = self._report()
+        self.assertIn("- shadowed rule at line 3:", report)
+        self.assertIn("`-A FORWARD -j DROP`", report)
+
+        self.reporter.mark_anomalies()
+        self.assertEqual(self.reporter.anomalies, {})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -26,7 +26,12 @@ import unittest
 
 import os
 import re
+import logging
+import json
 import random
+import socket
+
+from threading import Thread
 
 from netplumber.jsonrpc import connect_to_netplumber
 from netplumber.jsonrpc import init, destroy, reset_plumbing_network, expand
@@ -34,6 +39,17 @@ from netplumber.jsonrpc import add_table, add_link
 from netplumber.jsonrpc import add_rule, remove_rule
 from netplumber.jsonrpc import add_source, add_source_probe
 from netplumber.jsonrpc import add_slice, remove_slice
+from netplumber.jsonrpc import add_rules_batch, remove_link, add_links_bulk
+from netplumber.jsonrpc import add_tables_batch, add_links_batch, remove_links_batch
+from netplumber.jsonrpc import remove_rules_batch, remove_sources_batch
+from netplumber.jsonrpc import RPCClient, RPCError
+from netplumber.adapter import NetPlumberAdapter
+
+from devices.abstract_device import AbstractDeviceModel
+from devices.generator import GeneratorModel
+from topology.topology import TopologyCommand
+from rule.rule_model import Rule, Match, RuleField
+from util.ip6np_util import field_value_to_bitvector
 
 
 def generate_random_rule(idx, in_ports, out_ports, length):
@@ -653,6 +669,350 @@ class TestRPC(unittest.TestCase):
         add_rule(self.sock, 1, *rule)
 
 
+def _serve_fake_netplumber(sock, calls):
+    """ Answers JSON-RPC calls line by line similar to NetPlumber.
+    """
+
+    with sock.makefile('rwb') as conn:
+        node = 0
+        for line in conn:
+            data = json.loads(line.decode('utf8'))
+            calls.append((data["method"], data.get("params")))
+            resp = {"id" : data["id"], "jsonrpc" : data["jsonrpc"]}
+
+            if data["method"] == "remove_link":
+                resp["error"] = {"code" : 1, "message" : "no such link"}
+            elif data["method"] == "add_link" and data["params"]["from_port"] == -1:
+                resp["error"] = {"code" : 1, "message" : "no such port"}
+            elif data["method"] == "add_rules":
+                resp["result"] = list(range(node, node+len(data["params"]["rules"])))
+                node += len(data["params"]["rules"])
+            elif data["method"] == "check_compliance":
+                # every other check of a probe is violated
+                resp["result"] = [{
+                    "dst" : int(dst), "idx" : idx, "src" : src, "valid" : valid,
+                    "compliant" : idx % 2 == 0, "time" : 0.5
+                } for dst, checks in data["params"]["rules"].items() \
+                    for idx, (src, valid, _cond) in enumerate(checks)]
+            elif data["method"] in ["add_rule", "add_source"]:
+                resp["result"] = node
+                node += 1
+            else:
+                resp["result"] = None
+
+            conn.write((json.dumps(resp) + '\n').encode('utf8'))
+            conn.flush()
+
+            if data["method"] == "stop":
+                break
+
+
+class TestRPCClient(unittest.TestCase):
+    """ Test class for the pipelined RPC client.
+    """
+
+    def setUp(self):
+        """ Connects a client to a fake NetPlumber.
+        """
+
+        self.sock, server_sock = socket.socketpair()
+        self.calls = []
+        self.server = Thread(
+            target=_serve_fake_netplumber, args=(server_sock, self.calls)
+        )
+        self.server.daemon = True
+        self.server.start()
+        self.client = RPCClient([self.sock], buffer_size=256, max_pending=16)
+
+
+    def tearDown(self):
+        """ Closes the connection.
+        """
+
+        self.sock.close()
+        self.server.join(1)
+
+
+    def test_pipelined_calls(self):
+        """ Tests pipelining of calls without results.
+        """
+
+        add_table(self.client, 1, [1, 2])
+        for port in range(1000):
+            add_link(self.client, port, port+1)
+        self.assertTrue(self.client.futures)
+
+        self.client.sync()
+        self.assertEqual(self.client.futures, {})
+
+
+    def test_results(self):
+        """ Tests waiting for results between pipelined calls.
+        """
+
+        add_table(self.client, 1, [1, 2])
+        self.assertEqual(add_rule(self.client, 1, 1, [1], [2], 'xx', None, None), 0)
+        add_link(self.client, 1, 2)
+        self.assertEqual(
+            add_rules_batch(self.client, [
+                (None, 1, 2, [1], [2], 'x1', None, None),
+                (None, 1, 3, [1], [2], 'x0', None, None)
+            ]),
+            [1, 2]
+        )
+        self.assertEqual(add_source(self.client, 0, ['xx'], None, [3]), 3)
+
+
+    def test_error(self):
+        """ Tests that errors of pipelined calls are raised while waiting.
+        """
+
+        remove_link(self.client, 1, 2)
+        self.assertRaises(RPCError, self.client.sync)
+
+
+    def test_notify_error(self):
+        """ Tests that errors of calls without result do not abort other calls.
+        """
+
+        remove_link(self.client, 1, 2)
+        self.assertEqual(add_rule(self.client, 1, 1, [1], [2], 'xx', None, None), 0)
+        add_link(self.client, 1, 2)
+        self.client.flush()
+        self.assertEqual(add_rule(self.client, 1, 2, [1], [2], 'x1', None, None), 1)
+
+        with self.assertRaises(RPCError) as ctx:
+            self.client.sync()
+        self.assertIn("no such link", str(ctx.exception))
+
+        # the error is reported once
+        self.client.sync()
+        self.assertEqual(self.client.futures, {})
+
+
+    def test_bulk_link_error(self):
+        """ Tests that errors of bulk links are reported upon synchronization.
+        """
+
+        add_links_bulk(self.client, [(-1, 1, 2), (-1, -1, 2), (-1, 2, 3)])
+        self.assertEqual(add_rule(self.client, 1, 1, [1], [2], 'xx', None, None), 0)
+
+        with self.assertRaises(RPCError) as ctx:
+            self.client.sync()
+        self.assertIn("no such port", str(ctx.exception))
+        self.assertEqual(self.client.futures, {})
+
+
+    def test_batches(self):
+        """ Tests batched table, link, rule, and source operations.
+        """
+
+        add_tables_batch(self.client, [(1, [65537]), (2, [131073, 131074])])
+        add_links_batch(self.client, [(65537, 131073), (131074, 65537)])
+        remove_links_batch(self.client, [(65537, 131073)])
+        remove_rules_batch(self.client, [1, 2, 3])
+        remove_sources_batch(self.client, [4])
+        self.client.sync()
+
+        self.assertEqual(self.calls, [
+            ("add_tables", {"tables" : [
+                {"id" : 1, "in" : [65537]}, {"id" : 2, "in" : [131073, 131074]}
+            ]}),
+            ("add_links", {"links" : [
+                {"from_port" : 65537, "to_port" : 131073},
+                {"from_port" : 131074, "to_port" : 65537}
+            ]}),
+            ("remove_links", {"links" : [{"from_port" : 65537, "to_port" : 131073}]}),
+            ("remove_rules", {"nodes" : [1, 2, 3]}),
+            ("remove_sources", {"ids" : [4]})
+        ])
+
+
+    def test_compliance(self):
+        """ Tests that compliance results are mapped back to the checks.
+        """
+
+        adapter = NetPlumberAdapter([], None)
+        adapter.rpc = self.client
+        adapter.generators = {'source1' : (0, 1, None), 'source2' : (1, 2, None)}
+        adapter.probes = {'probe1' : (0, 3, None), 'probe2' : (1, 4, None)}
+
+        results = adapter.check_compliance({
+            'probe1' : [('source1', False, []), ('source2', True, [])],
+            'probe2' : [('source2', False, [])]
+        })
+
+        self.assertEqual(self.calls, [("check_compliance", {"rules" : {
+            "3" : [[1, True, None], [2, False, None]],
+            "4" : [[2, True, None]]
+        }})])
+        self.assertEqual(
+            [(r['dst'], r['src'], r['negated'], r['compliant']) for r in results],
+            [
+                ('probe1', 'source1', False, True),
+                ('probe1', 'source2', True, False),
+                ('probe2', 'source2', False, True)
+            ]
+        )
+        self.assertEqual(results[0]['time'], 0.5)
+
+
+    def test_plan_mapping(self):
+        """ Tests that the fields of a batch of models are laid out at once.
+        """
+
+        adapter = NetPlumberAdapter([], logging.getLogger(__name__))
+        adapter.rpc = self.client
+
+        rules = [
+            Rule('fw', 'fw.1', 0, match=Match([
+                RuleField('packet.ipv6.destination', '2001:db8::1'),
+                RuleField('packet.upper.dport', '80')
+            ])),
+            Rule('fw', 'fw.1', 1, match=Match([
+                RuleField('packet.ipv6.destination', '2001:db8::2')
+            ]))
+        ]
+        models = [
+            AbstractDeviceModel('fw', tables={'fw.1' : rules}),
+            GeneratorModel('gen', fields={'ipv6_src' : [RuleField('ipv6_src', '2001:db8::3')]})
+        ]
+
+        adapter.plan_models(models)
+        adapter.plan_models(models)
+        adapter.plan_mapping(['packet.upper.dport', 'packet.ipv6.proto'])
+        self.client.sync()
+
+        self.assertEqual(adapter.mapping, {
+            'packet.ipv6.destination' : 0,
+            'packet.ipv6.source' : 128,
+            'packet.upper.dport' : 256,
+            'packet.ipv6.proto' : 272
+        })
+        self.assertEqual(
+            [p["length"] for m, p in self.calls if m == "expand"], [272, 280]
+        )
+
+
+    def test_plan_wrapped_models(self):
+        """ Tests that the fields of models wrapped in topology commands are planned.
+        """
+
+        adapter = NetPlumberAdapter([], logging.getLogger(__name__))
+        adapter.rpc = self.client
+
+        adapter.plan_models([TopologyCommand(
+            'gen', 'add',
+            model=GeneratorModel('gen', fields={
+                'ipv6_dst' : [RuleField('ipv6_dst', '2001:db8::1')],
+                'tcp_dst' : [RuleField('tcp_dst', '80')]
+            })
+        )])
+        self.client.sync()
+
+        self.assertEqual(adapter.mapping, {
+            'packet.ipv6.destination' : 0,
+            'packet.upper.dport' : 128
+        })
+        self.assertEqual(
+            [p["length"] for m, p in self.calls if m == "expand"], [144]
+        )
+
+
+    def test_compact_mapping(self):
+        """ Tests that planned fields are compacted if requested.
+        """
+
+        adapter = NetPlumberAdapter([], logging.getLogger(__name__), compact=True)
+        adapter.rpc = self.client
+
+        dst = 'packet.ipv6.destination'
+        rules = [
+            Rule('fw', 'fw.1', 0, match=Match([
+                RuleField(dst, '2001:db8::1', negated=True),
+                RuleField('interface', '2')
+            ])),
+            Rule('fw', 'fw.1', 1, match=Match([
+                RuleField(dst, '2001:db8::/32'), RuleField('packet.ipv6.proto', 'tcp')
+            ]))
+        ]
+        adapter.plan_models([AbstractDeviceModel('fw', tables={'fw.1' : rules})])
+        self.client.sync()
+
+        self.assertEqual(adapter.mapping.size(dst), 97)
+        self.assertEqual(adapter.mapping.size('packet.ipv6.proto'), 8)
+        self.assertEqual(adapter.mapping.size('interface'), 2)
+        self.assertEqual(
+            [p["length"] for m, p in self.calls if m == "expand"], [107]
+        )
+
+        # the complement covers all addresses outside the prefix as well
+        vectors = adapter._expand_negations(rules[0].match)
+        self.assertEqual(len(vectors), 97)
+        offset = adapter.mapping[dst]
+        self.assertEqual(vectors[0].vector[offset:offset+97], '0' + 'x'*96)
+        self.assertEqual(
+            adapter.mapping.decode(dst, vectors[-1].vector[offset:offset+97]),
+            field_value_to_bitvector(RuleField(dst, '2001:db8::')).vector
+        )
+        offset = adapter.mapping['interface']
+        self.assertEqual(
+            adapter._build_vector([rules[0].match[1]]).vector[offset:offset+2], '01'
+        )
+
+        # models exceeding the codecs are rejected without assigning codes
+        adapter.check_model(AbstractDeviceModel('fw', tables={'fw.1' : rules}))
+        outside = Rule('fw', 'fw.1', 2, match=Match([RuleField(dst, '2001:db9::1')]))
+        self.assertRaises(
+            ValueError,
+            adapter.check_model,
+            AbstractDeviceModel('fw', tables={'fw.1' : [outside]})
+        )
+        interfaces = [
+            Rule('fw', 'fw.1', idx, match=Match([RuleField('interface', str(idx))]))
+            for idx in range(3, 6)
+        ]
+        self.assertRaises(
+            ValueError,
+            adapter.check_model,
+            AbstractDeviceModel('fw', tables={'fw.1' : interfaces})
+        )
+        adapter.check_model(AbstractDeviceModel('fw', tables={'fw.1' : interfaces[:2]}))
+        self.assertEqual(len(adapter.mapping.codecs['interface'].values), 1)
+
+
+    def test_link_index(self):
+        """ Tests that the adapter maintains its link indexes.
+        """
+
+        adapter = NetPlumberAdapter([], logging.getLogger(__name__))
+        adapter.rpc = self.client
+        adapter.ports = {'fw.1' : 65537, 'sw.1' : 131073, 'probe.1' : 196609}
+        adapter.port_names = {v : k for k, v in adapter.ports.items()}
+        adapter.tables = {'probe' : 3}
+        adapter.table_names = {3 : 'probe'}
+        adapter.probes = {'probe' : (3, 7, None)}
+
+        # the link from fw.1 to the probe is added twice
+        adapter.add_link('fw.1', 'probe.1')
+        adapter.add_links_bulk([('sw.1', 'probe.1'), ('fw.1', 'sw.1'), ('fw.1', 'probe.1')])
+        self.assertEqual(adapter.incoming, {196609 : {65537, 131073}, 131073 : {65537}})
+
+        adapter.delete_probe('probe')
+        self.client.sync()
+
+        self.assertEqual(adapter.links, {65537 : [131073]})
+        self.assertEqual(adapter.incoming, {131073 : {65537}})
+        self.assertNotIn(196609, adapter.port_names)
+        self.assertEqual(adapter.table_names, {})
+        removed = [p["links"] for m, p in self.calls if m == "remove_links"]
+        self.assertEqual(len(removed), 1)
+        self.assertEqual(
+            sorted((l["from_port"], l["to_port"]) for l in removed[0]),
+            [(65537, 196609), (65537, 196609), (131073, 196609)]
+        )
+
+
 if __name__ == '__main__':
     random.seed(0)
     unittest.main()
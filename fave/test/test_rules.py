@@ -93,6 +93,20 @@ class TestRuleField(unittest.TestCase):
         )
 
 
+    def test_shared(self):
+        """ Tests that shared fields are reused.
+        """
+
+        shared = RuleField.shared("packet.ipv6.source", "2001:db8::1")
+
+        self.assertEqual(shared, self.rule_field)
+        self.assertIs(shared, RuleField.shared("packet.ipv6.source", "2001:db8::1"))
+        self.assertIsNot(
+            shared, RuleField.shared("packet.ipv6.source", "2001:db8::1", negated=True)
+        )
+        self.assertRaises(AttributeError, setattr, shared, "vector", None)
+
+
 #    # deprecated
 #    def test_vectorize(self):
 #        """ Tests field vectorization.
@@ -316,6 +330,22 @@ class TestMatch(unittest.TestCase):
         )
 
 
+    def test_filter(self):
+        """ Tests the removal of fields.
+        """
+
+        self.match.append(RuleField("packet.ipv6.source", "2001:db8::3"))
+        self.match.filter("packet.ipv6.source")
+
+        self.assertEqual(
+            self.match,
+            Match(fields=[RuleField("packet.ipv6.destination", "2001:db8::2")])
+        )
+
+        self.match.filter(RuleField("packet.ipv6.destination", "2001:db8::2"))
+        self.assertEqual(self.match, Match())
+
+
 
 class TestRule(unittest.TestCase):
     """ This class tests rules.
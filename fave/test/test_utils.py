@@ -24,6 +24,11 @@
 """
 
 import unittest
+import socket
+import json
+import io
+import tempfile
+import threading
 
 from util.collections_util import dict_diff, dict_isect, dict_sub, dict_union
 from util.collections_util import list_diff, list_isect, list_sub, list_union
@@ -46,6 +51,23 @@ from util.path_util import pathlet_to_str, str_to_pathlet
 
 from util.json_util import equal
 
+from util.ip6np_util import field_value_to_bitvector, fields_to_bitvectors
+from util.ip6np_util import field_cache_info, clear_field_cache
+
+from util.aggregator_utils import fave_sendmsg, fave_sendobj, fave_recvmsg
+from util.aggregator_utils import fave_loads, has_compact_encoding
+from util.aggregator_utils import FaveMessageReader
+
+from util.flow_tree_util import iter_json_events, iter_flow_tree_nodes
+from util.flow_tree_util import flow_tree_depth, iter_flow_tree_paths
+from util.flow_tree_util import write_binary_flow_trees, FlowTreeDump
+from util.stats_util import mean, median, stddev, confidence_interval, summarize
+from util.profile_util import TaskProfiler, profiled
+from util.executor_util import PriorityExecutor
+
+from rule.rule_model import RuleField
+from netplumber.vector import Vector
+
 class TestCollectionsUtilDict(unittest.TestCase):
     """ This class provides unit tests for dictionary utilities.
     """
@@ -524,6 +546,366 @@ class TestPathUtil(unittest.TestCase):
         )
 
 
+class TestIp6npUtil(unittest.TestCase):
+    """ This class provides unit tests for packet filter utilities.
+    """
+
+    def setUp(self):
+        """ Creates a clean test environment.
+        """
+
+        clear_field_cache()
+
+
+    def test_field_cache(self):
+        """ Tests the caching of field vectors.
+        """
+
+        field = RuleField('packet.upper.dport', '80')
+
+        vec1 = field_value_to_bitvector(field)
+        self.assertEqual(field_cache_info(), {'hits' : 0, 'misses' : 1, 'size' : 1})
+
+        vec2 = field_value_to_bitvector(field)
+        self.assertEqual(field_cache_info(), {'hits' : 1, 'misses' : 1, 'size' : 1})
+        self.assertEqual(vec1, vec2)
+        self.assertIsNot(vec1, vec2)
+
+        vec2[0:1] = '1'
+        self.assertEqual(field_value_to_bitvector(field), vec1)
+        self.assertNotEqual(vec1, vec2)
+
+
+    def test_fields_to_bitvectors(self):
+        """ Tests the bulk conversion of fields to vectors.
+        """
+
+        fields = [
+            RuleField('packet.ipv6.proto', 'tcp'),
+            RuleField('packet.upper.dport', '443'),
+            RuleField('packet.ipv6.destination', '2001:db8::1'),
+            RuleField('packet.ipv6.proto', 'tcp'),
+            RuleField('packet.upper.dport', '80'),
+            RuleField('packet.ipv6.proto', Vector.from_vector_str('0110xxxx')),
+            RuleField('packet.ipv6.destination', '2001:db8::/32'),
+            RuleField('packet.upper.dport', '443')
+        ]
+
+        single = [field_value_to_bitvector(f) for f in fields]
+        single_info = field_cache_info()
+        clear_field_cache()
+
+        bulk = fields_to_bitvectors(fields)
+        self.assertEqual(bulk, single)
+        self.assertEqual(field_cache_info(), single_info)
+        self.assertEqual(field_cache_info()['size'], 5)
+
+        # the vectors of equal values are independent copies
+        self.assertIsNot(bulk[0], bulk[3])
+        bulk[0][0:1] = '1'
+        self.assertEqual(bulk[3], single[3])
+        self.assertIs(bulk[5], fields[5].value)
+
+
+class TestAggregatorUtil(unittest.TestCase):
+    """ This class provides unit tests for the FaVe message utilities.
+    """
+
+    def setUp(self):
+        """ Creates a clean test environment.
+        """
+
+        self.sock1, self.sock2 = socket.socketpair()
+        self.obj = {
+            'type' : 'packet_filter',
+            'rules' : [
+                {'name' : 'packet.upper.dport', 'value' : '80', 'negated' : False},
+                {'name' : 'packet.ipv6.proto', 'value' : 'tcp', 'negated' : True}
+            ]
+        }
+
+
+    def tearDown(self):
+        """ Closes the sockets.
+        """
+
+        self.sock1.close()
+        self.sock2.close()
+
+
+    def test_json_message(self):
+        """ Tests sending and receiving JSON messages.
+        """
+
+        fave_sendmsg(self.sock1, '{"type": "stop"}')
+        fave_sendobj(self.sock1, self.obj, compact=False)
+
+        data = fave_recvmsg(self.sock2)
+        self.assertEqual(data, '{"type": "stop"}')
+        self.assertEqual(fave_loads(data), {'type' : 'stop'})
+        self.assertEqual(fave_loads(fave_recvmsg(self.sock2)), self.obj)
+
+
+    @unittest.skipUnless(has_compact_encoding(), "msgpack is not available")
+    def test_compact_message(self):
+        """ Tests sending and receiving compactly encoded messages.
+        """
+
+        fave_sendobj(self.sock1, self.obj)
+        fave_sendmsg(self.sock1, '{"type": "stop"}')
+
+        data = fave_recvmsg(self.sock2)
+        self.assertIsInstance(data, bytes)
+        self.assertEqual(fave_loads(data), self.obj)
+        self.assertEqual(fave_loads(fave_recvmsg(self.sock2)), {'type' : 'stop'})
+
+
+    def test_message_reader(self):
+        """ Tests reading a stream of messages from a persistent connection.
+        """
+
+        reader = FaveMessageReader(self.sock2, buffer_size=16)
+
+        msgs = ['{"idx": %s}' % i for i in range(100)] + ['"%s"' % ('x' * 100)]
+        for msg in msgs:
+            fave_sendmsg(self.sock1, msg)
+        self.sock1.close()
+
+        received = []
+        while reader.fill():
+            received.extend(reader.messages())
+        received.extend(reader.messages())
+
+        self.assertEqual(received, msgs)
+        self.assertEqual(reader.pending(), 0)
+        reader.close()
+
+
+class TestFlowTreeUtil(unittest.TestCase):
+    """ This class provides unit tests for the flow tree utilities.
+    """
+
+    def setUp(self):
+        """ Creates a clean test environment.
+        """
+
+        self.dump = json.dumps({
+            'flows' : [{
+                'node' : 1,
+                'flow' : 'xxxxxxxx',
+                'children' : [
+                    {
+                        'node' : 4294967297,
+                        'flow' : '(00000001 - 0000000x)',
+                        'children' : [{'node' : 2, 'flow' : '00000001'}]
+                    },
+                    {'node' : 8589934594, 'flow' : '00000000'}
+                ]
+            }]
+        }, sort_keys=True, indent=4)
+
+
+    def test_json_events(self):
+        """ Tests reading JSON as a stream of events.
+        """
+
+        doc = '{"a": [1, -2.5e3, "x\\"y", true, null], "b": {}}'
+        events = list(iter_json_events(io.StringIO(doc), chunk_size=3))
+
+        self.assertEqual(events, [
+            ('start_map', None),
+            ('map_key', 'a'),
+            ('start_array', None),
+            ('value', 1),
+            ('value', -2500.0),
+            ('value', 'x"y'),
+            ('value', True),
+            ('value', None),
+            ('end_array', None),
+            ('map_key', 'b'),
+            ('start_map', None),
+            ('end_map', None),
+            ('end_map', None)
+        ])
+
+
+    def test_flow_tree_nodes(self):
+        """ Tests streaming the nodes of a flow tree dump.
+        """
+
+        nodes = list(iter_flow_tree_nodes(io.StringIO(self.dump)))
+
+        self.assertEqual(
+            [(n.depth, n.node, n.leaf) for n in nodes],
+            [(2, 2, True), (1, 4294967297, False), (1, 8589934594, True), (0, 1, False)]
+        )
+        self.assertEqual(nodes[1].flow, '(00000001 - 0000000x)')
+        self.assertEqual(flow_tree_depth(io.StringIO(self.dump)), 3)
+
+
+    def test_flow_tree_paths(self):
+        """ Tests streaming the paths to leaves of a flow tree dump.
+        """
+
+        self.assertEqual(
+            list(iter_flow_tree_paths(io.StringIO(self.dump), [2, 8589934594])),
+            [(0, (1, 4294967297, 2)), (0, (1, 8589934594))]
+        )
+        self.assertEqual(list(iter_flow_tree_paths(io.StringIO(self.dump), [3])), [])
+
+
+    def test_binary_flow_trees(self):
+        """ Tests converting a flow tree dump to the binary format.
+        """
+
+        with tempfile.NamedTemporaryFile(suffix='.flow_tree.bin') as ofile:
+            write_binary_flow_trees(io.StringIO(self.dump), ofile)
+            ofile.flush()
+
+            with FlowTreeDump(ofile.name) as dump:
+                self.assertEqual(len(dump.roots), 1)
+                root = dump.roots[0]
+
+                self.assertEqual(dump.node(root), 1)
+                self.assertEqual(dump.flow(root), 'xxxxxxxx')
+                self.assertEqual(
+                    [dump.node(child) for child in dump.children(root)],
+                    [4294967297, 8589934594]
+                )
+                self.assertTrue(dump.is_leaf(dump.children(root)[1]))
+                self.assertEqual(
+                    {'flows' : [dump.to_json(root)]}, json.loads(self.dump)
+                )
+
+
+class TestStatsUtil(unittest.TestCase):
+    """ This class provides unit tests for the statistics utilities.
+    """
+
+    def test_statistics(self):
+        """ Tests the summary of measurements.
+        """
+
+        values = [2.0, 4.0, 4.0, 4.0, 5.0, 5.0, 7.0, 9.0]
+
+        self.assertEqual(mean(values), 5.0)
+        self.assertEqual(median(values), 4.5)
+        self.assertEqual(median([3, 1, 2]), 2)
+        self.assertAlmostEqual(stddev(values), 2.138, places=3)
+        self.assertEqual(stddev([1.0]), 0.0)
+
+        low, high = confidence_interval(values)
+        self.assertAlmostEqual(low, 5.0 - 2.365 * stddev(values) / 8 ** 0.5)
+        self.assertAlmostEqual(high, 5.0 + 2.365 * stddev(values) / 8 ** 0.5)
+        self.assertEqual(confidence_interval([3.0]), (3.0, 3.0))
+
+        summary = summarize(values)
+        self.assertEqual(summary['n'], 8)
+        self.assertEqual((summary['min'], summary['max']), (2.0, 9.0))
+        self.assertEqual((summary['ci_low'], summary['ci_high']), (low, high))
+
+
+class _ProfiledEngine(object):
+    def __init__(self, profiler):
+        self.profiler = profiler
+        self.calls = 0
+        self.bytes_sent = 0
+        self.bytes_received = 0
+
+    @profiled('rpc')
+    def wait(self):
+        self.calls += 2
+        self.bytes_sent += 10
+        self.bytes_received += 4
+
+    @profiled('vectors')
+    def build(self):
+        self.wait()
+
+
+class TestProfileUtil(unittest.TestCase):
+    """ This class provides unit tests for the task profiler.
+    """
+
+    def test_profiler(self):
+        """ Tests the per-phase accounting of tasks.
+        """
+
+        profiler = TaskProfiler(sample=['packet_filter'])
+        engine = _ProfiledEngine(profiler)
+        profiler.rpc = engine
+
+        profiler.begin_task('packet_filter')
+        profiler.add('decode', 0.5)
+        engine.build()
+        with profiler.phase('diff'):
+            pass
+        profiler.end_task('packet_filter')
+
+        profiler.begin_task('probe')
+        engine.wait()
+        profiler.end_task('probe')
+
+        stats = profiler.to_json()
+        self.assertEqual(
+            set(stats['tasks']['packet_filter']['phases']),
+            set(['decode', 'vectors', 'rpc', 'diff', 'other'])
+        )
+        self.assertEqual(stats['tasks']['packet_filter']['phases']['decode'], 0.5)
+        self.assertEqual(stats['tasks']['packet_filter']['count'], 1)
+        self.assertEqual(stats['tasks']['probe']['rpc_calls'], 2)
+        self.assertEqual(stats['tasks']['probe']['rpc_bytes_sent'], 10)
+        self.assertEqual(stats['tasks']['probe']['rpc_bytes_received'], 4)
+        self.assertEqual(list(stats['profiles']), ['packet_filter'])
+        self.assertIn('function calls', stats['profiles']['packet_filter'])
+
+        # phases are accounted exclusively
+        phases = stats['tasks']['probe']['phases']
+        self.assertLessEqual(sum(phases.values()), stats['tasks']['probe']['time'])
+
+        json.dumps(stats)
+        profiler.reset()
+        self.assertEqual(profiler.to_json(), {'tasks' : {}, 'profiles' : {}})
+
+        engine.profiler = None
+        engine.build()
+        self.assertEqual(profiler.tasks, {})
+
+
+class TestExecutorUtil(unittest.TestCase):
+    """ This class provides unit tests for the priority executor.
+    """
+
+    def test_priority(self):
+        """ Tests that urgent calls overtake pending regular calls.
+        """
+
+        executor = PriorityExecutor()
+        started = threading.Event()
+        release = threading.Event()
+        order = []
+
+        def block():
+            started.set()
+            release.wait()
+
+        executor.submit(block)
+        started.wait()
+        futures = [
+            executor.submit(order.append, 'regular 1'),
+            executor.submit(order.append, 'regular 2'),
+            executor.submit_urgent(order.append, 'urgent')
+        ]
+        failed = executor.submit_urgent(int, 'nan')
+        release.set()
+        executor.shutdown(wait=True)
+
+        self.assertEqual(order, ['urgent', 'regular 1', 'regular 2'])
+        self.assertTrue(all(future.done() for future in futures))
+        self.assertIsInstance(failed.exception(), ValueError)
+        self.assertRaises(RuntimeError, executor.submit, order.append, 'late')
+
+
 class TestJsonUtil(unittest.TestCase):
     """ This class provides unit tests for JSON utilities.
     """
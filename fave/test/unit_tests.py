@@ -27,6 +27,8 @@ import unittest
 
 from test.test_utils import TestCollectionsUtilDict, TestCollectionsUtilList
 from test.test_utils import TestMatchUtil, TestPacketUtil, TestPathUtil, TestJsonUtil
+from test.test_utils import TestIp6npUtil, TestAggregatorUtil, TestFlowTreeUtil
+from test.test_utils import TestStatsUtil, TestProfileUtil, TestExecutorUtil
 from test.test_netplumber import TestMapping, TestVector, TestHeaderSpace, TestModel
 from test.test_topology import TestLinksModel, TestTopologyCommand
 from test.test_models import TestGenericModel, TestRouterModel
@@ -36,7 +38,11 @@ from test.test_tree import TestTree
 from test.test_rules import TestRuleField, TestMatch, TestRule
 from test.test_rules import TestForward, TestRewrite, TestMiss
 from test.test_iptables_parser import TestParser
+from test.test_iptables_line_parser import TestLineParser
+from test.test_model_cache import TestModelCache
 from test.test_checker import TestChecker
+from test.test_rpc import TestRPCClient
+from test.test_reporter import TestReporter
 
 if __name__ == '__main__':
     SUITE = unittest.TestSuite()
@@ -59,6 +65,24 @@ if __name__ == '__main__':
     SUITE.addTests(
         unittest.defaultTestLoader.loadTestsFromTestCase(TestJsonUtil)
     )
+    SUITE.addTests(
+        unittest.defaultTestLoader.loadTestsFromTestCase(TestIp6npUtil)
+    )
+    SUITE.addTests(
+        unittest.defaultTestLoader.loadTestsFromTestCase(TestAggregatorUtil)
+    )
+    SUITE.addTests(
+        unittest.defaultTestLoader.loadTestsFromTestCase(TestFlowTreeUtil)
+    )
+    SUITE.addTests(
+        unittest.defaultTestLoader.loadTestsFromTestCase(TestStatsUtil)
+    )
+    SUITE.addTests(
+        unittest.defaultTestLoader.loadTestsFromTestCase(TestProfileUtil)
+    )
+    SUITE.addTests(
+        unittest.defaultTestLoader.loadTestsFromTestCase(TestExecutorUtil)
+    )
 
     SUITE.addTests(
         unittest.defaultTestLoader.loadTestsFromTestCase(TestMapping)
@@ -131,10 +155,24 @@ if __name__ == '__main__':
     SUITE.addTests(
         unittest.defaultTestLoader.loadTestsFromTestCase(TestParser)
     )
+    SUITE.addTests(
+        unittest.defaultTestLoader.loadTestsFromTestCase(TestLineParser)
+    )
+    SUITE.addTests(
+        unittest.defaultTestLoader.loadTestsFromTestCase(TestModelCache)
+    )
 
     SUITE.addTests(
         unittest.defaultTestLoader.loadTestsFromTestCase(TestChecker)
     )
 
+    SUITE.addTests(
+        unittest.defaultTestLoader.loadTestsFromTestCase(TestRPCClient)
+    )
+
+    SUITE.addTests(
+        unittest.defaultTestLoader.loadTestsFromTestCase(TestReporter)
+    )
+
     RET = not unittest.TextTestRunner(verbosity=2).run(SUITE).wasSuccessful()
     sys.exit(RET)
@@ -40,7 +40,7 @@ from devices.generator import GeneratorModel
 from devices.probe import ProbeModel
 from devices.router import RouterModel, parse_cisco_acls, parse_cisco_interfaces
 
-from iptables.generator import generate as ip6np_generate
+from iptables.model_cache import cached_generate
 from iptables.parser_singleton import PARSER as IP6TABLES_PARSER
 
 class LinksModel(object):
@@ -428,26 +428,29 @@ def main(argv):
     if args.command == 'add':
         model = {
             'switch' : lambda: SwitchModel(args.node, ports=args.ports, table_ids=args.table_ids),
-            'packet_filter' : lambda: ip6np_generate(
-                IP6TABLES_PARSER.parse(args.ruleset),
+            'packet_filter' : lambda: cached_generate(
+                args.ruleset,
                 args.node,
                 args.ip,
                 args.ports,
-                interweaving=args.use_interweaving
+                interweaving=args.use_interweaving,
+                parser=IP6TABLES_PARSER
             ),
-            'application_layer_gateway' : lambda: ip6np_generate(
-                IP6TABLES_PARSER.parse(args.ruleset),
+            'application_layer_gateway' : lambda: cached_generate(
+                args.ruleset,
                 args.node,
                 args.ip,
                 args.ports,
-                interweaving=args.use_interweaving
+                interweaving=args.use_interweaving,
+                parser=IP6TABLES_PARSER
             ),
-            'snapshot_packet_filter' : lambda: ip6np_generate(
-                IP6TABLES_PARSER.parse(args.ruleset),
+            'snapshot_packet_filter' : lambda: cached_generate(
+                args.ruleset,
                 args.node,
                 args.ip,
                 args.ports,
-                state_snap=True
+                state_snap=True,
+                parser=IP6TABLES_PARSER
             ),
             'links' : lambda: LinksModel(args.links),
             'generator' : lambda: GeneratorModel(
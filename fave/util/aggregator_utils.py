@@ -24,11 +24,20 @@ import time
 import socket
 import struct
 import logging
+import json
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
 
 FAVE_DEFAULT_UNIX = "/dev/shm/np_aggregator.socket"
 FAVE_DEFAULT_IP = '127.0.0.1'
 FAVE_DEFAULT_PORT = 44000
 
+# the most significant bit of the length header flags compactly encoded messages
+_COMPACT_FLAG = 0x80000000
+
 def connect_to_fave(server, port=0):
     """ Creates a connected socket to FaVe.
     """
@@ -69,10 +78,104 @@ def fave_sendmsg(conn, data):
     data -- the message as string
     """
 
-    msg = struct.pack('>I', len(data)) + data.encode('utf8')
+    return conn.sendall(fave_frame(data))
+
+
+def fave_frame(data):
+    """ Frames a message for the transmission to or from FaVe.
+
+    Arguments:
+    data -- the message as string
+    """
+
+    data = data.encode('utf8')
+    return struct.pack('>I', len(data)) + data
+
+
+def has_compact_encoding():
+    """ Checks whether the compact message encoding is available.
+    """
+
+    return msgpack is not None
+
+
+def _intern_keys(obj, keys):
+    if isinstance(obj, dict):
+        return {
+            keys.setdefault(k, len(keys)) : _intern_keys(v, keys) for k, v in obj.items()
+        }
+    elif isinstance(obj, (list, tuple)):
+        return [_intern_keys(e, keys) for e in obj]
+    return obj
+
+
+def _restore_keys(obj, keys):
+    if isinstance(obj, dict):
+        return {keys[k] : _restore_keys(v, keys) for k, v in obj.items()}
+    elif isinstance(obj, list):
+        return [_restore_keys(e, keys) for e in obj]
+    return obj
+
+
+def fave_sendobj(conn, obj, compact=True):
+    """ Send a JSON serializable object to FaVe.
+
+    The object is packed with msgpack if available and requested. Object keys
+    are replaced by indices into a table of key names that is sent along with
+    the message. Otherwise, the object is sent as JSON string.
+
+    Arguments:
+    conn -- a connected socket
+    obj -- the message as JSON serializable object
+
+    Keyword arguments:
+    compact -- use the compact encoding if available (default: True)
+    """
+
+    if not compact or msgpack is None:
+        return fave_sendmsg(conn, json.dumps(obj))
+
+    keys = {}
+    body = _intern_keys(obj, keys)
+    data = msgpack.packb(
+        [sorted(keys, key=keys.get), body], use_bin_type=True
+    )
+
+    msg = struct.pack('>I', len(data) | _COMPACT_FLAG) + data
     return conn.sendall(msg)
 
 
+def fave_loads(data):
+    """ Decodes a message received by fave_recvmsg().
+
+    Arguments:
+    data -- a JSON string or a compactly encoded message as bytes
+    """
+
+    if isinstance(data, str):
+        return json.loads(data)
+
+    if msgpack is None:
+        raise ValueError("cannot decode compact message: msgpack is not available")
+
+    keys, body = msgpack.unpackb(data, raw=False, strict_map_key=False)
+    return _restore_keys(body, keys)
+
+
+def fave_parse_header(header):
+    """ Parses the header of a message.
+
+    Arguments:
+    header -- the header's four bytes
+
+    Returns:
+    A pair of the message's length and whether it is compactly encoded.
+    """
+
+    msglen = struct.unpack('>I', header)[0]
+    return msglen & ~_COMPACT_FLAG, bool(msglen & _COMPACT_FLAG)
+
+
 def fave_recvmsg(conn, logger=None):
     """ Receive a message from FaVe.
 
@@ -81,16 +184,126 @@ def fave_recvmsg(conn, logger=None):
 
     Keyword arguments:
     logger -- a logger instance (default: None)
+
+    Returns:
+    The message as string or as bytes if it is compactly encoded (see
+    fave_loads()).
     """
 
     raw_msglen = conn.recv(4)
     if not raw_msglen:
         logger.warn("fave_recvmsg: failed to read message length")
         return None
-    msglen = struct.unpack('>I', raw_msglen)[0]
+    msglen, compact = fave_parse_header(raw_msglen)
     if logger and logger.isEnabledFor(logging.DEBUG):
-        logger.debug("fave_recvmsg: message length is %s" % msglen)
-    return _recvall(conn, msglen, logger=logger)
+        logger.debug(
+            "fave_recvmsg: message length is %s%s" % (msglen, " (compact)" if compact else "")
+        )
+    data = _recvall(conn, msglen, logger=logger)
+    if data is None or compact:
+        return data
+    return data.decode('utf8')
+
+class FaveMessageReader(object):
+    """ Reads consecutive messages from a persistent connection.
+
+    Data is received into a preallocated buffer that is reused for all
+    messages and only grows if a single message exceeds its size.
+    """
+
+    def __init__(self, conn, buffer_size=65536):
+        """ Constructs a reader for a connection.
+
+        Arguments:
+        conn -- a connected socket
+
+        Keyword arguments:
+        buffer_size -- the initial size of the receive buffer (default: 65536)
+        """
+
+        self.conn = conn
+        self.buffer = bytearray(buffer_size)
+        self.view = memoryview(self.buffer)
+        self.start = 0
+        self.end = 0
+
+
+    def _reserve(self, size):
+        """ Makes room for at least size bytes of pending data in the buffer.
+        """
+
+        pending = self.end - self.start
+        if len(self.buffer) - self.start >= size:
+            return
+
+        if len(self.buffer) >= size:
+            # move pending data to the front of the buffer
+            self.view[:pending] = bytes(self.view[self.start:self.end])
+        else:
+            buf = bytearray(max(2 * len(self.buffer), size))
+            buf[:pending] = self.view[self.start:self.end]
+            self.view.release()
+            self.buffer = buf
+            self.view = memoryview(self.buffer)
+
+        self.start = 0
+        self.end = pending
+
+
+    def fill(self):
+        """ Receives available data from the connection.
+
+        Returns:
+        The number of received bytes which is 0 if the peer closed the
+        connection.
+        """
+
+        if self.end == len(self.buffer):
+            self._reserve(len(self.buffer) - self.start + 1)
+
+        nbytes = self.conn.recv_into(self.view[self.end:])
+        self.end += nbytes
+        return nbytes
+
+
+    def pending(self):
+        """ Returns the number of received bytes that belong to incomplete
+            messages.
+        """
+
+        return self.end - self.start
+
+
+    def messages(self):
+        """ Yields all complete messages received so far.
+
+        Messages are yielded as strings or as bytes if they are compactly
+        encoded (see fave_loads()).
+        """
+
+        while self.end - self.start >= 4:
+            msglen, compact = fave_parse_header(self.view[self.start:self.start+4])
+
+            stop = self.start + 4 + msglen
+            if stop > self.end:
+                self._reserve(4 + msglen)
+                break
+
+            frame = self.view[self.start+4:stop]
+            self.start = stop
+            yield bytes(frame) if compact else str(frame, 'utf8')
+
+        if self.start == self.end:
+            self.start = self.end = 0
+
+
+    def close(self):
+        """ Closes the connection.
+        """
+
+        self.view.release()
+        self.conn.close()
+
 
 def _recvall(conn, msglen, logger=None):
     data = bytearray()
@@ -100,4 +313,4 @@ def _recvall(conn, msglen, logger=None):
             logger.warn("fave_recvmsg: received empty data. data so far: %s" % len(data))
             return None
         data.extend(part)
-    return data.decode('utf8')
+    return bytes(data)
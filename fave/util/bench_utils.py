@@ -130,8 +130,13 @@ def _add_rules(rules, use_unix=False):
     switch.main(["-a"] + opts)
 
 
-def _add_ruleset(name, _type, ports, address, ruleset, use_unix=False, interweave=True):
-    ip6tables.main(["-n", name, "-p", ports, "-i", address, "-f", ruleset] + (["-u"] if use_unix else [])) + (["-s"] if interweave else [])
+def _add_ruleset(name, _type, ports, address, ruleset, use_unix=False, interweave=True, compact=False):
+    ip6tables.main(
+        ["-n", name, "-p", ports, "-i", address, "-f", ruleset] +
+        (["-u"] if use_unix else []) +
+        (["-s"] if interweave else []) +
+        (["-c"] if compact else [])
+    )
 
 
 _DEVICES = {
@@ -186,16 +191,42 @@ def add_routes(routes, use_unix=False):
         _add_rules(routes, use_unix=use_unix)
 
 
-def add_rulesets(devices, use_unix=False, interweave=True):
+def _add_rulesets(devices, use_unix=False, interweave=True, compact=False, workers=None):
+    ip6tables.main(
+        ["-b", "|".join(["\\".join((
+            name,
+            address,
+            ','.join([str(p) for p in ports]) if isinstance(ports, list) else str(ports),
+            ruleset
+        )) for name, _type, ports, address, ruleset in devices])] +
+        (["-w", str(workers)] if workers else []) +
+        (["-u"] if use_unix else []) +
+        (["-s"] if interweave else []) +
+        (["-c"] if compact else [])
+    )
+
+
+def add_rulesets(devices, use_unix=False, interweave=True, compact=False, bulk=False, workers=None):
     """ Add rulesets to a set of devices.
 
     Keyword arguments:
     devices - a set of devices
+    compact - send the models in the compact encoding if available
+    bulk - parse and generate the rulesets in parallel and stream them to FaVe
+    workers - the number of worker processes for the bulk mode (default: the number of CPUs)
     """
 
     get_type = lambda x: x[1]
-    for device in [d for d in devices if get_type(d) in ["packet_filter", "host"]]:
-        _add_ruleset(*device, use_unix=use_unix, interweave=interweave)
+    filters = [d for d in devices if get_type(d) in ["packet_filter", "host"]]
+
+    if bulk and filters:
+        _add_rulesets(
+            filters, use_unix=use_unix, interweave=interweave, compact=compact, workers=workers
+        )
+        return
+
+    for device in filters:
+        _add_ruleset(*device, use_unix=use_unix, interweave=interweave, compact=compact)
 
 
 def add_policies(probes, links, use_unix=False):
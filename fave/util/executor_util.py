@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+
+# -*- coding: utf-8 -*-
+
+# Copyright 2020 Claas Lorenz <claas_lorenz@genua.de>
+
+# This file is part of FaVe.
+
+# FaVe is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# FaVe is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with FaVe.  If not, see <https://www.gnu.org/licenses/>.
+
+""" This module provides a single-threaded executor with prioritized calls.
+"""
+
+import itertools
+
+from concurrent.futures import Executor, Future
+from queue import PriorityQueue
+from threading import Thread
+
+
+# calls are ordered by priority first and by submission second
+_URGENT = 0
+_REGULAR = 1
+_SHUTDOWN = 2
+
+
+class PriorityExecutor(Executor):
+    """ This class runs calls in a single thread where urgent calls overtake
+        regular ones that are still pending.
+
+    Calls of the same priority are run in the order of their submission.
+    """
+
+    def __init__(self):
+        self._queue = PriorityQueue()
+        self._order = itertools.count()
+        self._shutdown = False
+        self._thread = Thread(target=self._work, daemon=True)
+        self._thread.start()
+
+
+    def _put(self, priority, fn, args, kwargs):
+        if self._shutdown:
+            raise RuntimeError('cannot schedule new calls after shutdown')
+
+        future = Future()
+        self._queue.put((priority, next(self._order), future, fn, args, kwargs))
+        return future
+
+
+    def submit(self, fn, *args, **kwargs):
+        """ Schedules a regular call.
+
+        Arguments:
+        fn -- the callable
+
+        Returns:
+        A future of the call's result.
+        """
+
+        return self._put(_REGULAR, fn, args, kwargs)
+
+
+    def submit_urgent(self, fn, *args, **kwargs):
+        """ Schedules a call ahead of all pending regular calls.
+
+        Arguments:
+        fn -- the callable
+
+        Returns:
+        A future of the call's result.
+        """
+
+        return self._put(_URGENT, fn, args, kwargs)
+
+
+    def _work(self):
+        while True:
+            _priority, _order, future, fn, args, kwargs = self._queue.get()
+            if future is None:
+                break
+
+            if not future.set_running_or_notify_cancel():
+                continue
+
+            try:
+                result = fn(*args, **kwargs)
+            except BaseException as err:
+                future.set_exception(err)
+            else:
+                future.set_result(result)
+
+
+    def shutdown(self, wait=True, *, cancel_futures=False):
+        """ Stops the executor once all pending calls are done.
+
+        Keyword arguments:
+        wait -- wait for the pending calls (default: True)
+        cancel_futures -- cancel the pending calls instead (default: False)
+        """
+
+        if not self._shutdown:
+            self._shutdown = True
+            self._queue.put((_SHUTDOWN, next(self._order), None, None, None, None))
+
+        if cancel_futures:
+            with self._queue.mutex:
+                pending = list(self._queue.queue)
+            for _priority, _order, future, _fn, _args, _kwargs in pending:
+                if future is not None:
+                    future.cancel()
+
+        if wait:
+            self._thread.join()
@@ -0,0 +1,464 @@
+#!/usr/bin/env python3
+
+# -*- coding: utf-8 -*-
+
+# Copyright 2020 Claas Lorenz <claas_lorenz@genua.de>
+
+# This file is part of FaVe.
+
+# FaVe is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# FaVe is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with FaVe.  If not, see <https://www.gnu.org/licenses/>.
+
+""" This module provides utilities to read NetPlumber flow tree dumps
+    incrementally.
+
+    Dumps are parsed as a stream of JSON events so that only the currently
+    open branch of a tree is kept in memory. Since NetPlumber writes object
+    keys in sorted order, the children of a tree node precede its node id and
+    nodes are therefore yielded in post-order.
+
+    Furthermore, dumps can be converted to a compact binary format that is
+    memory-mapped and walked by offset instead of being parsed again.
+"""
+
+import json
+import mmap
+import os
+import re
+import shutil
+import struct
+import tempfile
+
+from collections import namedtuple
+
+
+FlowTreeNode = namedtuple('FlowTreeNode', ['tree', 'depth', 'node', 'flow', 'leaf'])
+
+
+_TOKEN = re.compile(r'''
+    [ \t\n\r]*
+    (?:
+        ([{}\[\],:])                                  # structure
+      | ("(?:[^"\\]|\\.)*")                           # string
+      | (-?(?:0|[1-9]\d*)(?:\.\d+)?(?:[eE][+-]?\d+)?)  # number
+      | (true|false|null)                             # literal
+    )
+''', re.VERBOSE)
+
+_LITERALS = {'true' : True, 'false' : False, 'null' : None}
+
+_DELIMITERS = ' \t\n\r,]}'
+
+
+def iter_json_events(fileobj, chunk_size=65536):
+    """ Reads a JSON document as a stream of events.
+
+    Events are pairs of a type and a value. The types are 'start_map',
+    'end_map', 'start_array', 'end_array', 'map_key', and 'value'.
+
+    Arguments:
+    fileobj -- a file opened in text mode
+
+    Keyword arguments:
+    chunk_size -- the number of characters read at once (default: 65536)
+    """
+
+    buf = ''
+    pos = 0
+    eof = False
+
+    # a stack of flags that tell whether the container is a map
+    maps = []
+    expect_key = False
+
+    while True:
+        match = _TOKEN.match(buf, pos)
+
+        # a token may be truncated at the end of the buffer, where numbers may
+        # also be truncated to a valid prefix
+        if not eof and (
+                match is None or
+                match.end() == len(buf) or
+                (match.group(3) is not None and buf[match.end()] not in _DELIMITERS)
+        ):
+            chunk = fileobj.read(chunk_size)
+            if not chunk:
+                eof = True
+            buf = buf[pos:] + chunk
+            pos = 0
+            continue
+
+        if match is None:
+            if buf[pos:].strip():
+                raise ValueError("invalid JSON at: %s" % buf[pos:pos+32])
+            return
+
+        pos = match.end()
+        struct, string, number, literal = match.groups()
+
+        if struct == '{':
+            maps.append(True)
+            expect_key = True
+            yield 'start_map', None
+        elif struct == '}':
+            maps.pop()
+            expect_key = False
+            yield 'end_map', None
+        elif struct == '[':
+            maps.append(False)
+            expect_key = False
+            yield 'start_array', None
+        elif struct == ']':
+            maps.pop()
+            yield 'end_array', None
+        elif struct == ',':
+            expect_key = maps[-1]
+        elif struct == ':':
+            continue
+        elif string is not None:
+            value = string[1:-1] if '\\' not in string else json.loads(string)
+            if expect_key:
+                expect_key = False
+                yield 'map_key', value
+            else:
+                yield 'value', value
+        elif number is not None:
+            yield 'value', (int(number) if number.lstrip('-').isdigit() else float(number))
+        else:
+            yield 'value', _LITERALS[literal]
+
+
+# container types while walking a dump
+_OTHER, _TOP, _FLOWS, _TREE, _CHILDREN = range(5)
+
+
+def iter_flow_tree_nodes(fileobj):
+    """ Yields the nodes of all flow trees of a dump in post-order.
+
+    Arguments:
+    fileobj -- a flow tree dump opened in text mode
+
+    Returns:
+    An iterator of FlowTreeNode tuples which carry the index of the tree in
+    the dump, the node's depth (starting at 0), its node id, its flow, and
+    whether it is a leaf.
+    """
+
+    containers = []
+    trees = []
+    tree_idx = -1
+    key = None
+
+    for event, value in iter_json_events(fileobj):
+        top = containers[-1] if containers else None
+
+        if event == 'map_key':
+            key = value
+
+        elif event == 'start_map':
+            if top == _FLOWS or top == _CHILDREN:
+                if top == _FLOWS:
+                    tree_idx += 1
+                containers.append(_TREE)
+                trees.append({'node' : None, 'flow' : None, 'leaf' : True})
+            elif top is None:
+                containers.append(_TOP)
+            else:
+                containers.append(_OTHER)
+            key = None
+
+        elif event == 'start_array':
+            if top == _TOP and key == 'flows':
+                containers.append(_FLOWS)
+            elif top == _TREE and key == 'children':
+                trees[-1]['leaf'] = False
+                containers.append(_CHILDREN)
+            else:
+                containers.append(_OTHER)
+
+        elif event == 'end_map':
+            if containers.pop() == _TREE:
+                tree = trees.pop()
+                yield FlowTreeNode(
+                    tree_idx, len(trees), tree['node'], tree['flow'], tree['leaf']
+                )
+
+        elif event == 'end_array':
+            containers.pop()
+
+        elif top == _TREE and key in ('node', 'flow'):
+            trees[-1][key] = value
+
+
+def iter_flow_tree_leaves(fileobj):
+    """ Yields the leaves of all flow trees of a dump.
+
+    Arguments:
+    fileobj -- a flow tree dump opened in text mode
+    """
+
+    return (node for node in iter_flow_tree_nodes(fileobj) if node.leaf)
+
+
+def flow_tree_depth(fileobj):
+    """ Determines the maximum number of levels of the flow trees in a dump.
+
+    Arguments:
+    fileobj -- a flow tree dump opened in text mode
+    """
+
+    return max(
+        (node.depth + 1 for node in iter_flow_tree_nodes(fileobj)),
+        default=0
+    )
+
+
+def iter_flow_tree_paths(fileobj, leaves):
+    """ Yields the paths from the tree roots to certain leaves.
+
+    Only the paths to matching leaves are kept in memory.
+
+    Arguments:
+    fileobj -- a flow tree dump opened in text mode
+    leaves -- a collection of leaf node ids
+
+    Returns:
+    An iterator of pairs of the tree index and the path as tuple of node ids.
+    """
+
+    leaves = set(leaves)
+
+    # paths below nodes whose ids have not been read yet, per depth
+    pending = {}
+
+    for node in iter_flow_tree_nodes(fileobj):
+        suffixes = pending.pop(node.depth + 1, [])
+
+        if node.leaf:
+            paths = [(node.node,)] if node.node in leaves else []
+        else:
+            paths = [(node.node,) + suffix for suffix in suffixes]
+
+        if node.depth == 0:
+            for path in paths:
+                yield node.tree, path
+        elif paths:
+            pending.setdefault(node.depth, []).extend(paths)
+
+
+# binary flow tree dumps consist of a header, a table of node records, the
+# indices of the tree roots, the children's indices, and a string table
+_BIN_MAGIC = b'FTRB'
+_BIN_VERSION = 1
+_BIN_HEADER = struct.Struct('<4sIIII')
+_BIN_NODE = struct.Struct('<QIII')
+_BIN_INDEX = struct.Struct('<I')
+_BIN_STRING = struct.Struct('<QI')
+
+_NO_FLOW = 0xffffffff
+_HAS_CHILDREN = 0x80000000
+
+
+def write_binary_flow_trees(fileobj, ofile):
+    """ Converts a flow tree dump to the binary format.
+
+    The dump is read as a stream and only the interned flows and the
+    indices of nodes whose parents are pending are kept in memory.
+
+    Arguments:
+    fileobj -- a flow tree dump opened in text mode
+    ofile -- a file opened in binary mode to write to
+    """
+
+    strings = {}
+    roots = []
+    pending = {}
+
+    with tempfile.TemporaryFile() as nodes, tempfile.TemporaryFile() as children:
+        num_nodes = 0
+        num_children = 0
+
+        for node in iter_flow_tree_nodes(fileobj):
+            kids = pending.pop(node.depth + 1, [])
+
+            flow = _NO_FLOW
+            if node.flow is not None:
+                flow = strings.setdefault(node.flow, len(strings))
+
+            nodes.write(_BIN_NODE.pack(
+                node.node,
+                flow,
+                num_children,
+                len(kids) | (0 if node.leaf else _HAS_CHILDREN)
+            ))
+            for kid in kids:
+                children.write(_BIN_INDEX.pack(kid))
+            num_children += len(kids)
+
+            if node.depth == 0:
+                roots.append(num_nodes)
+            else:
+                pending.setdefault(node.depth, []).append(num_nodes)
+            num_nodes += 1
+
+        ofile.write(_BIN_HEADER.pack(
+            _BIN_MAGIC, _BIN_VERSION, num_nodes, len(roots), num_children
+        ))
+        ofile.write(_BIN_INDEX.pack(len(strings)))
+
+        nodes.seek(0)
+        shutil.copyfileobj(nodes, ofile)
+        for root in roots:
+            ofile.write(_BIN_INDEX.pack(root))
+        children.seek(0)
+        shutil.copyfileobj(children, ofile)
+
+    encoded = [s.encode('utf8') for s in sorted(strings, key=strings.get)]
+    offset = 0
+    for string in encoded:
+        ofile.write(_BIN_STRING.pack(offset, len(string)))
+        offset += len(string)
+    for string in encoded:
+        ofile.write(string)
+
+
+def convert_flow_tree_dumps(odir):
+    """ Writes a binary copy of every flow tree dump in a directory.
+
+    Arguments:
+    odir -- the dump directory
+    """
+
+    for name in os.listdir(odir):
+        if not name.endswith('.flow_tree.json'):
+            continue
+
+        path = os.path.join(odir, name)
+        with open(path, 'r') as dump, open(path[:-len('json')] + 'bin', 'wb') as ofile:
+            write_binary_flow_trees(dump, ofile)
+
+
+class FlowTreeDump(object):
+    """ This class provides random access to a binary flow tree dump.
+
+    The dump is memory-mapped and nodes are addressed by their index in the
+    dump's node table.
+    """
+
+    def __init__(self, path):
+        """ Opens a binary flow tree dump.
+
+        Arguments:
+        path -- the path to the dump
+        """
+
+        with open(path, 'rb') as dump:
+            self.mmap = mmap.mmap(dump.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, self.num_nodes, num_roots, num_children = \
+            _BIN_HEADER.unpack_from(self.mmap, 0)
+        if magic != _BIN_MAGIC or version != _BIN_VERSION:
+            self.mmap.close()
+            raise ValueError("no binary flow tree dump: %s" % path)
+
+        num_strings = _BIN_INDEX.unpack_from(self.mmap, _BIN_HEADER.size)[0]
+
+        self.nodes_off = _BIN_HEADER.size + _BIN_INDEX.size
+        self.roots_off = self.nodes_off + self.num_nodes * _BIN_NODE.size
+        self.children_off = self.roots_off + num_roots * _BIN_INDEX.size
+        self.strings_off = self.children_off + num_children * _BIN_INDEX.size
+        self.data_off = self.strings_off + num_strings * _BIN_STRING.size
+
+        self.roots = [
+            _BIN_INDEX.unpack_from(self.mmap, self.roots_off + i * _BIN_INDEX.size)[0] \
+            for i in range(num_roots)
+        ]
+        self._strings = {}
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, *_args):
+        self.close()
+
+
+    def close(self):
+        """ Closes the dump.
+        """
+
+        self.mmap.close()
+
+
+    def node(self, idx):
+        """ Returns the node id of the node at an index.
+        """
+
+        return _BIN_NODE.unpack_from(self.mmap, self.nodes_off + idx * _BIN_NODE.size)[0]
+
+
+    def flow(self, idx):
+        """ Returns the flow of the node at an index or None if the dump is
+            simple.
+        """
+
+        sidx = _BIN_NODE.unpack_from(self.mmap, self.nodes_off + idx * _BIN_NODE.size)[1]
+        if sidx == _NO_FLOW:
+            return None
+
+        try:
+            return self._strings[sidx]
+        except KeyError:
+            offset, length = _BIN_STRING.unpack_from(
+                self.mmap, self.strings_off + sidx * _BIN_STRING.size
+            )
+            start = self.data_off + offset
+            string = self.mmap[start:start+length].decode('utf8')
+            self._strings[sidx] = string
+            return string
+
+
+    def is_leaf(self, idx):
+        """ Checks whether the node at an index has no children.
+        """
+
+        count = _BIN_NODE.unpack_from(self.mmap, self.nodes_off + idx * _BIN_NODE.size)[3]
+        return not count & _HAS_CHILDREN
+
+
+    def children(self, idx):
+        """ Returns the indices of the children of the node at an index.
+        """
+
+        _node, _flow, first, count = _BIN_NODE.unpack_from(
+            self.mmap, self.nodes_off + idx * _BIN_NODE.size
+        )
+        start = self.children_off + first * _BIN_INDEX.size
+        return list(struct.unpack_from(
+            '<%dI' % (count & ~_HAS_CHILDREN), self.mmap, start
+        ))
+
+
+    def to_json(self, idx):
+        """ Reconstructs the tree below the node at an index as in JSON dumps.
+        """
+
+        tree = {'node' : self.node(idx)}
+        flow = self.flow(idx)
+        if flow is not None:
+            tree['flow'] = flow
+        if not self.is_leaf(idx):
+            tree['children'] = [self.to_json(child) for child in self.children(idx)]
+
+        return tree
@@ -26,9 +26,10 @@ from util.packet_util import normalize_ipv6_address, normalize_upper_port
 from util.packet_util import normalize_ipv6_proto, normalize_ipv6header_header
 from util.packet_util import denormalize_ipv4_address, denormalize_ipv6_address
 
-from netplumber.mapping import FIELD_SIZES
+from netplumber.mapping import FIELD_SIZES, Mapping
 from netplumber.vector import Vector
 from functools import reduce
+from collections import OrderedDict
 
 
 class FieldNotImplementedError(Exception):
@@ -164,21 +165,79 @@ def _try_int(val):
         return False
     return True
 
-# XXX: refactor and move to own utility module
-def field_value_to_bitvector(field):
-    """ Converts field value to its bitvector representation.
+_NORMALIZERS = {
+    "related" : _normalize_related,
+    "packet.ether.vlan" : normalize_vlan_tag,
+    "packet.ether.svlan" : normalize_vlan_tag,
+    "packet.ether.dvlan" : normalize_vlan_tag,
+    "packet.ipv4.source" : normalize_ipv4_address,
+    "packet.ipv4.destination" : normalize_ipv4_address,
+    "packet.ipv6.source" : normalize_ipv6_address,
+    "packet.ipv6.destination" : normalize_ipv6_address,
+    "packet.upper.sport" : normalize_upper_port,
+    "packet.upper.dport" : normalize_upper_port,
+    "interface" : _normalize_interface,
+    "in_port" : _normalize_interface,
+    "out_port" : _normalize_interface,
+    "module" : _normalize_module,
+    "module.ipv6header.header" : normalize_ipv6header_header,
+    "module.limit" : _normalize_limit,
+    "module.state" : _normalize_states,
+    "module.conntrack.ctstate" : _normalize_states,
+    "packet.ipv6.proto" : normalize_ipv6_proto,
+    "packet.ipv6.icmpv6.type" : _normalize_icmpv6_type,
+    "module.ipv6header.rt.len" : _normalize_ipv6header,
+    "module.ipv6header.rt.segsleft" : _normalize_ipv6header,
+    "module.ipv6header.ah.len" : _normalize_ipv6header,
+    "module.ipv6header.dst.len" : _normalize_ipv6header,
+    "module.ipv6header.frag.len" : _normalize_ipv6header,
+    "module.ipv6header.hbh.len" : _normalize_ipv6header,
+    "module.ipv6header.hl.eq" : _normalize_ipv6header,
+    "module.ipv6header.rt.type" : _normalize_rt_type,
+    "module.ipv6header.frag.id" : _normalize_frag_id,
+    "module.ipv6header.ah.res" : _normalize_ah_res,
+    "module.ipv6header.ah.spi" : _normalize_ah_spi,
+    "module.ipv6header.mh.type" : _normalize_mh_type
+}
+
+
+# maximum number of cached vectors per field
+FIELD_CACHE_SIZE = 4096
+
+_FIELD_CACHES = {}
+_FIELD_CACHE_STATS = {"hits" : 0, "misses" : 0}
+
+
+def field_cache_info():
+    """ Returns the hit and miss counters as well as the current size of the
+        field vector cache.
+    """
 
-    Keyword arguments:
-    field -- a header field
+    info = dict(_FIELD_CACHE_STATS)
+    info["size"] = sum(len(cache) for cache in _FIELD_CACHES.values())
+    return info
+
+
+def clear_field_cache():
+    """ Empties the field vector cache and resets its counters.
     """
 
-    name = field.name
+    _FIELD_CACHES.clear()
+    _FIELD_CACHE_STATS["hits"] = 0
+    _FIELD_CACHE_STATS["misses"] = 0
+
+
+def _copy_vector(vec):
+    res = Vector(length=vec.length)
+    res.care = vec.care
+    res.value = vec.value
+    return res
+
+
+def _encode_field_value(name, value):
     size = FIELD_SIZES[name]
-    value = field.value
 
-    if isinstance(value, Vector):
-        return value
-    elif Vector.is_vector(str(value), name=name):
+    if Vector.is_vector(str(value), name=name):
         vec = Vector(length=size)
         vec[:] = value
         return vec
@@ -189,40 +248,7 @@ def field_value_to_bitvector(field):
 
     vector = Vector(length=size)
     try:
-        vector[:] = {
-            "related" : _normalize_related,
-            "packet.ether.vlan" : normalize_vlan_tag,
-            "packet.ether.svlan" : normalize_vlan_tag,
-            "packet.ether.dvlan" : normalize_vlan_tag,
-            "packet.ipv4.source" : normalize_ipv4_address,
-            "packet.ipv4.destination" : normalize_ipv4_address,
-            "packet.ipv6.source" : normalize_ipv6_address,
-            "packet.ipv6.destination" : normalize_ipv6_address,
-            "packet.upper.sport" : normalize_upper_port,
-            "packet.upper.dport" : normalize_upper_port,
-            "interface" : _normalize_interface,
-            "in_port" : _normalize_interface,
-            "out_port" : _normalize_interface,
-            "module" : _normalize_module,
-            "module.ipv6header.header" : normalize_ipv6header_header,
-            "module.limit" : _normalize_limit,
-            "module.state" : _normalize_states,
-            "module.conntrack.ctstate" : _normalize_states,
-            "packet.ipv6.proto" : normalize_ipv6_proto,
-            "packet.ipv6.icmpv6.type" : _normalize_icmpv6_type,
-            "module.ipv6header.rt.len" : _normalize_ipv6header,
-            "module.ipv6header.rt.segsleft" : _normalize_ipv6header,
-            "module.ipv6header.ah.len" : _normalize_ipv6header,
-            "module.ipv6header.dst.len" : _normalize_ipv6header,
-            "module.ipv6header.frag.len" : _normalize_ipv6header,
-            "module.ipv6header.hbh.len" : _normalize_ipv6header,
-            "module.ipv6header.hl.eq" : _normalize_ipv6header,
-            "module.ipv6header.rt.type" : _normalize_rt_type,
-            "module.ipv6header.frag.id" : _normalize_frag_id,
-            "module.ipv6header.ah.res" : _normalize_ah_res,
-            "module.ipv6header.ah.spi" : _normalize_ah_spi,
-            "module.ipv6header.mh.type" : _normalize_mh_type
-        }[name](value)
+        vector[:] = _NORMALIZERS[name](value)
 
     except ValueError:
         if Vector.is_vector(value):
@@ -236,7 +262,100 @@ def field_value_to_bitvector(field):
     return vector
 
 
-def bitvector_to_field_value(vector, field, ignore_bit='x', printable=False):
+def _field_cache(name):
+    try:
+        return _FIELD_CACHES[name]
+    except KeyError:
+        return _FIELD_CACHES.setdefault(name, OrderedDict())
+
+
+def _lookup_field_value(cache, name, value):
+    # the cached vector is returned which must not be modified
+    try:
+        vec = cache[value]
+    except KeyError:
+        _FIELD_CACHE_STATS["misses"] += 1
+        vec = _encode_field_value(name, value)
+        cache[value] = vec
+        if len(cache) > FIELD_CACHE_SIZE:
+            cache.popitem(last=False)
+    else:
+        _FIELD_CACHE_STATS["hits"] += 1
+        cache.move_to_end(value)
+
+    return vec
+
+
+def _is_hashable(value):
+    try:
+        hash(value)
+    except TypeError:
+        return False
+    return True
+
+
+# XXX: refactor and move to own utility module
+def field_value_to_bitvector(field):
+    """ Converts field value to its bitvector representation.
+
+    Vectors are cached per field name and value in a bounded LRU cache. The
+    caller always receives a fresh copy that may be modified.
+
+    Keyword arguments:
+    field -- a header field
+    """
+
+    name = field.name
+    value = field.value
+
+    if isinstance(value, Vector):
+        return value
+
+    if not _is_hashable(value):
+        _FIELD_CACHE_STATS["misses"] += 1
+        return _encode_field_value(name, value)
+
+    return _copy_vector(_lookup_field_value(_field_cache(name), name, value))
+
+
+def fields_to_bitvectors(fields):
+    """ Converts the values of many fields to their bitvector representations.
+
+    The fields are grouped by name so that each group is encoded in one pass
+    against its field's cache. The results equal those of
+    field_value_to_bitvector() for each field.
+
+    Keyword arguments:
+    fields -- a list of header fields
+
+    Returns:
+    A list of vectors in the order of the fields.
+    """
+
+    vectors = [None] * len(fields)
+    groups = {}
+    for idx, field in enumerate(fields):
+        if isinstance(field.value, Vector):
+            vectors[idx] = field.value
+        else:
+            groups.setdefault(field.name, []).append(idx)
+
+    for name, indexes in groups.items():
+        cache = _field_cache(name)
+        for idx in indexes:
+            value = fields[idx].value
+            if _is_hashable(value):
+                vectors[idx] = _copy_vector(_lookup_field_value(cache, name, value))
+            else:
+                _FIELD_CACHE_STATS["misses"] += 1
+                vectors[idx] = _encode_field_value(name, value)
+
+    return vectors
+
+
+def bitvector_to_field_value(
+        vector, field, ignore_bit='x', printable=False, mapping=None
+):
     """ Translates a bitvector to a field value
 
     Arguments:
@@ -246,8 +365,14 @@ def bitvector_to_field_value(vector, field, ignore_bit='x', printable=False):
     Keyword arguments:
     ignore_bit -- overwrite the ignore bit of the vector (default: 'x')
     printable -- return hex representation if the field is a port type (default: False)
+    mapping -- the mapping the bitvector was taken from if it may compact the field (default: None)
     """
 
+    if isinstance(mapping, Mapping) and field in mapping.codecs:
+        vector = mapping.decode(field, vector)
+        if vector is None:
+            return None
+
     assert len(vector) == FIELD_SIZES[field]
 
     if ignore_bit * FIELD_SIZES[field] == vector:
@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+
+# -*- coding: utf-8 -*-
+
+# Copyright 2021 Claas Lorenz <claas_lorenz@genua.de>
+
+# This file is part of FaVe.
+
+# FaVe is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# FaVe is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with FaVe.  If not, see <https://www.gnu.org/licenses/>.
+
+""" This module provides profiling of the aggregator's tasks.
+
+    A profiler accounts the time spent in named phases of a task exclusively,
+    i.e., a nested phase pauses the phase it is nested in. Objects take part
+    in profiling by holding a profiler in their profiler attribute and by
+    marking methods with the profiled() decorator.
+"""
+
+import io
+import time
+import pstats
+import cProfile
+import functools
+
+from contextlib import contextmanager
+
+try:
+    import pyinstrument
+except ImportError:
+    pyinstrument = None
+
+
+def profiled(phase):
+    """ Accounts the time spent in a method to a phase of the object's profiler.
+
+    Arguments:
+    phase -- the phase's name
+    """
+
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(self, *args, **kwargs):
+            profiler = self.profiler
+            if profiler is None:
+                return func(self, *args, **kwargs)
+
+            profiler.enter(phase)
+            try:
+                return func(self, *args, **kwargs)
+            finally:
+                profiler.leave()
+
+        return wrapper
+
+    return decorator
+
+
+class TaskProfiler(object):
+    """ This class collects per-phase timings and RPC counters per task type.
+    """
+
+    def __init__(self, rpc=None, sample=None, sampler='cprofile'):
+        """ Constructs a profiler.
+
+        Keyword arguments:
+        rpc -- an RPC client whose counters are accounted per task (default: None)
+        sample -- a list of task types to run a sampler for (default: None)
+        sampler -- either cprofile or pyinstrument (default: cprofile)
+        """
+
+        self.rpc = rpc
+        self.sample = set(sample) if sample else set()
+        self.sampler = sampler
+        if sampler == 'pyinstrument' and pyinstrument is None:
+            raise ImportError("pyinstrument is not available")
+
+        self.reset()
+
+
+    def reset(self):
+        """ Discards all collected statistics.
+        """
+
+        self.tasks = {}
+        self.profiles = {}
+        self._phases = {}
+        self._stack = []
+        self._task = None
+
+
+    def enter(self, phase):
+        """ Enters a phase and pauses the current one.
+
+        Arguments:
+        phase -- the phase's name
+        """
+
+        now = time.perf_counter()
+        if self._stack:
+            outer, start = self._stack[-1]
+            self._phases[outer] = self._phases.get(outer, 0.0) + now - start
+        self._stack.append((phase, now))
+
+
+    def leave(self):
+        """ Leaves the current phase and resumes the one it is nested in.
+        """
+
+        now = time.perf_counter()
+        phase, start = self._stack.pop()
+        self._phases[phase] = self._phases.get(phase, 0.0) + now - start
+        if self._stack:
+            self._stack[-1] = (self._stack[-1][0], now)
+
+
+    @contextmanager
+    def phase(self, phase):
+        """ Accounts the enclosed block to a phase.
+
+        Arguments:
+        phase -- the phase's name
+        """
+
+        self.enter(phase)
+        try:
+            yield
+        finally:
+            self.leave()
+
+
+    def add(self, phase, duration):
+        """ Accounts a duration measured elsewhere, e.g., in a worker process.
+
+        Arguments:
+        phase -- the phase's name
+        duration -- the duration in seconds
+        """
+
+        self._phases[phase] = self._phases.get(phase, 0.0) + duration
+
+
+    def _counters(self):
+        if self.rpc is None:
+            return (0, 0, 0)
+        return (self.rpc.calls, self.rpc.bytes_sent, self.rpc.bytes_received)
+
+
+    def begin_task(self, task_type):
+        """ Starts profiling a task.
+
+        Arguments:
+        task_type -- the task's type if known in advance, e.g., for sampling
+        """
+
+        sampler = None
+        if task_type in self.sample:
+            if self.sampler == 'pyinstrument':
+                sampler = pyinstrument.Profiler()
+                sampler.start()
+            else:
+                sampler = cProfile.Profile()
+                sampler.enable()
+
+        self._task = (time.perf_counter(), self._counters(), sampler)
+        self.enter('other')
+
+
+    def end_task(self, task_type):
+        """ Finishes profiling a task and adds it to the statistics.
+
+        Arguments:
+        task_type -- the task's type
+        """
+
+        while self._stack:
+            self.leave()
+
+        t_start, counters, sampler = self._task
+        duration = time.perf_counter() - t_start
+        calls, sent, received = [
+            end - start for start, end in zip(counters, self._counters())
+        ]
+
+        if sampler is not None and self.sampler == 'pyinstrument':
+            sampler.stop()
+            self.profiles.setdefault(task_type, []).append(sampler.output_text())
+        elif sampler is not None:
+            sampler.disable()
+            if task_type in self.profiles:
+                self.profiles[task_type].add(sampler)
+            else:
+                self.profiles[task_type] = pstats.Stats(sampler)
+
+        stats = self.tasks.setdefault(task_type, {
+            'count' : 0,
+            'time' : 0.0,
+            'phases' : {},
+            'rpc_calls' : 0,
+            'rpc_bytes_sent' : 0,
+            'rpc_bytes_received' : 0
+        })
+        stats['count'] += 1
+        stats['time'] += duration
+        for phase, spent in self._phases.items():
+            stats['phases'][phase] = stats['phases'].get(phase, 0.0) + spent
+        stats['rpc_calls'] += calls
+        stats['rpc_bytes_sent'] += sent
+        stats['rpc_bytes_received'] += received
+
+        self._phases = {}
+        self._task = None
+
+
+    def to_json(self, limit=20):
+        """ Converts the statistics to JSON.
+
+        Keyword arguments:
+        limit -- the number of functions listed per sampled task type (default: 20)
+        """
+
+        profiles = {}
+        for task_type, profile in self.profiles.items():
+            if isinstance(profile, list):
+                profiles[task_type] = '\n'.join(profile)
+                continue
+
+            out = io.StringIO()
+            profile.stream = out
+            profile.sort_stats('cumulative').print_stats(limit)
+            profiles[task_type] = out.getvalue()
+
+        return {
+            'tasks' : self.tasks,
+            'profiles' : profiles
+        }
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+
+# -*- coding: utf-8 -*-
+
+# Copyright 2021 Claas Lorenz <claas_lorenz@genua.de>
+
+# This file is part of FaVe.
+
+# FaVe is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# FaVe is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with FaVe.  If not, see <https://www.gnu.org/licenses/>.
+
+""" This module provides statistics for benchmark measurements.
+"""
+
+import math
+
+# two-sided 95% quantiles of Student's t distribution by degrees of freedom
+_T_95 = {
+    1 : 12.706, 2 : 4.303, 3 : 3.182, 4 : 2.776, 5 : 2.571,
+    6 : 2.447, 7 : 2.365, 8 : 2.306, 9 : 2.262, 10 : 2.228,
+    11 : 2.201, 12 : 2.179, 13 : 2.160, 14 : 2.145, 15 : 2.131,
+    16 : 2.120, 17 : 2.110, 18 : 2.101, 19 : 2.093, 20 : 2.086,
+    25 : 2.060, 30 : 2.042, 40 : 2.021, 60 : 2.000, 120 : 1.980
+}
+
+
+def _t_95(dof):
+    # falls back to the next smaller tabulated degree of freedom which is
+    # conservative
+    if dof > 120:
+        return 1.960
+    return _T_95[max(d for d in _T_95 if d <= dof)]
+
+
+def mean(values):
+    """ Calculates the arithmetic mean.
+
+    Arguments:
+    values -- a non-empty list of numbers
+    """
+
+    return math.fsum(values) / len(values)
+
+
+def median(values):
+    """ Calculates the median.
+
+    Arguments:
+    values -- a non-empty list of numbers
+    """
+
+    ordered = sorted(values)
+    mid = len(ordered) // 2
+    if len(ordered) % 2:
+        return ordered[mid]
+    return (ordered[mid-1] + ordered[mid]) / 2.0
+
+
+def stddev(values):
+    """ Calculates the sample standard deviation or 0.0 for single values.
+
+    Arguments:
+    values -- a non-empty list of numbers
+    """
+
+    if len(values) < 2:
+        return 0.0
+
+    avg = mean(values)
+    return math.sqrt(math.fsum((v - avg) ** 2 for v in values) / (len(values) - 1))
+
+
+def confidence_interval(values):
+    """ Calculates the 95% confidence interval of the mean.
+
+    Arguments:
+    values -- a non-empty list of numbers
+
+    Returns:
+    A pair of the interval's lower and upper bound.
+    """
+
+    avg = mean(values)
+    if len(values) < 2:
+        return (avg, avg)
+
+    delta = _t_95(len(values) - 1) * stddev(values) / math.sqrt(len(values))
+    return (avg - delta, avg + delta)
+
+
+def summarize(values):
+    """ Summarizes a list of measurements.
+
+    Arguments:
+    values -- a non-empty list of numbers
+
+    Returns:
+    A dict with the keys n, mean, median, stddev, min, max, ci_low, and ci_high.
+    """
+
+    ci_low, ci_high = confidence_interval(values)
+    return {
+        'n' : len(values),
+        'mean' : mean(values),
+        'median' : median(values),
+        'stddev' : stddev(values),
+        'min' : min(values),
+        'max' : max(values),
+        'ci_low' : ci_low,
+        'ci_high' : ci_high
+    }
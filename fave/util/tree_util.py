@@ -33,7 +33,7 @@ class Tree(list):
         parent -- the tree's parent tree (default: None)
         """
 
-        super(Tree, self).__init__([])
+        # a new list is empty already, so it does not need to be initialized
         self.parent = parent
         self.value = value
         self._negated = False
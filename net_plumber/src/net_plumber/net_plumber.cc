@@ -433,7 +433,8 @@ void NetPlumber<T1, T2>::set_table_dependency(RuleNode<T1, T2> *r) {
 template<class T1, class T2>
 void NetPlumber<T1, T2>::_check_anomalies(
     const uint32_t table_id,
-    const struct anomalies_config_t *anomalies
+    const struct anomalies_config_t *anomalies,
+    std::vector<struct anomaly_t> *results
 ) {
   auto rules = this->table_to_nodes[table_id];
 
@@ -447,14 +448,19 @@ void NetPlumber<T1, T2>::_check_anomalies(
   std::string shadow_str { "Shadowed" };
   std::string generalization_str { "Generalized" };
 
+  auto report = [this, results](std::string *anomaly, const uint64_t rule_id) {
+    this->anomaly_callback_data = (void *)anomaly;
+    this->anomaly_callback(this, nullptr, this->anomaly_callback_data);
+    if (results) results->push_back({*anomaly, rule_id});
+  };
+
   if (anomalies->use_shadow || anomalies->use_reach) {
       for (auto const &rule_pair: *rules) {
         auto rule = rule_pair.second;
         this->last_event.id2 = rule->node_id;
 
         if (unreach) {
-          this->anomaly_callback_data = (void *)&unreach_str;
-          this->anomaly_callback(this, nullptr, this->anomaly_callback_data);
+          report(&unreach_str, rule->node_id);
           continue;
         }
 
@@ -463,8 +469,7 @@ void NetPlumber<T1, T2>::_check_anomalies(
             aggr_hs.list.used == 1 &&
             array_is_eq(aggr_hs.list.elems[0], (T2 *)&all_hs, this->length)
         ) {
-          this->anomaly_callback_data = (void *)&unreach_str;
-          this->anomaly_callback(this, nullptr, this->anomaly_callback_data);
+          report(&unreach_str, rule->node_id);
 
           unreach = true;
           continue;
@@ -472,8 +477,7 @@ void NetPlumber<T1, T2>::_check_anomalies(
 
         T1 rule_hs = {this->length, {&rule->match, 0, 1, 1}};
         if (anomalies->use_shadow && hs_simple_is_sub_eq(&rule_hs, &aggr_hs)) {
-          this->anomaly_callback_data = (void *)&shadow_str;
-          this->anomaly_callback(this, nullptr, this->anomaly_callback_data);
+          report(&shadow_str, rule->node_id);
         }
 
         hs_merge_insert(&aggr_hs, rule->match);
@@ -495,8 +499,7 @@ void NetPlumber<T1, T2>::_check_anomalies(
         T1 rule_hs = {this->length, {&rule->match, 0, 1, 1}};
 
         if (hs_simple_is_sub_eq(&rule_hs, &aggr_hs)) {
-            this->anomaly_callback_data = (void *)&generalization_str;
-            this->anomaly_callback(this, nullptr, this->anomaly_callback_data);
+            report(&generalization_str, rule->node_id);
         }
 
         hs_merge_insert(&aggr_hs, rule->match);
@@ -509,13 +512,17 @@ void NetPlumber<T1, T2>::_check_anomalies(
 
 #ifdef CHECK_ANOMALIES
 template<class T1, class T2>
-void NetPlumber<T1, T2>::check_anomalies(const uint32_t table_id, const struct anomalies_config_t *anomalies) {
+void NetPlumber<T1, T2>::check_anomalies(
+    const uint32_t table_id,
+    const struct anomalies_config_t *anomalies,
+    std::vector<struct anomaly_t> *results
+) {
   if (table_id == 0) {
     for (auto const &table: this->table_to_nodes) {
-      this->_check_anomalies(table.first, anomalies);
+      this->_check_anomalies(table.first, anomalies, results);
     }
   } else {
-    this->_check_anomalies(table_id, anomalies);
+    this->_check_anomalies(table_id, anomalies, results);
   }
 }
 #endif
@@ -2240,13 +2247,17 @@ void NetPlumber<T1, T2>::dump_slices_pipes(const std::string dir) {
 /* format: {dst:[(src,valid,cond)]} */
 template<class T1, class T2>
 void NetPlumber<T1, T2>::check_compliance (
-    std::map<uint64_t, std::vector<std::tuple<uint64_t, bool, T2*>>> *rules
+    std::map<uint64_t, std::vector<std::tuple<uint64_t, bool, T2*>>> *rules,
+    std::vector<struct compliance_result_t> *results
 ) {
     for (auto policy: *rules) {
         uint64_t dst = policy.first;
         auto src_tpls = policy.second;
 
-        for (auto src_tpl: src_tpls) {
+        for (size_t idx = 0; idx < src_tpls.size(); idx++) {
+            auto src_tpl = src_tpls[idx];
+            const double start = results ? get_wall_time_ms() : 0.0;
+
             uint64_t src = std::get<0>(src_tpl);
             bool valid = std::get<1>(src_tpl);
             T2 *cond = std::get<2>(src_tpl);
@@ -2261,7 +2272,16 @@ void NetPlumber<T1, T2>::check_compliance (
                 }
             }
 
-            if (!valid && any || valid && !any) {
+            const bool compliant = !(!valid && any || valid && !any);
+
+            if (results) {
+                struct compliance_result_t result {
+                    src, dst, idx, valid, compliant, get_wall_time_ms() - start
+                };
+                results->push_back(result);
+            }
+
+            if (!compliant) {
                 struct compliance_rule_t rule {src, dst, valid, cond};
                 this->compliance_callback_data = &rule;
                 this->compliance_callback(this, NULL, this->compliance_callback_data);
@@ -88,6 +88,11 @@ namespace net_plumber {
     bool use_general;
   };
 
+  struct anomaly_t {
+    std::string type;
+    uint64_t rule;
+  };
+
   struct compliance_rule_t {
     uint64_t src;
     uint64_t dst;
@@ -95,6 +100,15 @@ namespace net_plumber {
     array_t *cond;
   };
 
+  struct compliance_result_t {
+    uint64_t src;
+    uint64_t dst;
+    size_t idx;
+    bool valid;
+    bool compliant;
+    double time;
+  };
+
 
   template<class T1, class T2>
   class NetPlumber;
@@ -331,11 +345,16 @@ namespace net_plumber {
 #endif
 
 #ifdef CHECK_ANOMALIES
-    void check_anomalies(const uint32_t table_id, const struct anomalies_config_t *anomalies);
+    void check_anomalies(
+      const uint32_t table_id,
+      const struct anomalies_config_t *anomalies,
+      std::vector<struct anomaly_t> *results = nullptr
+    );
 #endif
 
     void check_compliance(
-      std::map<uint64_t, std::vector<std::tuple<uint64_t, bool, T2*>>> *rules
+      std::map<uint64_t, std::vector<std::tuple<uint64_t, bool, T2*>>> *rules,
+      std::vector<struct compliance_result_t> *results = nullptr
     );
 
    private:
@@ -371,7 +390,11 @@ namespace net_plumber {
 #endif
 
 #ifdef CHECK_ANOMALIES
-    void _check_anomalies(const uint32_t table_id, const struct anomalies_config_t *anomalies);
+    void _check_anomalies(
+      const uint32_t table_id,
+      const struct anomalies_config_t *anomalies,
+      std::vector<struct anomaly_t> *results
+    );
 #endif
   };
 }
@@ -174,8 +174,10 @@ void RpcHandler<T1, T2>::initServer (Server *server) {
     FN(add_link), FN(remove_link),
     FN(add_table), FN(remove_table),
     FN(add_rule), FN(remove_rule),
-    FN(add_rules),
+    FN(add_rules), FN(remove_rules),
+    FN(add_tables), FN(add_links), FN(remove_links),
     FN(add_source), FN(remove_source),
+    FN(remove_sources),
     FN(add_source_probe), FN(remove_source_probe),
 #ifdef PIPE_SLICING
     FN(add_slice), FN(remove_slice),
@@ -283,6 +285,26 @@ PROTO(remove_link)
   RETURN(VOID);
 }
 
+PROTO(add_links)
+  Json::Value links = PARAM(links);
+  for (Json::ArrayIndex i = 0; i < links.size(); i++) {
+    uint32_t from = links[i]["from_port"].asUInt();
+    uint32_t to = links[i]["to_port"].asUInt();
+    netPlumber->add_link(from, to);
+  }
+  RETURN(VOID);
+}
+
+PROTO(remove_links)
+  Json::Value links = PARAM(links);
+  for (Json::ArrayIndex i = 0; i < links.size(); i++) {
+    uint32_t from = links[i]["from_port"].asUInt();
+    uint32_t to = links[i]["to_port"].asUInt();
+    netPlumber->remove_link(from, to);
+  }
+  RETURN(VOID);
+}
+
 PROTO(add_table)
   uint32_t id = PARAM(id).asUInt();
   List_t ports = val_to_list(PARAM(in));
@@ -290,6 +312,16 @@ PROTO(add_table)
   RETURN(VOID);
 }
 
+PROTO(add_tables)
+  Json::Value tables = PARAM(tables);
+  for (Json::ArrayIndex i = 0; i < tables.size(); i++) {
+    uint32_t id = tables[i]["id"].asUInt();
+    List_t ports = val_to_list(tables[i]["in"]);
+    netPlumber->add_table(id,ports);
+  }
+  RETURN(VOID);
+}
+
 PROTO(remove_table)
   uint32_t id = PARAM(id).asUInt();
   netPlumber->remove_table(id);
@@ -349,6 +381,14 @@ PROTO(remove_rule)
   RETURN(VOID);
 }
 
+PROTO(remove_rules)
+  Json::Value nodes = PARAM(nodes);
+  for (Json::ArrayIndex i = 0; i < nodes.size(); i++) {
+    netPlumber->remove_rule(nodes[i].asUInt64());
+  }
+  RETURN(VOID);
+}
+
 PROTO(add_source)
   T1 *h = val_to_hs<T1, T2>(PARAM(hs), length);
   List_t ports = val_to_list(PARAM(ports));
@@ -363,6 +403,14 @@ PROTO(remove_source)
   RETURN(VOID);
 }
 
+PROTO(remove_sources)
+  Json::Value ids = PARAM(ids);
+  for (Json::ArrayIndex i = 0; i < ids.size(); i++) {
+    netPlumber->remove_source(ids[i].asUInt64());
+  }
+  RETURN(VOID);
+}
+
 PROTO(add_source_probe)
   List_t ports = val_to_list(PARAM(ports));
   PROBE_MODE mode = !strcasecmp(PARAM(mode).asCString(), "universal") ? UNIVERSAL : EXISTENTIAL;
@@ -533,8 +581,22 @@ PROTO(check_anomalies)
   const bool use_reach = PARAM(use_reach).asBool();
   const bool use_general = PARAM(use_general).asBool();
   const struct anomalies_config_t anomalies { use_shadow, use_reach, use_general };
-  netPlumber->check_anomalies(table_id, &anomalies);
-  RETURN(VOID);
+
+  /*
+   * result format: [{type, rule}] where type is one of Unreachable, Shadowed,
+   * and Generalized
+   */
+  std::vector<struct anomaly_t> results;
+  netPlumber->check_anomalies(table_id, &anomalies, &results);
+
+  Json::Value res(Json::arrayValue);
+  for (auto const &result: results) {
+    Json::Value anomaly(Json::objectValue);
+    anomaly["type"] = result.type;
+    anomaly["rule"] = (Json::UInt64) result.rule;
+    res.append(anomaly);
+  }
+  RETURN(res);
 }
 #endif
 
@@ -561,8 +623,26 @@ PROTO(check_compliance)
     }
     rules[src] = dst_tpls;
   }
-  netPlumber->check_compliance(&rules);
-  RETURN(VOID);
+
+  /*
+   * result format: [{dst, idx, src, valid, compliant, time}] where idx is the
+   * position of the check in the dst's list and time is given in ms
+   */
+  std::vector<struct compliance_result_t> results;
+  netPlumber->check_compliance(&rules, &results);
+
+  Json::Value res(Json::arrayValue);
+  for (auto const &result: results) {
+    Json::Value check(Json::objectValue);
+    check["dst"] = (Json::UInt64) result.dst;
+    check["idx"] = (Json::UInt64) result.idx;
+    check["src"] = (Json::UInt64) result.src;
+    check["valid"] = result.valid;
+    check["compliant"] = result.compliant;
+    check["time"] = result.time;
+    res.append(check);
+  }
+  RETURN(res);
 }
 
 #ifdef GENERIC_PS
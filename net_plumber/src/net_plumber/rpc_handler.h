@@ -52,8 +52,10 @@ private:
   FN(add_link); FN(remove_link);
   FN(add_table); FN(remove_table);
   FN(add_rule); FN(remove_rule);
-  FN(add_rules);
+  FN(add_rules); FN(remove_rules);
+  FN(add_tables); FN(add_links); FN(remove_links);
   FN(add_source); FN(remove_source);
+  FN(remove_sources);
   FN(add_source_probe); FN(remove_source_probe);
 #ifdef PIPE_SLICING
   FN(add_slice); FN(remove_slice);